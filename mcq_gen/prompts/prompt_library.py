@@ -145,4 +145,33 @@ custom_prompt_v1 = (
                 ...
                 ]
         """
-)
\ No newline at end of file
+)
+
+# one slice of a fanned-out quiz: a fixed question count over part of the retrieved context
+fanout_prompt_v1 = (
+        """
+            You are an expert educational content creator specializing in exam design.
+                Using the provided context, generate exactly {count} multiple-choice questions (MCQs).
+                Instructions:
+                - Use only the following context '{context}'.
+                - Generate unique MCQs about the topic '{topic}'.
+                - If topic is empty, create MCQs covering the core concepts of this context.
+                - This is part {part} of {parts} of one quiz; other parts cover other passages, so stay on this one.
+                - Each MCQ must have 1 correct answer, 3 distractors, and a short explanation.
+                - Return **strictly JSON** in this format:
+                [
+                {{
+                    "question": "...",
+                    "options": {{
+                        "A": "...",
+                        "B": "...",
+                        "C": "...",
+                        "D": "..."
+                    }},
+                    "correct_answer": "...",
+                    "explanation": "..."
+                }},
+                ...
+                ]
+        """
+)
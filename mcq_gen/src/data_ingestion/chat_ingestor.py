@@ -4,11 +4,17 @@ import uuid
 from typing import Optional, List, Iterable
 from pathlib import Path
 from mcq_gen.src.data_ingestion.faiss_manager import FaissManager
+from mcq_gen.src.data_ingestion.content_store import ContentStore, chunk_profile
+from mcq_gen.src.data_ingestion.streaming import stream_ingest
+from mcq_gen.src.data_ingestion.sparse_index import hybrid_settings, load_sparse_index
+from mcq_gen.src.data_ingestion.coverage import coverage_settings, load_coverage
+from mcq_gen.src.generator.mmr_retriever import make_retriever, retriever_settings
 
 from mcq_gen.exception import ProjectException
 from mcq_gen.logger import logging as log
-from mcq_gen.utils.model_loader import ModelLoader
-from mcq_gen.utils.file_io import save_uploaded_files
+from mcq_gen.utils.model_loader import shared_model_loader
+from mcq_gen.utils.config_loader import load_config
+from mcq_gen.utils.file_io import iter_saved_uploads, save_uploads
 from mcq_gen.utils.document_ops import load_documents
 from langchain_core.documents import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
@@ -29,7 +35,17 @@ class ChatIngestor:
             session_id: Optional[str] = None,
     ):
         try:
-            self.model_loader = ModelLoader()
+            # shared: the embeddings client and its caches are built once per process
+            self.model_loader = shared_model_loader()
+
+            config = load_config()
+            ingestion = config.get("ingestion", {})
+            self.embedding_model = config.get("embedding_model", {}).get("model_name", "")
+            self.parse_workers = int(ingestion.get("parse_workers", 1))
+            self.pages_per_task = int(ingestion.get("pages_per_task", 16))
+            self.streaming = bool(ingestion.get("streaming", False))
+            self.stream_batch_size = int(ingestion.get("stream_batch_size", 64))
+            self.stream_queue_size = int(ingestion.get("stream_queue_size", 2))
 
             self.use_session = use_session_dirs
             self.use_txt_chunking = use_txt_chunking
@@ -41,6 +57,9 @@ class ChatIngestor:
             self.temp_dir = self._resolve_dir(self.temp_base)
             self.faiss_dir = self._resolve_dir(self.faiss_base)
 
+            # one blob store for all sessions: identical uploads are stored, parsed and embedded once
+            self.content_store = ContentStore(self.temp_base / "blobs") if ingestion.get("dedupe_uploads", True) else None
+
         except Exception as e:
             log.error(f"Failed to initialize ChatIngestor, error={str(e)}")
             raise ProjectException("Initialization error in ChatIngestor", sys)
@@ -73,48 +92,128 @@ class ChatIngestor:
         log.info(f"Documents split, chunks={len(chunks)}, chunk_size={chunk_size}, overlap={chunk_overlap}")
         return chunks
     
+    def _attach_known(self, path: Path, file_hash: str, profile: str):
+        """Share storage with an identical earlier upload and return its chunks and vectors, if processed."""
+        if self.content_store is None:
+            return None
+        self.content_store.adopt(path, file_hash)
+        return self.content_store.load_pack(file_hash, profile, str(path))
+
+    def _publish(self, fm: FaissManager, files: List[tuple], profile: str):
+        """Store chunks and vectors of freshly indexed files so later sessions can attach them."""
+        if self.content_store is None or not files:
+            return
+        # files sync_files() skipped (no chunks) are not indexed under their new hash
+        files = [(source, file_hash) for source, file_hash in files if fm.file_hash(source) == file_hash]
+        exported = fm.export_files([source for source, _ in files])
+        for source, file_hash in files:
+            if source in exported:
+                self.content_store.save_pack(file_hash, profile, *exported[source])
+
+    def _ingest_streaming(self, uploaded_files: Iterable, chunk_size=1000, chunk_overlap=200):
+        """Save -> parse page by page -> split -> embed in batches -> add, without holding the whole upload."""
+        fm = FaissManager(self.faiss_dir, self.model_loader)
+        fm.load_or_create()
+
+        splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+        profile = chunk_profile(self.embedding_model, chunk_size, chunk_overlap)
+        files, added = stream_ingest(
+            fm,
+            iter_saved_uploads(uploaded_files, self.temp_dir),
+            splitter.split_documents,
+            batch_size=self.stream_batch_size,
+            queue_size=self.stream_queue_size,
+            attach=lambda path, file_hash: self._attach_known(path, file_hash, profile),
+            on_file_indexed=lambda source, file_hash: self._publish(fm, [(source, file_hash)], profile),
+        )
+        fm.flush()
+        if fm.vs is None:
+            raise ProjectException("No existing FAISS index and no data to create one", sys)
+        log.info(f"FAISS index updated, files={files}, added={added}, embed_calls={fm.embed_calls}, index={str(self.faiss_dir)}")
+        return fm.vs
+
+    def _sparse_index(self, vs):
+        """BM25 postings FaissManager.flush() wrote next to the snapshot, when hybrid retrieval is enabled."""
+        if not hybrid_settings()["enabled"]:
+            return None
+        return load_sparse_index(self.faiss_dir, vs)
+
+    def _index_extras(self, vs):
+        """Per-snapshot structures flush() built once at index time: BM25 postings and coverage clusters."""
+        extras = {"sparse": self._sparse_index(vs)}
+        if coverage_settings()["enabled"]:
+            extras["coverage"] = load_coverage(self.faiss_dir, vs)
+        return extras
+
     def build_retriever(
             self,
             uploaded_files: Iterable,
             *,
             chunk_size: int = 1000,
             chunk_overlap: int = 200,
-            k: int = 5,
-            search_type: str = "mmr",
-            fetch_k: int = 20,
-            lambda_mult: float = 0.5
+            k: Optional[int] = None,
+            search_type: Optional[str] = None,
+            fetch_k: Optional[int] = None,
+            lambda_mult: Optional[float] = None,
+            streaming: Optional[bool] = None,
     ):
         try:
-            paths = save_uploaded_files(uploaded_files, self.temp_dir)
-            text = " "
-            docs = load_documents(paths)
+            # unset search settings come from the retriever: section of config.yaml
+            settings = retriever_settings(k, search_type, fetch_k, lambda_mult)
+            if self.streaming if streaming is None else streaming:
+                vs = self._ingest_streaming(uploaded_files, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+                log.info("build_retriever completed (streaming)...")
+                return make_retriever(vs, **settings, **self._index_extras(vs))
+
+            saved = save_uploads(uploaded_files, self.temp_dir)
+            paths = [s.path for s in saved]
 
             fm = FaissManager(self.faiss_dir, self.model_loader)
-            
+            fm.load_or_create()
+
+            # files whose content is already indexed are skipped before any parsing;
+            # their sha256 was computed while the upload was copied to disk
+            hashes = {str(s.path): s.sha256 for s in saved}
+            pending = [p for p in paths if not fm.is_indexed(str(p), hashes[str(p)])]
+
+            # files another session already processed are attached with their stored chunks and vectors
+            profile = chunk_profile(self.embedding_model, chunk_size, chunk_overlap)
+            attached = 0
+            for p in list(pending):
+                pack = self._attach_known(p, hashes[str(p)], profile)
+                if pack is not None:
+                    fm.attach_file(str(p), hashes[str(p)], *pack)
+                    pending.remove(p)
+                    attached += 1
+            log.info(f"Upload fingerprinted, files={len(paths)}, attached={attached}, pending={len(pending)}")
+
+            docs = load_documents(pending, max_workers=self.parse_workers, pages_per_task=self.pages_per_task) if pending else []
+
             if self.use_txt_chunking:
                 pass
             else:
-                if not docs:
-                    raise ProjectException("No valid documents loaded")
-                
-                chunks = self._doc_splitter(docs, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
-                texts = [c.page_content for c in chunks]
-                metas = [c.metadata for c in chunks]
-
-                try:
-                    vs = fm.load_or_create(texts=texts, metadatas=metas)
-                except Exception:
-                    vs = fm.load_or_create(texts=texts, metadatas=metas)
-
-                added = fm.add_documents(chunks)
-                log.info(f"FAISS index updated, added={added}, index={str(self.faiss_dir)}")
-
-                # Configure search parameters
-                search_kwargs = {"k": k}
-
-                result = vs.as_retriever(search_type=search_type, search_kwargs=search_kwargs)
-                log.info("build_retriever completed...")
-                print(f"type of vs: {type(result)}")
+                if pending and not docs:
+                    raise ProjectException("No valid documents loaded", sys)
+
+                chunks = self._doc_splitter(docs, chunk_size=chunk_size, chunk_overlap=chunk_overlap) if docs else []
+                by_source = {}
+                for c in chunks:
+                    by_source.setdefault(str(c.metadata.get("source")), []).append(c)
+
+                # per-file chunk manifest: only new chunks are embedded, removed ones are deleted
+                added, removed = fm.sync_files(
+                    [(str(p), hashes[str(p)], by_source.get(str(p), [])) for p in pending]
+                )
+                self._publish(fm, [(str(p), hashes[str(p)]) for p in pending], profile)
+                # one snapshot per upload; readers loading index.faiss see every chunk
+                fm.flush()
+                vs = fm.vs
+                if vs is None:
+                    raise ProjectException("No existing FAISS index and no data to create one", sys)
+                log.info(f"FAISS index updated, added={added}, removed={removed}, embed_calls={fm.embed_calls}, index={str(self.faiss_dir)}")
+
+                result = make_retriever(vs, **settings, **self._index_extras(vs))
+                log.info(f"build_retriever completed, retriever={type(result).__name__}")
                 return result
 
         except Exception as e:
@@ -0,0 +1,124 @@
+import hashlib
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+from mcq_gen.src.data_ingestion.wal import WriteAheadLog
+from mcq_gen.logger import logging as log
+
+
+def chunk_profile(embedding_model: str, chunk_size: int, chunk_overlap: int) -> str:
+    """Chunks and vectors of a file can only be reused under the same model and splitter settings."""
+    return hashlib.sha256(f"{embedding_model}|{chunk_size}|{chunk_overlap}".encode("utf-8")).hexdigest()[:16]
+
+
+class ContentStore:
+    """
+    Content-addressed store shared by all sessions under temp_base/blobs:
+    - blobs/<aa>/<sha256><ext>: one copy of each uploaded file, hardlinked into session dirs
+    - blobs/<aa>/<sha256>.<profile>.pack: the file's chunks and vectors, in WAL record format
+    - blobs/index.sqlite: which (file hash, chunk profile) pairs were already processed
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.root / "index.sqlite"), check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS packs (
+                file_hash TEXT NOT NULL,
+                profile TEXT NOT NULL,
+                chunks INTEGER NOT NULL,
+                created REAL NOT NULL,
+                PRIMARY KEY (file_hash, profile)
+            )
+            """
+        )
+        self._conn.commit()
+
+    def _dir(self, file_hash: str) -> Path:
+        d = self.root / file_hash[:2]
+        d.mkdir(parents=True, exist_ok=True)
+        return d
+
+    def blob_path(self, file_hash: str, suffix: str) -> Path:
+        return self._dir(file_hash) / f"{file_hash}{suffix.lower()}"
+
+    def _pack_path(self, file_hash: str, profile: str) -> Path:
+        return self._dir(file_hash) / f"{file_hash}.{profile}.pack"
+
+    def adopt(self, path: Path, file_hash: str) -> bool:
+        """
+        Make `path` share storage with the blob of its content.
+        Returns True when the content was already stored (the session copy is now a hardlink).
+        """
+        blob = self.blob_path(file_hash, path.suffix)
+        if not blob.exists():
+            try:
+                os.link(path, blob)
+                return False
+            except FileExistsError:
+                pass  # another session stored it first
+            except OSError:
+                tmp = blob.with_name(blob.name + ".tmp")
+                shutil.copyfile(path, tmp)
+                os.replace(tmp, blob)
+                return False
+        try:
+            tmp = path.with_name(path.name + ".lnk")
+            os.link(blob, tmp)
+            os.replace(tmp, path)
+        except OSError:
+            pass  # different filesystem: keep the session copy
+        return True
+
+    def has_pack(self, file_hash: str, profile: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM packs WHERE file_hash = ? AND profile = ?", (file_hash, profile)
+            ).fetchone()
+        return row is not None and self._pack_path(file_hash, profile).exists()
+
+    def save_pack(self, file_hash: str, profile: str, docs: List[Document], vectors: np.ndarray) -> None:
+        if self.has_pack(file_hash, profile):
+            return
+        path = self._pack_path(file_hash, profile)
+        tmp = path.with_name(path.name + f".{os.getpid()}.tmp")
+        WriteAheadLog(tmp, fsync=False).append(
+            {"texts": [d.page_content for d in docs], "metadatas": [d.metadata for d in docs]},
+            vectors,
+        )
+        os.replace(tmp, path)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO packs (file_hash, profile, chunks, created) VALUES (?, ?, ?, ?)",
+                (file_hash, profile, len(docs), time.time()),
+            )
+            self._conn.commit()
+        log.info(f"Chunk pack stored, file_hash={file_hash[:12]}, chunks={len(docs)}")
+
+    def load_pack(self, file_hash: str, profile: str, source: str) -> Optional[Tuple[List[Document], np.ndarray]]:
+        """Chunks and vectors of a processed file, re-pointed at `source` in this session."""
+        if not self.has_pack(file_hash, profile):
+            return None
+        for record, vectors in WriteAheadLog(self._pack_path(file_hash, profile)).records():
+            docs = []
+            for text, md in zip(record["texts"], record["metadatas"]):
+                md = dict(md)
+                for key in ("source", "file_path"):
+                    if key in md:
+                        md[key] = source
+                docs.append(Document(page_content=text, metadata=md))
+            if vectors is None:
+                vectors = np.zeros((0, 0), dtype=np.float32)
+            return docs, vectors
+        return None
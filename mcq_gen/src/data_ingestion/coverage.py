@@ -0,0 +1,161 @@
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+from langchain_community.vectorstores import FAISS
+
+from mcq_gen.src.data_ingestion.index_factory import iter_vectors
+from mcq_gen.src.data_ingestion.sparse_index import snapshot_ids_digest
+from mcq_gen.logger import logging as log
+from mcq_gen.utils.config_loader import load_config
+
+# representative chunks of a snapshot for topic-free quizzes; coverage.json is written last
+COVERAGE_FILES = ("coverage.npy", "coverage.json")
+
+# points assigned to centroids per matrix product
+ASSIGN_BATCH = 65536
+
+
+def coverage_settings() -> Dict[str, Any]:
+    """The `coverage:` section of config.yaml over its defaults."""
+    cfg = load_config().get("coverage", {}) or {}
+    return {
+        "enabled": bool(cfg.get("enabled", True)),
+        "clusters": int(cfg.get("clusters", 10)),
+        "per_cluster": int(cfg.get("per_cluster", 1)),
+        "iterations": int(cfg.get("iterations", 25)),
+        "max_train_vectors": int(cfg.get("max_train_vectors", 20000)),
+        "seed": int(cfg.get("seed", 0)),
+    }
+
+
+def _settings_key(settings: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: settings[k] for k in ("clusters", "per_cluster", "iterations", "max_train_vectors", "seed")}
+
+
+def _assign(x: np.ndarray, centers: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Nearest center of every point and its squared distance."""
+    c_sq = (centers ** 2).sum(axis=1)
+    labels = np.empty(len(x), dtype=np.int64)
+    dist = np.empty(len(x), dtype=np.float32)
+    for start in range(0, len(x), ASSIGN_BATCH):
+        part = x[start:start + ASSIGN_BATCH]
+        d = (part ** 2).sum(axis=1, keepdims=True) - 2.0 * part @ centers.T + c_sq
+        labels[start:start + len(part)] = d.argmin(axis=1)
+        dist[start:start + len(part)] = np.maximum(d[np.arange(len(part)), labels[start:start + len(part)]], 0.0)
+    return labels, dist
+
+
+def kmeans(x: np.ndarray, k: int, iterations: int = 25, seed: int = 0) -> np.ndarray:
+    """Lloyd's k-means with k-means++ seeding; the same data and seed give the same centers."""
+    x = np.asarray(x, dtype=np.float32)
+    k = min(k, len(x))
+    rng = np.random.default_rng(seed)
+    centers = np.empty((k, x.shape[1]), dtype=np.float32)
+    centers[0] = x[rng.integers(len(x))]
+    d2 = ((x - centers[0]) ** 2).sum(axis=1)
+    for i in range(1, k):
+        total = float(d2.sum())
+        pick = rng.choice(len(x), p=d2 / total) if total > 0 else rng.integers(len(x))
+        centers[i] = x[pick]
+        d2 = np.minimum(d2, ((x - centers[i]) ** 2).sum(axis=1))
+
+    for _ in range(iterations):
+        labels, _ = _assign(x, centers)
+        sums = np.zeros_like(centers)
+        np.add.at(sums, labels, x)
+        counts = np.bincount(labels, minlength=k)
+        fresh = centers.copy()
+        filled = counts > 0
+        fresh[filled] = sums[filled] / counts[filled, None]
+        if np.allclose(fresh, centers, atol=1e-6):
+            break
+        centers = fresh
+    return centers
+
+
+def representatives(vectors: np.ndarray, centers: np.ndarray, per_cluster: int = 1) -> np.ndarray:
+    """
+    The per_cluster positions closest to each center. Clusters are ordered by their first chunk,
+    so the context follows the document from start to end.
+    """
+    labels, dist = _assign(vectors, centers)
+    return _pick(labels, dist, len(centers), per_cluster)
+
+
+def _pick(labels: np.ndarray, dist: np.ndarray, clusters: int, per_cluster: int) -> np.ndarray:
+    picks = []
+    for cluster in range(clusters):
+        members = np.flatnonzero(labels == cluster)
+        if not len(members):
+            continue
+        nearest = members[np.argsort(dist[members], kind="stable")[:per_cluster]]
+        picks.append((int(members.min()), np.sort(nearest)))
+    picks.sort(key=lambda p: p[0])
+    return np.concatenate([p[1] for p in picks]).astype(np.int64) if picks else np.zeros(0, dtype=np.int64)
+
+
+def build_coverage(vs: FAISS, folder: Path, settings: Optional[Dict[str, Any]] = None) -> Optional[np.ndarray]:
+    """
+    Cluster the stored vectors once per snapshot and cache the representative positions next to
+    the index. Skipped when coverage.json already describes the same chunks and settings.
+    """
+    settings = settings or coverage_settings()
+    folder = Path(folder)
+    n = vs.index.ntotal
+    if n == 0:
+        return None
+    digest = snapshot_ids_digest(folder, vs)
+    key = _settings_key(settings)
+    meta_path = folder / "coverage.json"
+    if meta_path.exists() and (folder / "coverage.npy").exists():
+        current = json.loads(meta_path.read_text(encoding="utf-8"))
+        if current.get("ids_digest") == digest and current.get("settings") == key:
+            return np.load(folder / "coverage.npy")
+
+    # only the training sample is held in RAM; every vector is then assigned batch by batch
+    sample = np.arange(n, dtype=np.int64)
+    if n > settings["max_train_vectors"]:
+        rng = np.random.default_rng(settings["seed"])
+        sample = np.sort(rng.choice(n, size=settings["max_train_vectors"], replace=False))
+    train = np.concatenate(list(iter_vectors(vs.index, sample))).astype(np.float32)
+    centers = kmeans(train, settings["clusters"], settings["iterations"], settings["seed"])
+    del train
+    labels = np.empty(n, dtype=np.int64)
+    dist = np.empty(n, dtype=np.float32)
+    start = 0
+    for batch in iter_vectors(vs.index):
+        end = start + len(batch)
+        labels[start:end], dist[start:end] = _assign(batch.astype(np.float32), centers)
+        start = end
+    positions = _pick(labels, dist, len(centers), settings["per_cluster"])
+
+    meta_path.unlink(missing_ok=True)
+    tmp = folder / "coverage.npy.tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, positions, allow_pickle=False)
+    os.replace(tmp, folder / "coverage.npy")
+    tmp = folder / "coverage.json.tmp"
+    tmp.write_text(json.dumps({"ids_digest": digest, "rows": n, "settings": key}), encoding="utf-8")
+    os.replace(tmp, meta_path)
+    log.info(f"Coverage clusters written, vectors={n}, clusters={len(centers)}, chunks={len(positions)}, index={str(folder)}")
+    return positions
+
+
+def load_coverage(folder: Path, vs: FAISS, settings: Optional[Dict[str, Any]] = None) -> Optional[np.ndarray]:
+    """Cached representative positions of a snapshot, or None when missing, built for other chunks or other settings."""
+    settings = settings or coverage_settings()
+    folder = Path(folder)
+    if not all((folder / name).exists() for name in COVERAGE_FILES):
+        return None
+    meta = json.loads((folder / "coverage.json").read_text(encoding="utf-8"))
+    if (
+        meta.get("rows") != vs.index.ntotal
+        or meta.get("ids_digest") != snapshot_ids_digest(folder, vs)
+        or meta.get("settings") != _settings_key(settings)
+    ):
+        log.warning(f"Coverage clusters are stale, rows={meta.get('rows')}, vectors={vs.index.ntotal}, index={str(folder)}")
+        return None
+    return np.load(folder / "coverage.npy")
@@ -1,10 +1,37 @@
 
 import hashlib
 import json
+import os
 import sys
-from typing import Optional, Any, Dict, List
+import threading
+from typing import Optional, Any, Dict, Iterable, List, Tuple
 from pathlib import Path
+
+import faiss
+import numpy as np
 from mcq_gen.utils.model_loader import ModelLoader
+from mcq_gen.utils.config_loader import load_config
+from mcq_gen.src.data_ingestion.wal import WriteAheadLog
+from mcq_gen.src.data_ingestion.sparse_index import build_sparse_index, hybrid_settings
+from mcq_gen.src.data_ingestion.coverage import build_coverage, coverage_settings
+from mcq_gen.src.data_ingestion.mapped_store import (
+    MAPPED_FILES,
+    CompactDocstore,
+    encode_mapped_docstore,
+    has_mapped_docstore,
+)
+from mcq_gen.src.data_ingestion.index_factory import (
+    apply_search_params,
+    index_layout,
+    index_settings,
+    initial_index,
+    is_trained_layout,
+    iter_vectors,
+    layout,
+    min_vectors,
+    rebuild_index,
+    remove_positions,
+)
 from langchain_community.vectorstores import FAISS
 from langchain_core.documents import Document
 
@@ -13,73 +40,457 @@ from mcq_gen.logger import logging as log
 
 SUPPORTED_EXTENSIONS = {".pdf", ".docx", ".txt"}
 
+# snapshot files, written as <name>.tmp and renamed into place after the commit marker
+# index.faiss is renamed last: readers keyed on its mtime never pair a new index with an old docstore
+SNAPSHOT_FILES = ("manifest.json", *MAPPED_FILES, "index.faiss")
+COMMIT_MARKER = "snapshot.commit"
+
+
+def _write_durable(path: Path, data: bytes) -> None:
+    with open(path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+
 class FaissManager:
-    def __init__(self, index_dir: Path, model_loader: Optional[ModelLoader] = None):
+    def __init__(
+            self,
+            index_dir: Path,
+            model_loader: Optional[ModelLoader] = None,
+            snapshot_every: Optional[int] = None,
+            fsync: Optional[bool] = None,
+    ):
         self.index_dir = index_dir # create faiss_index dir
         self.index_dir.mkdir(parents=True, exist_ok=True)
 
-        self.meta_path = self.index_dir / "ingested_meta.json"
-        self._meta: dict[str: Any] = {"rows": {}} # this is dict of rows
+        config = load_config()
+        persistence = config.get("persistence", {})
+        # index type and its build/search parameters, see index_factory
+        self.index_settings = index_settings(config.get("index"))
+        # vectors that may sit in the WAL before the snapshot files are rewritten
+        self.snapshot_every = snapshot_every if snapshot_every is not None else int(persistence.get("snapshot_every", 2000))
+        fsync = fsync if fsync is not None else bool(persistence.get("fsync", True))
+
+        # a snapshot interrupted after its commit marker is rolled forward before anything is read
+        self._recover_snapshot()
+
+        # manifest: source -> {"file_hash": sha256 of the file, "chunks": {chunk hash: docstore id}}
+        # it replaces the old ingested_meta.json, which keyed rows on source::row_id
+        self.manifest_path = self.index_dir / "manifest.json"
+        self.legacy_meta_path = self.index_dir / "ingested_meta.json"
+        # pickled docstore of older snapshots, read once and replaced by the compact docstore
+        self.legacy_pickle_path = self.index_dir / "index.pkl"
+        self._manifest: Dict[str, Any] = {"version": 1, "files": {}}
 
-        if self.meta_path.exists():
+        if self.manifest_path.exists():
             try:
-                self._meta = json.loads(self.meta_path.read_text(encoding="utf-8")) or {} # load it if already there
+                self._manifest = json.loads(self.manifest_path.read_text(encoding="utf-8")) or self._manifest
             except Exception:
-                self._meta = {"raws": {}} # init the empty one if dones not exists
+                log.warning(f"Unreadable manifest ignored, path={str(self.manifest_path)}")
+        self._manifest.setdefault("files", {})
 
-        self.model_loader = model_loader or model_loader()
+        self.wal = WriteAheadLog(self.index_dir / "wal.log", fsync=fsync)
+        self._pending_vectors = 0
+        self._opened = False
+
+        self.model_loader = model_loader or ModelLoader()
         self.emb = self.model_loader.load_embeddings()
         self.vs: Optional[FAISS] = None
+        # docstore ids in the index, kept alongside so each batch is checked in O(batch)
+        self._ids: set = set()
+        # the streaming pipeline plans chunks on one thread while another commits them
+        self._lock = threading.RLock()
+
+        # every chunk goes through embed_texts(), so these count the real embedding work
+        self.embed_calls = 0
+        self.embedded_texts = 0
 
-    # make sure both index.faiss and index.pkl exists
+    # make sure index.faiss and its docstore (compact, or a legacy index.pkl) exist
     def _exists(self) -> bool:
-        return (self.index_dir / "index.faiss").exists() and (self.index_dir / "index.pkl").exists()
+        if not (self.index_dir / "index.faiss").exists():
+            return False
+        return has_mapped_docstore(self.index_dir) or self.legacy_pickle_path.exists()
+
+    def _has_state(self) -> bool:
+        return self._exists() or self.wal.size() > 0
+
+    # -----------------------------------------------------------
+    # snapshots
+    # -----------------------------------------------------------
+    def _recover_snapshot(self) -> None:
+        marker = self.index_dir / COMMIT_MARKER
+        tmps = [self.index_dir / f"{name}.tmp" for name in SNAPSHOT_FILES]
+        if marker.exists():
+            for name, tmp in zip(SNAPSHOT_FILES, tmps):
+                if tmp.exists():
+                    os.replace(tmp, self.index_dir / name)
+            WriteAheadLog(self.index_dir / "wal.log").reset()
+            marker.unlink()
+            log.warning(f"Interrupted snapshot rolled forward, index={str(self.index_dir)}")
+        else:
+            # crashed before the commit point: the old snapshot plus the WAL are still complete
+            for tmp in tmps:
+                if tmp.exists():
+                    tmp.unlink()
+
+    def flush(self) -> None:
+        """
+        Write index.faiss, manifest.json and the compact docstore as a new snapshot and empty the WAL. Files are staged as .tmp, a commit marker makes the set durable, then each is renamed into place.
+        The index is first switched to the configured layout, or retrained, when it has grown enough.
+        """
+        if self.vs is None:
+            return
+        with self._lock:
+            # layout switches and IVF retraining run here, never while a change set or the WAL is applied
+            self._maybe_retrain()
+            staged = {
+                "index.faiss": faiss.serialize_index(self.vs.index).tobytes(),
+                "manifest.json": json.dumps(self._manifest, ensure_ascii=False).encode("utf-8"),
+                **encode_mapped_docstore(self.vs.docstore, self.vs.index_to_docstore_id),
+            }
+            for name, data in staged.items():
+                _write_durable(self.index_dir / f"{name}.tmp", data)
+            marker = self.index_dir / COMMIT_MARKER
+            _write_durable(marker, b"")
 
-    def _save_meta(self):
-        self.meta_path.write_text(json.dumps(self._meta, ensure_ascii=False, indent=2), encoding="utf-8")
+            # everything is staged: unmap the previous snapshot before renaming over its files
+            if isinstance(self.vs.docstore, CompactDocstore):
+                self.vs.docstore.close()
+            try:
+                for name in SNAPSHOT_FILES:
+                    os.replace(self.index_dir / f"{name}.tmp", self.index_dir / name)
+            except OSError as e:
+                # the commit marker stays, so the next FaissManager on this folder rolls the snapshot forward
+                self._opened = False
+                log.error(f"FAISS snapshot rename failed, error={str(e)}, index={str(self.index_dir)}")
+                raise
+            self.wal.reset()
+            marker.unlink()
+            # reopen on the files just written, so chunks buffered since the last snapshot are released
+            self.vs.docstore = CompactDocstore(self.index_dir)
+            for legacy in (self.legacy_meta_path, self.legacy_pickle_path):
+                if legacy.exists():
+                    legacy.unlink()
+
+            log.info(f"FAISS snapshot written, vectors={self.vs.index.ntotal}, index={str(self.index_dir)}")
+            self._pending_vectors = 0
+            self._write_extras()
 
+    def _write_extras(self) -> None:
+        """
+        Structures keyed to the snapshot just written (BM25 postings, coverage clusters), rebuilt on every flush path:
+        uploads, WAL replay, shards. Each checks a digest of the docstore ids and skips unchanged snapshots.
+        """
+        hybrid = hybrid_settings()
+        if hybrid["enabled"]:
+            build_sparse_index(self.vs, self.index_dir, k1=hybrid["k1"], b=hybrid["b"])
+        coverage = coverage_settings()
+        if coverage["enabled"]:
+            build_coverage(self.vs, self.index_dir, coverage)
+
+    # -----------------------------------------------------------
+    # fingerprints
+    # -----------------------------------------------------------
     @staticmethod
-    def _fingerprint(text: str, md: Dict[str, Any]) -> str:
-        src = md.get("source") or md.get("file_path")
-        rid = md.get("row_id")
-        if src is not None:
-            return f"{src}::{'' if rid is None else rid}"
+    def fingerprint(text: str, md: Optional[Dict[str, Any]] = None) -> str:
+        """Content hash of a single chunk, its key in the manifest; identical chunks of one file share it."""
         return hashlib.sha256(text.encode("utf-8")).hexdigest()
-    
-    def add_documents(self, docs: List[Document]):
-        if self.vs is None:
-            raise RuntimeError("Call load_or_create() before add_documents_idempotent().")
 
-        new_docs: List[Document] = []
+    @staticmethod
+    def _source_of(md: Dict[str, Any]) -> str:
+        src = md.get("source") or md.get("file_path")
+        return "" if src is None else str(src)
+
+    @staticmethod
+    def _doc_id(source: str, chunk_hash: str) -> str:
+        return hashlib.sha256(f"{source}::{chunk_hash}".encode("utf-8")).hexdigest()[:32]
+
+    def file_hash(self, source: str) -> Optional[str]:
+        """Hash of the content indexed under this source, or None."""
+        return self._manifest["files"].get(source, {}).get("file_hash")
+
+    def is_indexed(self, source: str, file_hash: str) -> bool:
+        """
+        True when this exact content is already in this index, under this or any other source
+        (uploads get random names, so a re-upload is a new source), so it can be skipped before parsing.
+        """
+        if self.file_hash(source) == file_hash:
+            return True
+        return any(e.get("file_hash") == file_hash for e in self._manifest["files"].values())
+
+    # -----------------------------------------------------------
+    # index mutation
+    # -----------------------------------------------------------
+    def embed_texts(self, texts: List[str]) -> List[List[float]]:
+        """Embed chunk texts with the index's model, e.g. ahead of add_embedded() on another thread."""
+        vectors = self.emb.embed_documents(texts)
+        self.embed_calls += 1
+        self.embedded_texts += len(texts)
+        log.info(f"Chunks embedded, count={len(texts)}, embed_calls={self.embed_calls}")
+        return vectors
 
+    def _apply(
+            self,
+            ids: List[str],
+            texts: List[str],
+            metadatas: List[dict],
+            vectors: Optional[np.ndarray],
+            removed: List[str],
+            files: Dict[str, Any],
+    ) -> None:
+        """Apply one change set to the in-memory index; re-applying it (WAL replay) is a no-op."""
+        keep = [i for i, doc_id in enumerate(ids) if doc_id not in self._ids]
+        if keep:
+            pairs = [(texts[i], vectors[i].tolist()) for i in keep]
+            metas = [metadatas[i] for i in keep]
+            new_ids = [ids[i] for i in keep]
+            if self.vs is None:
+                self.vs = self._new_store(vectors.shape[1])
+            self.vs.add_embeddings(pairs, metadatas=metas, ids=new_ids)
+            self._ids.update(new_ids)
+
+        removed = [i for i in removed if i in self._ids]
+        if removed:
+            self._remove(removed)
+            self._ids.difference_update(removed)
+
+        self._manifest["files"].update(files)
+
+    def _remove(self, doc_ids: List[str]) -> None:
+        # FAISS.delete() relies on remove_ids compacting positions, which only flat indexes do
+        drop = set(doc_ids)
+        positions = [i for i, doc_id in self.vs.index_to_docstore_id.items() if doc_id in drop]
+        self.vs.index = remove_positions(self.vs.index, positions, self.index_settings)
+        self.vs.docstore.delete(doc_ids)
+        remaining = [doc_id for _, doc_id in sorted(self.vs.index_to_docstore_id.items()) if doc_id not in drop]
+        self.vs.index_to_docstore_id = dict(enumerate(remaining))
+
+    def _maybe_retrain(self) -> None:
+        """Switch to the configured index layout once there are enough vectors, and retrain IVF/int8 on growth."""
+        settings = self.index_settings
+        index = self.vs.index
+        n = index.ntotal
+        state = self._manifest.get("index", {})
+        current, target = index_layout(index), layout(settings)
+        if current != target:
+            if n < min_vectors(settings):
+                return
+            reason = "switch"
+        elif is_trained_layout(settings) and n >= float(settings["retrain_growth"]) * state.get("trained_on", n):
+            reason = "growth"
+        else:
+            return
+        log.info(f"FAISS index rebuild started, reason={reason}, from={current}, to={target}, vectors={n}")
+        # positions are unchanged by a full rebuild, so index_to_docstore_id stays valid
+        self.vs.index = rebuild_index(index, settings)
+        self._manifest["index"] = {"type": target, "trained_on": n}
+
+    def _new_store(self, dim: int) -> FAISS:
+        return FAISS(self.emb, initial_index(self.index_settings, dim), CompactDocstore(), {})
+
+    def _commit(
+            self,
+            ids: List[str],
+            texts: List[str],
+            metadatas: List[dict],
+            removed: List[str],
+            files: Dict[str, Any],
+            vectors: Optional[List[List[float]]] = None,
+    ) -> None:
+        """Embed new chunks once (unless given their vectors), apply the change set and append it to the WAL."""
+        if texts and vectors is None:
+            vectors = self.embed_texts(texts)
+        vectors = np.asarray(vectors, dtype=np.float32) if texts else None
+        self._apply(ids, texts, metadatas, vectors, removed, files)
+        self.wal.append(
+            {"ids": ids, "texts": texts, "metadatas": metadatas, "removed": removed, "files": files},
+            vectors,
+        )
+        self._pending_vectors += len(ids)
+        if self._pending_vectors >= self.snapshot_every:
+            self.flush()
+
+    def _plan(self, source: str, docs: List[Document], known: Dict[str, str]) -> Tuple[Dict[str, str], List[Tuple[str, Document]]]:
+        """Split a file's chunks into the full chunk map and the chunks that still need embedding."""
+        chunk_map: Dict[str, str] = {}
+        new: List[Tuple[str, Document]] = []
         for d in docs:
-            key = self._fingerprint(d.page_content, d.metadata or {})
-            if key in self._meta["rows"]:
+            h = self.fingerprint(d.page_content)
+            if h in chunk_map:
+                continue
+            chunk_map[h] = known.get(h) or self._doc_id(source, h)
+            if h not in known:
+                new.append((chunk_map[h], d))
+        return chunk_map, new
+
+    def _require_open(self, caller: str) -> None:
+        if not self._opened and self._has_state():
+            raise RuntimeError(f"Call load_or_create() before {caller}().")
+
+    def sync_files(self, files: List[Tuple[str, str, List[Document]]]) -> Tuple[int, int]:
+        """
+        Bring the index in line with the given files, each as (source, file_hash, chunks).
+        Only chunks the manifest has not seen are embedded; chunks that disappeared
+        from a changed file are deleted from FAISS. Files without chunks (nothing could be
+        parsed) are left as they are. Returns (added, removed).
+        """
+        self._require_open("sync_files")
+
+        to_add: List[Tuple[str, Document]] = []
+        to_remove: List[str] = []
+        updates: Dict[str, Dict[str, Any]] = {}
+
+        for source, file_hash, docs in files:
+            entry = self._manifest["files"].get(source, {})
+            if entry.get("file_hash") == file_hash:
+                continue
+            if not docs:
+                log.warning(f"File has no chunks, index entry kept, source={source}")
                 continue
-            self._meta["rows"][key] = True
-            new_docs.append(d)
+            known = entry.get("chunks", {})
+            chunk_map, new = self._plan(source, docs, known)
+            to_add.extend(new)
+            to_remove.extend(doc_id for h, doc_id in known.items() if h not in chunk_map)
+            updates[source] = {"file_hash": file_hash, "chunks": chunk_map}
 
-        if new_docs:
-            self.vs.add_documents(new_docs)
-            self.vs.save_local(str(self.index_dir))
-            self._save_meta()
-        return len(new_docs)
+        if updates:
+            with self._lock:
+                self._commit(
+                    [doc_id for doc_id, _ in to_add],
+                    [d.page_content for _, d in to_add],
+                    [d.metadata for _, d in to_add],
+                    to_remove,
+                    updates,
+                )
+        log.info(f"Files synced, files={len(updates)}, added={len(to_add)}, removed={len(to_remove)}")
+        return len(to_add), len(to_remove)
+
+    def sync_file(self, source: str, file_hash: str, docs: List[Document]) -> Tuple[int, int]:
+        return self.sync_files([(source, file_hash, docs)])
+
+    def plan_new_documents(self, docs: List[Document]) -> List[Tuple[str, Document]]:
+        """Return (docstore id, chunk) for the chunks that are not in the index yet."""
+        new_docs: List[Tuple[str, Document]] = []
+        seen: set = set()
+        with self._lock:
+            for d in docs:
+                source = self._source_of(d.metadata or {})
+                known = self._manifest["files"].get(source, {}).get("chunks", {})
+                h = self.fingerprint(d.page_content)
+                doc_id = known.get(h) or self._doc_id(source, h)
+                if h in known or doc_id in self._ids or doc_id in seen:
+                    continue
+                seen.add(doc_id)
+                new_docs.append((doc_id, d))
+        return new_docs
+
+    def add_embedded(self, planned: List[Tuple[str, Document]], vectors: Optional[List[List[float]]] = None) -> int:
+        """Add planned chunks, embedding them here unless the caller already did."""
+        if not planned:
+            return 0
+        with self._lock:
+            # manifest entries are merged at commit time, so batches planned concurrently do not overwrite each other
+            updates: Dict[str, Dict[str, Any]] = {}
+            for doc_id, d in planned:
+                source = self._source_of(d.metadata or {})
+                if source not in updates:
+                    entry = self._manifest["files"].get(source, {"file_hash": None, "chunks": {}})
+                    updates[source] = {"file_hash": entry.get("file_hash"), "chunks": dict(entry["chunks"])}
+                updates[source]["chunks"][self.fingerprint(d.page_content)] = doc_id
+
+            self._commit(
+                [doc_id for doc_id, _ in planned],
+                [d.page_content for _, d in planned],
+                [d.metadata for _, d in planned],
+                [],
+                updates,
+                vectors=vectors,
+            )
+        return len(planned)
+
+    def mark_file(self, source: str, file_hash: str, keep: Optional[Iterable[str]] = None) -> int:
+        """
+        Record that every chunk of `source` is in, so the same content is skipped next time.
+        With `keep`, the fingerprints of this version's chunks, chunks that disappeared from the
+        file are deleted as sync_files() does. Returns the number of chunks removed.
+        """
+        with self._lock:
+            chunks = self._manifest["files"].get(source, {}).get("chunks", {})
+            removed: List[str] = []
+            if keep is not None:
+                keep = set(keep)
+                removed = [doc_id for h, doc_id in chunks.items() if h not in keep]
+                chunks = {h: doc_id for h, doc_id in chunks.items() if h in keep}
+            self._commit([], [], [], removed, {source: {"file_hash": file_hash, "chunks": chunks}})
+        return len(removed)
+
+    def attach_file(self, source: str, file_hash: str, docs: List[Document], vectors: np.ndarray) -> int:
+        """Add a file whose chunks were embedded elsewhere (e.g. another session), without embedding."""
+        self._require_open("attach_file")
+        position = {id(d): i for i, d in enumerate(docs)}
+        planned = self.plan_new_documents(docs)
+        added = self.add_embedded(planned, [vectors[position[id(d)]] for _, d in planned])
+        self.mark_file(source, file_hash)
+        return added
+
+    def export_files(self, sources: List[str]) -> Dict[str, Tuple[List[Document], np.ndarray]]:
+        """Chunks of each indexed source with their stored vectors, for reuse by other sessions."""
+        out: Dict[str, Tuple[List[Document], np.ndarray]] = {}
+        if self.vs is None:
+            return out
+        with self._lock:
+            position = {doc_id: i for i, doc_id in self.vs.index_to_docstore_id.items()}
+            for source in sources:
+                ids = [i for i in self._manifest["files"].get(source, {}).get("chunks", {}).values() if i in position]
+                docs = [self.vs.docstore.search(i) for i in ids]
+                if ids:
+                    vectors = np.concatenate(list(iter_vectors(self.vs.index, np.array([position[i] for i in ids], dtype=np.int64))))
+                else:
+                    vectors = np.zeros((0, self.vs.index.d), dtype=np.float32)
+                out[source] = (docs, vectors)
+        return out
+
+    def add_documents(self, docs: List[Document]):
+        """Add chunks that are not in the index yet; nothing is removed."""
+        self._require_open("add_documents")
+        return self.add_embedded(self.plan_new_documents(docs))
 
     def load_or_create(self,texts:Optional[List[str]]=None, metadatas: Optional[List[dict]] = None):
         ## if we running first time then it will not go in this block
-        if self._exists():
+        if self._exists() and has_mapped_docstore(self.index_dir):
+            docstore = CompactDocstore(self.index_dir)
+            index = faiss.read_index(str(self.index_dir / "index.faiss"))
+            apply_search_params(index, self.index_settings)
+            ids = [i.decode("utf-8") for i in docstore.snapshot_ids]
+            self.vs = FAISS(self.emb, index, docstore, dict(enumerate(ids)))
+            self._ids = set(ids)
+        elif self._exists():
+            # legacy snapshot: unpickled once, the next flush writes the compact docstore
             self.vs = FAISS.load_local(
                 str(self.index_dir),
                 embeddings=self.emb,
                 allow_dangerous_deserialization=True,
             )
-            return self.vs
+            self._ids = set(self.vs.index_to_docstore_id.values())
 
+        # changes logged after the last snapshot are replayed on top of it
+        replayed = 0
+        for record, vectors in self.wal.records():
+            self._apply(
+                record["ids"], record["texts"], record["metadatas"], vectors,
+                record["removed"], record["files"],
+            )
+            replayed += len(record["ids"])
+        if replayed:
+            self._pending_vectors = replayed
+            log.info(f"WAL replayed, vectors={replayed}, index={str(self.index_dir)}")
+        self._opened = True
 
-        if not texts:
-            raise ProjectException("No existing FAISS index and no data to create one", sys)
-        self.vs = FAISS.from_texts(texts=texts, embedding=self.emb, metadatas=metadatas or [])
-        self.vs.save_local(str(self.index_dir))
+        # nothing on disk yet: the index is created lazily from the first batch
+        # that reaches add_documents(), so no chunk is embedded twice
+        if texts and self.vs is None:
+            metadatas = metadatas or [{} for _ in texts]
+            self.add_documents([Document(page_content=t, metadata=m) for t, m in zip(texts, metadatas)])
         return self.vs
 
-
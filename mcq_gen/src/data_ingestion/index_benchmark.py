@@ -0,0 +1,215 @@
+"""
+Recall-vs-latency report of the ANN index types against the flat baseline, and
+(--quantization) index size savings and retriever overlap of fp16/int8 storage.
+
+    python -m mcq_gen.src.data_ingestion.index_benchmark --index-dir faiss_index/<session>
+    python -m mcq_gen.src.data_ingestion.index_benchmark --synthetic 200000 --dim 1024
+    python -m mcq_gen.src.data_ingestion.index_benchmark --synthetic 50000 --quantization
+"""
+import argparse
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import faiss
+import numpy as np
+from langchain_community.vectorstores.utils import maximal_marginal_relevance
+
+from mcq_gen.src.data_ingestion.index_factory import index_settings, iter_vectors, new_index
+from mcq_gen.utils.config_loader import load_config
+
+
+def synthetic_vectors(n: int, dim: int, clusters: int = 256, seed: int = 0) -> np.ndarray:
+    """Clustered gaussian data; uniform noise would make every ANN index look bad."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    x = centers[rng.integers(0, clusters, size=n)] + 0.3 * rng.normal(size=(n, dim)).astype(np.float32)
+    return np.ascontiguousarray(x, dtype=np.float32)
+
+
+def _timed_search(index: faiss.Index, queries: np.ndarray, k: int):
+    start = time.perf_counter()
+    _, labels = index.search(queries, k)
+    return labels, (time.perf_counter() - start) / len(queries)
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(set(f[f >= 0]) & set(t)) for f, t in zip(found, truth))
+    return hits / float(truth.size) if truth.size else 0.0
+
+
+def benchmark_index_types(
+        vectors: np.ndarray,
+        queries: np.ndarray,
+        k: int = 10,
+        variants: Optional[List[Dict[str, Any]]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Build each variant (an `index:` settings dict) over `vectors` and compare its top-k for
+    `queries` with exact flat search. Returns one row per variant and search parameter.
+    """
+    dim = vectors.shape[1]
+    flat = faiss.IndexFlatL2(dim)
+    flat.add(vectors)
+    truth, flat_latency = _timed_search(flat, queries, k)
+    rows = [{"type": "flat", "param": "-", "build_s": 0.0, "recall": 1.0, "latency_ms": flat_latency * 1000}]
+
+    for variant in variants or default_variants(len(vectors), dim):
+        settings = index_settings(variant)
+        start = time.perf_counter()
+        index = new_index(settings, dim)
+        if not index.is_trained:
+            sample = vectors[: int(settings["max_train_vectors"])]
+            index.train(sample)
+        index.add(vectors)
+        build = time.perf_counter() - start
+
+        if isinstance(index, faiss.IndexIVF):
+            name, values = "nprobe", sorted({1, 4, int(settings["nprobe"]), 64} & set(range(1, index.nlist + 1)))
+        elif isinstance(index, faiss.IndexHNSW):
+            name, values = "ef_search", sorted({16, int(settings["ef_search"]), 128})
+        else:
+            name, values = "-", [None]
+        for value in values:
+            if name == "nprobe":
+                index.nprobe = value
+            elif name == "ef_search":
+                index.hnsw.efSearch = value
+            found, latency = _timed_search(index, queries, k)
+            rows.append({
+                "type": settings["type"],
+                "param": f"{name}={value}" if value is not None else "-",
+                "build_s": build,
+                "recall": recall_at_k(found, truth),
+                "latency_ms": latency * 1000,
+            })
+    return rows
+
+
+def default_variants(n: int, dim: int) -> List[Dict[str, Any]]:
+    nlist = max(1, min(4096, int(4 * np.sqrt(n))))
+    pq_m = next(m for m in (64, 32, 16, 8, 4, 2, 1) if dim % m == 0)
+    return [
+        {"type": "ivf_flat", "nlist": nlist},
+        {"type": "ivf_pq", "nlist": nlist, "pq_m": pq_m},
+        {"type": "hnsw"},
+    ]
+
+
+def format_report(rows: List[Dict[str, Any]]) -> str:
+    lines = [f"{'type':<10} {'param':<14} {'build s':>8} {'recall@k':>9} {'ms/query':>9} {'speedup':>8}"]
+    base = rows[0]["latency_ms"]
+    for r in rows:
+        speedup = base / r["latency_ms"] if r["latency_ms"] else float("inf")
+        lines.append(
+            f"{r['type']:<10} {r['param']:<14} {r['build_s']:>8.2f} {r['recall']:>9.3f} {r['latency_ms']:>9.3f} {speedup:>7.1f}x"
+        )
+    return "\n".join(lines)
+
+
+def _retrieve(index: faiss.Index, query: np.ndarray, retriever: Dict[str, Any]) -> List[int]:
+    # the same steps FAISS.as_retriever() takes for the MCQGenRAG search settings
+    k = int(retriever.get("top_k", 10))
+    if retriever.get("search_type", "similarity") == "mmr":
+        _, labels = index.search(query[None, :], int(retriever.get("fetch_k", 20)))
+        candidates = [int(i) for i in labels[0] if i != -1]
+        if not candidates:
+            return []
+        vectors = index.reconstruct_batch(np.array(candidates, dtype=np.int64))
+        picked = maximal_marginal_relevance(query, vectors, k=k, lambda_mult=float(retriever.get("lambda_mult", 0.5)))
+        return [candidates[i] for i in picked]
+    _, labels = index.search(query[None, :], k)
+    return [int(i) for i in labels[0] if i != -1]
+
+
+def quantization_report(
+        vectors: np.ndarray,
+        queries: np.ndarray,
+        retriever: Dict[str, Any],
+        variants: Optional[List[Dict[str, Any]]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Serialized size of each storage variant against float32, and how many of the chunks the
+    retriever returns with exact vectors it still returns (overlap, 1.0 = identical).
+    The size covers everything faiss.read_index() loads, the rerank float32 copy included.
+    """
+    dim = vectors.shape[1]
+    exact = faiss.IndexFlatL2(dim)
+    exact.add(vectors)
+    truth = [set(_retrieve(exact, q, retriever)) for q in queries]
+    base_bytes = len(faiss.serialize_index(exact))
+
+    rows = []
+    for variant in variants or [
+        {"quantization": "none"},
+        {"quantization": "fp16"},
+        {"quantization": "int8"},
+        {"quantization": "int8", "rerank": True},
+    ]:
+        settings = index_settings(variant)
+        index = new_index(settings, dim)
+        if not index.is_trained:
+            index.train(vectors[: int(settings["max_train_vectors"])])
+        index.add(vectors)
+        disk = len(faiss.serialize_index(index))
+        found = [set(_retrieve(index, q, retriever)) for q in queries]
+        overlap = [len(f & t) / float(len(t)) for f, t in zip(found, truth) if t]
+        rows.append({
+            "variant": f"{settings['quantization']}{'+rerank' if settings['rerank'] else ''}",
+            "bytes_per_vector": disk / float(len(vectors)),
+            "disk_mb": disk / 1e6,
+            "saved": 1.0 - disk / float(base_bytes),
+            "overlap": float(np.mean(overlap)) if overlap else 1.0,
+        })
+    return rows
+
+
+def format_quantization_report(rows: List[Dict[str, Any]]) -> str:
+    lines = [f"{'variant':<12} {'B/vector':>9} {'disk MB':>9} {'saved':>8} {'overlap':>8}"]
+    for r in rows:
+        lines.append(
+            f"{r['variant']:<12} {r['bytes_per_vector']:>9.1f} {r['disk_mb']:>9.2f} {r['saved']:>8.0%} {r['overlap']:>8.3f}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--index-dir", type=Path, help="benchmark the vectors of an existing FaissManager index")
+    parser.add_argument("--synthetic", type=int, default=100000, help="number of synthetic vectors otherwise")
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--quantization", action="store_true", help="report fp16/int8 storage instead of index types")
+    args = parser.parse_args(argv)
+
+    if args.index_dir:
+        index = faiss.read_index(str(args.index_dir / "index.faiss"))
+        vectors = np.concatenate(list(iter_vectors(index)))
+    else:
+        vectors = synthetic_vectors(args.synthetic, args.dim)
+    rng = np.random.default_rng(1)
+    # queries near stored vectors, like a topic close to a chunk
+    picks = rng.integers(0, len(vectors), size=args.queries)
+    queries = vectors[picks] + 0.1 * rng.normal(size=(args.queries, vectors.shape[1])).astype(np.float32)
+
+    queries = np.ascontiguousarray(queries, dtype=np.float32)
+    config = load_config()
+    if args.quantization:
+        retriever = config.get("retriever", {})
+        rows = quantization_report(vectors, queries, retriever)
+        print(f"vectors={len(vectors)}, dim={vectors.shape[1]}, queries={args.queries}, retriever={retriever}")
+        print(format_quantization_report(rows))
+        return
+
+    configured = index_settings(config.get("index"))
+    variants = default_variants(len(vectors), vectors.shape[1])
+    if configured["type"] != "flat":
+        variants.append({k: v for k, v in configured.items() if k != "min_vectors"})
+    rows = benchmark_index_types(vectors, queries, args.k, variants)
+    print(f"vectors={len(vectors)}, dim={vectors.shape[1]}, queries={args.queries}, k={args.k}")
+    print(format_report(rows))
+
+
+if __name__ == "__main__":
+    main()
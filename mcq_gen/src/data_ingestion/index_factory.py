@@ -0,0 +1,239 @@
+from typing import Any, Dict, Iterator, List, Optional
+
+import faiss
+import numpy as np
+
+from mcq_gen.logger import logging as log
+
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+
+# scalar quantizers for the stored vectors; ivf_pq already compresses them with PQ
+QUANTIZERS = {
+    "fp16": faiss.ScalarQuantizer.QT_fp16,  # 2 bytes per dim, no training
+    "int8": faiss.ScalarQuantizer.QT_8bit,  # 1 byte per dim, per-dim ranges trained on a sample
+}
+
+# int8 ranges are trained on the first vectors, a flat index is used until there are this many
+SQ_TRAIN_MIN = 1000
+
+DEFAULT_INDEX_SETTINGS: Dict[str, Any] = {
+    "type": "flat",
+    "nlist": 1024,          # IVF coarse centroids
+    "pq_m": 64,             # IVF-PQ sub-quantizers, must divide the embedding dim
+    "pq_bits": 8,
+    "hnsw_m": 32,           # HNSW neighbours per node
+    "ef_construction": 40,
+    "nprobe": 16,           # IVF lists scanned per query
+    "ef_search": 64,        # HNSW candidate list per query
+    "quantization": "none", # none | fp16 | int8 scalar quantization of the stored vectors
+    "rerank": False,        # keep exact float32 vectors and re-score the top candidates with them
+    "rerank_factor": 4,     # candidates fetched per requested result when reranking
+    "min_vectors": None,    # stay flat below this; defaults to 39 * nlist for IVF, 0 for HNSW
+    "retrain_growth": 4.0,  # retrain once the index holds this many times its training size
+    "max_train_vectors": 100000,
+}
+
+# vectors moved per reconstruct/add call while rebuilding
+REBUILD_BATCH = 65536
+
+
+def index_settings(cfg: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """config.yaml `index:` section merged over the defaults."""
+    settings = {**DEFAULT_INDEX_SETTINGS, **(cfg or {})}
+    settings["type"] = str(settings["type"]).lower()
+    if settings["type"] not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type {settings['type']!r}, expected one of {INDEX_TYPES}")
+    settings["quantization"] = str(settings["quantization"] or "none").lower()
+    if settings["quantization"] not in ("none", *QUANTIZERS):
+        raise ValueError(f"Unknown quantization {settings['quantization']!r}, expected none, fp16 or int8")
+    if settings["type"] == "ivf_pq":
+        settings["quantization"] = "none"
+    settings["rerank"] = bool(settings["rerank"])
+    return settings
+
+
+def layout(settings: Dict[str, Any]) -> str:
+    """Type, quantization and rerank of the configured index, e.g. "hnsw+int8+rerank"."""
+    parts = [settings["type"]]
+    if settings["quantization"] != "none":
+        parts.append(settings["quantization"])
+    if settings["rerank"]:
+        parts.append("rerank")
+    return "+".join(parts)
+
+
+def index_layout(index: faiss.Index) -> str:
+    """layout() of an existing index."""
+    base = unwrap(index)
+    parts = [index_type_of(base)]
+    sq = None
+    if isinstance(base, (faiss.IndexScalarQuantizer, faiss.IndexIVFScalarQuantizer)):
+        sq = base.sq
+    elif isinstance(base, faiss.IndexHNSW):
+        storage = faiss.downcast_index(base.storage)
+        sq = storage.sq if isinstance(storage, faiss.IndexScalarQuantizer) else None
+    for name, qtype in QUANTIZERS.items():
+        if sq is not None and sq.qtype == qtype:
+            parts.append(name)
+    if isinstance(index, faiss.IndexRefine):
+        parts.append("rerank")
+    return "+".join(parts)
+
+
+def unwrap(index: faiss.Index) -> faiss.Index:
+    """The ANN index inside an exact-rerank wrapper."""
+    if isinstance(index, faiss.IndexRefine):
+        return faiss.downcast_index(index.base_index)
+    return index
+
+
+def is_trained_layout(settings: Dict[str, Any]) -> bool:
+    """Layouts whose quantizers are fitted to the data and drift as it grows."""
+    return settings["type"] in ("ivf_flat", "ivf_pq") or settings["quantization"] == "int8"
+
+
+def min_vectors(settings: Dict[str, Any]) -> int:
+    """Vectors needed before the configured ANN index replaces the flat one."""
+    ivf = settings["type"] in ("ivf_flat", "ivf_pq")
+    floor = int(settings["nlist"]) if ivf else 0
+    if settings.get("min_vectors") is not None:
+        # k-means cannot train fewer points than centroids
+        return max(int(settings["min_vectors"]), floor)
+    if ivf:
+        # FAISS wants ~39 points per centroid for k-means
+        return 39 * floor
+    return SQ_TRAIN_MIN if settings["quantization"] == "int8" else 0
+
+
+def index_type_of(index: faiss.Index) -> str:
+    index = unwrap(index)
+    if isinstance(index, faiss.IndexIVFPQ):
+        return "ivf_pq"
+    if isinstance(index, faiss.IndexIVF):
+        return "ivf_flat"
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    return "flat"
+
+
+def new_index(settings: Dict[str, Any], dim: int) -> faiss.Index:
+    """An empty index of the configured layout (untrained for IVF and int8)."""
+    kind = settings["type"]
+    qtype = QUANTIZERS.get(settings["quantization"])
+    if kind == "ivf_flat" and qtype is not None:
+        index = faiss.IndexIVFScalarQuantizer(faiss.IndexFlatL2(dim), dim, int(settings["nlist"]), qtype)
+    elif kind == "ivf_flat":
+        index = faiss.IndexIVFFlat(faiss.IndexFlatL2(dim), dim, int(settings["nlist"]))
+    elif kind == "ivf_pq":
+        index = faiss.IndexIVFPQ(
+            faiss.IndexFlatL2(dim), dim, int(settings["nlist"]), int(settings["pq_m"]), int(settings["pq_bits"])
+        )
+    elif kind == "hnsw":
+        if qtype is not None:
+            index = faiss.IndexHNSWSQ(dim, qtype, int(settings["hnsw_m"]))
+        else:
+            index = faiss.IndexHNSWFlat(dim, int(settings["hnsw_m"]))
+        index.hnsw.efConstruction = int(settings["ef_construction"])
+    elif qtype is not None:
+        index = faiss.IndexScalarQuantizer(dim, qtype)
+    else:
+        index = faiss.IndexFlatL2(dim)
+    if settings["rerank"]:
+        # exact float32 copy next to the codes: rerank costs 4 bytes per dim on top of them, in RAM too
+        index = faiss.IndexRefineFlat(index)
+    apply_search_params(index, settings)
+    return index
+
+
+def apply_search_params(index: faiss.Index, settings: Dict[str, Any]) -> None:
+    """Query-time knobs; they are not build parameters, so they also apply to loaded indexes."""
+    if isinstance(index, faiss.IndexRefine):
+        index.k_factor = float(settings["rerank_factor"])
+    base = unwrap(index)
+    if isinstance(base, faiss.IndexIVF):
+        base.nprobe = int(settings["nprobe"])
+        # MMR reconstructs its candidates, which IVF can only do through a direct map
+        if base.direct_map.type == faiss.DirectMap.NoMap:
+            base.make_direct_map()
+    elif isinstance(base, faiss.IndexHNSW):
+        base.hnsw.efSearch = int(settings["ef_search"])
+
+
+def initial_index(settings: Dict[str, Any], dim: int) -> faiss.Index:
+    """Index for a new store: flat until there are enough vectors for the configured type."""
+    if min_vectors(settings) > 0:
+        return faiss.IndexFlatL2(dim)
+    return new_index(settings, dim)
+
+
+def iter_vectors(index: faiss.Index, positions: Optional[np.ndarray] = None) -> Iterator[np.ndarray]:
+    """Stored vectors in batches (approximate for PQ/SQ unless reranked), for rebuilding into another index."""
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None and ivf.direct_map.type == faiss.DirectMap.NoMap:
+        ivf.make_direct_map()
+    positions = np.arange(index.ntotal, dtype=np.int64) if positions is None else positions
+    for start in range(0, len(positions), REBUILD_BATCH):
+        yield index.reconstruct_batch(np.ascontiguousarray(positions[start:start + REBUILD_BATCH]))
+
+
+def rebuild_index(
+        index: faiss.Index,
+        settings: Dict[str, Any],
+        keep: Optional[np.ndarray] = None,
+) -> faiss.Index:
+    """
+    Copy the vectors at positions `keep` (default: all) into a new index of the configured
+    type, training it first on a sample of them. Positions are renumbered 0..len(keep)-1.
+    """
+    positions = np.arange(index.ntotal, dtype=np.int64) if keep is None else np.asarray(keep, dtype=np.int64)
+    fresh = new_index(settings, index.d)
+    trained_on = 0
+    if not fresh.is_trained:
+        limit = int(settings["max_train_vectors"])
+        sample = positions
+        if len(positions) > limit:
+            sample = np.sort(np.random.default_rng(0).choice(positions, size=limit, replace=False))
+        train_x = np.concatenate(list(iter_vectors(index, sample))) if len(sample) else np.zeros((0, index.d), "float32")
+        fresh.train(train_x)
+        trained_on = len(train_x)
+    for batch in iter_vectors(index, positions):
+        fresh.add(batch)
+    log.info(
+        f"FAISS index rebuilt, type={settings['type']}, vectors={fresh.ntotal}, trained_on={trained_on}"
+    )
+    return fresh
+
+
+def remove_positions(index: faiss.Index, positions: List[int], settings: Dict[str, Any]) -> faiss.Index:
+    """
+    Drop vectors by FAISS position, keeping the remaining positions contiguous and in order,
+    which is what LangChain's index_to_docstore_id assumes. Returns the index to use afterwards.
+    """
+    drop = np.unique(np.asarray(positions, dtype=np.int64))
+    if not len(drop):
+        return index
+    if isinstance(index, faiss.IndexFlatCodes):
+        # flat codes compact on remove_ids
+        index.remove_ids(drop)
+        return index
+
+    keep = np.setdiff1d(np.arange(index.ntotal, dtype=np.int64), drop)
+    # try_extract_index_ivf() also unwraps IndexRefine, whose refine index cannot remove_ids()
+    ivf = None if isinstance(index, faiss.IndexRefine) else faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        # IVF keeps the labels of the remaining vectors: renumber them in place, no vector is copied
+        old_n = index.ntotal
+        ivf.set_direct_map_type(faiss.DirectMap.NoMap)
+        index.remove_ids(drop)
+        mapping = np.full(old_n, -1, dtype=np.int64)
+        mapping[keep] = np.arange(len(keep), dtype=np.int64)
+        for list_no in range(ivf.nlist):
+            size = ivf.invlists.list_size(list_no)
+            if size:
+                ids = faiss.rev_swig_ptr(ivf.invlists.get_ids(list_no), size)
+                ids[:] = mapping[ids]
+        ivf.make_direct_map()
+        return index
+
+    # an HNSW graph or a rerank wrapper cannot drop entries: rebuild from the remaining vectors
+    return rebuild_index(index, {**settings, "type": index_type_of(unwrap(index))}, keep)
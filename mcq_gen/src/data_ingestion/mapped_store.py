@@ -0,0 +1,272 @@
+import io
+import json
+import mmap
+from array import array
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Union
+
+import faiss
+import numpy as np
+from langchain_community.docstore.base import AddableMixin, Docstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+from mcq_gen.logger import logging as log
+
+# files of the compact docstore, row i belongs to FAISS position i of the same snapshot
+MAPPED_FILES = (
+    "docstore.ids.npy",           # docstore id per row, fixed-width bytes
+    "docstore.sorted_ids.npy",    # the same ids sorted, for binary search
+    "docstore.sorted_rows.npy",   # row of each sorted id
+    "docstore.offsets.npy",       # n + 1 offsets into texts.bin
+    "docstore.texts.bin",         # utf-8 page_content of every row, back to back
+    "docstore.meta_rows.npy",     # interned metadata id per row
+    "docstore.meta_offsets.npy",  # m + 1 offsets into meta.bin
+    "docstore.meta.bin",          # each distinct metadata dict once, as json
+)
+
+
+def _npy_bytes(arr: np.ndarray) -> bytes:
+    buf = io.BytesIO()
+    np.save(buf, arr, allow_pickle=False)
+    return buf.getvalue()
+
+
+def _meta_key(metadata: dict) -> bytes:
+    # sorted keys, so equal dicts intern to the same entry
+    return json.dumps(metadata, ensure_ascii=False, sort_keys=True, default=str).encode("utf-8")
+
+
+def _map_bytes(path: Path) -> Union[mmap.mmap, bytes]:
+    if path.stat().st_size == 0:
+        return b""
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def has_mapped_docstore(folder: Path) -> bool:
+    return all((Path(folder) / name).exists() for name in MAPPED_FILES)
+
+
+class _Snapshot:
+    """Read-only view over the compact docstore files of one snapshot."""
+
+    def __init__(self, folder: Path):
+        folder = Path(folder)
+        self.ids = np.load(folder / "docstore.ids.npy", mmap_mode="r")
+        self.sorted_ids = np.load(folder / "docstore.sorted_ids.npy", mmap_mode="r")
+        self.sorted_rows = np.load(folder / "docstore.sorted_rows.npy", mmap_mode="r")
+        self.offsets = np.load(folder / "docstore.offsets.npy", mmap_mode="r")
+        self.texts = _map_bytes(folder / "docstore.texts.bin")
+        self.meta_rows = np.load(folder / "docstore.meta_rows.npy", mmap_mode="r")
+        self.meta_offsets = np.load(folder / "docstore.meta_offsets.npy", mmap_mode="r")
+        self.metas = _map_bytes(folder / "docstore.meta.bin")
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def row_of(self, doc_id: str) -> int:
+        key = doc_id.encode("utf-8")
+        if not len(self.sorted_ids) or len(key) > self.sorted_ids.dtype.itemsize:
+            return -1
+        pos = int(np.searchsorted(self.sorted_ids, np.array(key, dtype=self.sorted_ids.dtype)))
+        if pos < len(self.sorted_ids) and self.sorted_ids[pos] == key:
+            return int(self.sorted_rows[pos])
+        return -1
+
+    def text(self, row: int) -> bytes:
+        return self.texts[int(self.offsets[row]):int(self.offsets[row + 1])]
+
+    def meta(self, meta_id: int) -> bytes:
+        return self.metas[int(self.meta_offsets[meta_id]):int(self.meta_offsets[meta_id + 1])]
+
+
+class MappedIds(Mapping):
+    """Read-only FAISS position -> docstore id view over the mapped ids array."""
+
+    def __init__(self, ids: np.ndarray):
+        self._ids = ids
+
+    def __getitem__(self, i: int) -> str:
+        if not 0 <= int(i) < len(self._ids):
+            raise KeyError(i)
+        return self._ids[int(i)].decode("utf-8")
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(range(len(self._ids)))
+
+
+class CompactDocstore(Docstore, AddableMixin):
+    """
+    Docstore kept as bytes instead of Document objects, replacing the pickled InMemoryDocstore:
+    - the last snapshot is memory-mapped (text blob + offsets, interned metadata), nothing is unpickled
+    - chunks added since then are appended to in-memory byte buffers
+    - deleted ids are tombstoned until the next snapshot rewrites the files
+    Documents are only decoded when searched.
+    """
+
+    def __init__(self, folder: Optional[Path] = None):
+        self._base = _Snapshot(folder) if folder is not None else None
+        self._deleted: set = set()
+        # rows added since the snapshot
+        self._rows: Dict[str, int] = {}
+        self._texts = bytearray()
+        self._offsets = array("q", [0])
+        self._meta_rows = array("i")
+        self._metas: List[bytes] = []
+        self._meta_index: Dict[bytes, int] = {}
+
+    @property
+    def snapshot_ids(self) -> np.ndarray:
+        """Docstore ids of the opened snapshot, in FAISS position order."""
+        return self._base.ids if self._base is not None else np.array([], dtype="S1")
+
+    def close(self) -> None:
+        """
+        Drop the mapped snapshot so its files can be replaced: Windows refuses to rename over a
+        mapped file. The arrays are unmapped once the last reference goes; Documents are copies.
+        """
+        self._base = None
+
+    def _intern(self, metadata: dict) -> int:
+        key = _meta_key(metadata)
+        meta_id = self._meta_index.get(key)
+        if meta_id is None:
+            meta_id = self._meta_index[key] = len(self._metas)
+            self._metas.append(key)
+        return meta_id
+
+    def _locate(self, doc_id: str):
+        if doc_id in self._rows:
+            return "new", self._rows[doc_id]
+        if doc_id in self._deleted or self._base is None:
+            return None, -1
+        row = self._base.row_of(doc_id)
+        return ("base", row) if row >= 0 else (None, -1)
+
+    def _raw(self, doc_id: str):
+        where, row = self._locate(doc_id)
+        if where == "new":
+            text = self._texts[self._offsets[row]:self._offsets[row + 1]]
+            return bytes(text), self._metas[self._meta_rows[row]]
+        if where == "base":
+            return self._base.text(row), self._base.meta(int(self._base.meta_rows[row]))
+        return None
+
+    def __contains__(self, doc_id: str) -> bool:
+        return self._locate(doc_id)[0] is not None
+
+    def add(self, texts: Dict[str, Document]) -> None:
+        overlapping = [doc_id for doc_id in texts if doc_id in self]
+        if overlapping:
+            raise ValueError(f"Tried to add ids that already exist: {overlapping}")
+        for doc_id, doc in texts.items():
+            self._texts += doc.page_content.encode("utf-8")
+            self._rows[doc_id] = len(self._offsets) - 1
+            self._offsets.append(len(self._texts))
+            self._meta_rows.append(self._intern(doc.metadata or {}))
+
+    def delete(self, ids: List) -> None:
+        missing = [doc_id for doc_id in ids if doc_id not in self]
+        if missing:
+            raise ValueError(f"Tried to delete ids that does not exist: {missing}")
+        for doc_id in ids:
+            # bytes of deleted rows are dropped when the next snapshot is written
+            if self._rows.pop(doc_id, None) is None:
+                self._deleted.add(doc_id)
+
+    def search(self, search: str) -> Union[str, Document]:
+        raw = self._raw(search)
+        if raw is None:
+            return f"ID {search} not found."
+        text, meta = raw
+        return Document(id=search, page_content=text.decode("utf-8"), metadata=json.loads(meta))
+
+    def document(self, row: int) -> Document:
+        """Document at a FAISS position of the opened snapshot, without an id lookup."""
+        doc_id = self._base.ids[row].decode("utf-8")
+        return Document(
+            id=doc_id,
+            page_content=self._base.text(row).decode("utf-8"),
+            metadata=json.loads(self._base.meta(int(self._base.meta_rows[row]))),
+        )
+
+    def encode(self, index_to_docstore_id: Mapping) -> Dict[str, bytes]:
+        """Serialize the live rows in FAISS position order, ready to be staged by a snapshot."""
+        n = len(index_to_docstore_id)
+        ids: List[str] = [index_to_docstore_id[i] for i in range(n)]
+        offsets = np.zeros(n + 1, dtype=np.int64)
+        meta_rows = np.zeros(n, dtype=np.int32)
+        texts = bytearray()
+        metas: List[bytes] = []
+        meta_index: Dict[bytes, int] = {}
+        for row, doc_id in enumerate(ids):
+            raw = self._raw(doc_id)
+            if raw is None:
+                raise KeyError(f"Docstore has no entry for FAISS position {row}, id={doc_id}")
+            text, meta = raw
+            texts += text
+            offsets[row + 1] = len(texts)
+            meta_id = meta_index.get(meta)
+            if meta_id is None:
+                meta_id = meta_index[meta] = len(metas)
+                metas.append(meta)
+            meta_rows[row] = meta_id
+
+        meta_offsets = np.zeros(len(metas) + 1, dtype=np.int64)
+        meta_offsets[1:] = np.cumsum([len(m) for m in metas]) if metas else []
+        width = max((len(i.encode("utf-8")) for i in ids), default=1)
+        id_arr = np.array([i.encode("utf-8") for i in ids], dtype=f"S{width}")
+        order = np.argsort(id_arr, kind="stable").astype(np.int64)
+        return {
+            "docstore.ids.npy": _npy_bytes(id_arr),
+            "docstore.sorted_ids.npy": _npy_bytes(id_arr[order]),
+            "docstore.sorted_rows.npy": _npy_bytes(order),
+            "docstore.offsets.npy": _npy_bytes(offsets),
+            "docstore.texts.bin": bytes(texts),
+            "docstore.meta_rows.npy": _npy_bytes(meta_rows),
+            "docstore.meta_offsets.npy": _npy_bytes(meta_offsets),
+            "docstore.meta.bin": b"".join(metas),
+        }
+
+
+def encode_mapped_docstore(docstore: Docstore, index_to_docstore_id: Mapping) -> Dict[str, bytes]:
+    """Compact files for any docstore, e.g. an InMemoryDocstore loaded from a legacy index.pkl."""
+    if isinstance(docstore, CompactDocstore):
+        return docstore.encode(index_to_docstore_id)
+    compact = CompactDocstore()
+    compact.add({doc_id: docstore.search(doc_id) for doc_id in index_to_docstore_id.values()})
+    return compact.encode(index_to_docstore_id)
+
+
+def read_index_mapped(path: Path):
+    """Open a FAISS index read-only, mapping its vectors instead of copying them into RAM."""
+    for flags in (
+        faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY,
+        faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY,
+    ):
+        try:
+            return faiss.read_index(str(path), flags)
+        except RuntimeError:
+            continue
+    log.warning(f"Index type cannot be memory-mapped, reading into RAM, index={str(path)}")
+    return faiss.read_index(str(path))
+
+
+def load_mapped_vectorstore(folder: str, embeddings, index_name: str = "index", mmap: bool = True) -> FAISS:
+    """
+    Read-side load of a snapshot: the compact docstore is always mapped; with mmap the
+    vectors are mapped read-only too, otherwise index.faiss is read into RAM.
+    """
+    folder = Path(folder)
+    path = folder / f"{index_name}.faiss"
+    index = read_index_mapped(path) if mmap else faiss.read_index(str(path))
+    docstore = CompactDocstore(folder)
+    ids = docstore.snapshot_ids
+    if len(ids) != index.ntotal:
+        raise ValueError(f"Compact docstore has {len(ids)} rows but index has {index.ntotal} vectors")
+    return FAISS(embeddings, index, docstore, MappedIds(ids))
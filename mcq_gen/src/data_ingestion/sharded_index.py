@@ -0,0 +1,227 @@
+import copy
+import heapq
+import itertools
+import json
+import os
+import shutil
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from mcq_gen.src.data_ingestion.faiss_manager import FaissManager
+from mcq_gen.src.data_ingestion.vectorstore_cache import get_vectorstore_cache, load_cached_vectorstore
+from mcq_gen.exception import ProjectException
+from mcq_gen.logger import logging as log
+from mcq_gen.utils.config_loader import load_config
+from mcq_gen.utils.model_loader import ModelLoader, shared_model_loader
+
+REGISTRY_FILE = "shards.json"
+
+
+class ShardedIndex:
+    """
+    Course library split into independent FaissManager shards under root/<shard_id>:
+    - shard_by "source": one shard per document, named after its content hash
+    - shard_by "bucket": documents fill a shard until it holds bucket_size vectors
+    A re-indexed source replaces its previous version: its old document shard is dropped
+    once no other source shares it, and a bucket re-syncs the source in place.
+    Adding or dropping a shard never touches the others. Queries fan out over the
+    selected shards on a thread pool (FAISS releases the GIL) and merge top-k with a heap.
+    shards.json lists the shards with their sources and sizes.
+    """
+
+    def __init__(
+            self,
+            root: Optional[Path] = None,
+            model_loader: Optional[ModelLoader] = None,
+            shard_by: Optional[str] = None,
+            bucket_size: Optional[int] = None,
+            search_workers: Optional[int] = None,
+    ):
+        library = load_config().get("library", {})
+        self.root = Path(root or library.get("root", "faiss_index/library"))
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.shard_by = shard_by or library.get("shard_by", "source")
+        if self.shard_by not in ("source", "bucket"):
+            raise ValueError(f"Unknown shard_by {self.shard_by!r}, expected 'source' or 'bucket'")
+        self.bucket_size = int(bucket_size or library.get("bucket_size", 50000))
+        # the process-wide loader, so shards share its embedding client and caches
+        self.model_loader = model_loader or shared_model_loader()
+        self.emb = self.model_loader.load_embeddings()
+
+        self._lock = threading.RLock()
+        self._pool = ThreadPoolExecutor(
+            max_workers=int(search_workers or library.get("search_workers", 8)),
+            thread_name_prefix="shard-search",
+        )
+        self._registry: Dict[str, Any] = {"shards": {}, "open_bucket": None}
+        path = self.root / REGISTRY_FILE
+        if path.exists():
+            self._registry = json.loads(path.read_text(encoding="utf-8"))
+
+    # -----------------------------------------------------------
+    # registry
+    # -----------------------------------------------------------
+    def _save_registry(self) -> None:
+        path = self.root / REGISTRY_FILE
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_text(json.dumps(self._registry, ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(tmp, path)
+
+    def shard_ids(self) -> List[str]:
+        with self._lock:
+            return sorted(self._registry["shards"])
+
+    def shard_of(self, source: str) -> Optional[str]:
+        with self._lock:
+            for shard_id, info in self._registry["shards"].items():
+                if source in info["sources"]:
+                    return shard_id
+        return None
+
+    def _target_shard(self, file_hash: str) -> str:
+        if self.shard_by == "source":
+            return f"doc_{file_hash[:16]}"
+        open_bucket = self._registry.get("open_bucket")
+        info = self._registry["shards"].get(open_bucket) if open_bucket else None
+        if info is None or info["vectors"] >= self.bucket_size:
+            open_bucket = f"bucket_{len([s for s in self._registry['shards'] if s.startswith('bucket_')]):05d}"
+            while open_bucket in self._registry["shards"]:
+                open_bucket += "_"
+            self._registry["open_bucket"] = open_bucket
+        return open_bucket
+
+    # -----------------------------------------------------------
+    # shard mutation
+    # -----------------------------------------------------------
+    def add_file(self, source: str, file_hash: str, docs: List[Document]) -> str:
+        """Index one document's chunks into its shard and publish it. Returns the shard id."""
+        return self.add_files([(source, file_hash, docs)])[0]
+
+    def add_files(self, files: List[Tuple[str, str, List[Document]]]) -> List[str]:
+        """
+        Index several documents, each as (source, file_hash, chunks), and publish them.
+        Files are assigned to shards first, then every target shard is opened, synced and
+        flushed once for all of its files. Returns the shard id of each file.
+        """
+        with self._lock:
+            # shards are registered as files are assigned: restored if a write fails
+            registry = copy.deepcopy(self._registry)
+            try:
+                shard_ids: List[str] = []
+                groups: Dict[str, List[Tuple[str, str, List[Document]]]] = {}
+                replaced: List[str] = []
+                for source, file_hash, docs in files:
+                    previous = self.shard_of(source)
+                    if self.shard_by == "bucket" and previous is not None:
+                        # sync_files() replaces the old chunks of the source inside its bucket
+                        shard_id = previous
+                    else:
+                        shard_id = self._target_shard(file_hash)
+                        if previous is not None and previous != shard_id:
+                            old = self._registry["shards"][previous]
+                            old["sources"].remove(source)
+                            if not old["sources"]:
+                                replaced.append(previous)
+                    shard_ids.append(shard_id)
+                    info = self._registry["shards"].get(shard_id)
+                    if self.shard_by == "source" and info is not None:
+                        # same content under another name: the shard already holds (or will hold) its chunks
+                        if source not in info["sources"]:
+                            info["sources"].append(source)
+                        continue
+                    groups.setdefault(shard_id, []).append((source, file_hash, docs))
+                    info = self._registry["shards"].setdefault(shard_id, {"sources": [], "vectors": 0})
+                    # an open bucket fills up as files are assigned; the count is corrected after the flush
+                    info["vectors"] += len(docs)
+
+                for shard_id, group in groups.items():
+                    fm = FaissManager(self.root / shard_id, self.model_loader)
+                    fm.load_or_create()
+                    added, _ = fm.sync_files(group)
+                    fm.flush()
+
+                    info = self._registry["shards"][shard_id]
+                    for source, _, _ in group:
+                        if source not in info["sources"]:
+                            info["sources"].append(source)
+                    info["vectors"] = fm.vs.index.ntotal if fm.vs is not None else 0
+                    log.info(f"Library shard updated, shard={shard_id}, files={len(group)}, added={added}, vectors={info['vectors']}")
+                self._save_registry()
+                # old versions stay searchable until the new shards are published
+                for shard_id in replaced:
+                    info = self._registry["shards"].get(shard_id)
+                    # a later file of this batch may have the old content again
+                    if info is not None and not info["sources"]:
+                        self.drop_shard(shard_id)
+                return shard_ids
+            except Exception as e:
+                self._registry = registry
+                log.error(f"Failed to add files to library, error={str(e)}, files={len(files)}")
+                raise ProjectException(f"Failed to add files to library error{str(e)}", sys)
+
+    def drop_shard(self, shard_id: str) -> None:
+        """Remove a shard; the others are left as they are."""
+        with self._lock:
+            if self._registry["shards"].pop(shard_id, None) is None:
+                return
+            if self._registry.get("open_bucket") == shard_id:
+                self._registry["open_bucket"] = None
+            # unregistered first: a crash below leaves an orphan directory, never a dangling entry
+            self._save_registry()
+        get_vectorstore_cache().invalidate(str(self.root / shard_id))
+        shutil.rmtree(self.root / shard_id, ignore_errors=True)
+        log.info(f"Library shard dropped, shard={shard_id}")
+
+    # -----------------------------------------------------------
+    # search
+    # -----------------------------------------------------------
+    def _search_shard(self, shard_id: str, vector: List[float], k: int) -> List[Tuple[float, str, Document]]:
+        vs = load_cached_vectorstore(str(self.root / shard_id), embeddings=self.emb)
+        hits = vs.similarity_search_with_score_by_vector(vector, k=k)
+        return [(float(score), shard_id, doc) for doc, score in hits]
+
+    def search_with_scores(
+            self, query: str, k: int = 5, shards: Optional[Iterable[str]] = None
+    ) -> List[Tuple[Document, float]]:
+        """Top-k (document, L2 distance) over the given shards (default: all), nearest first."""
+        known = set(self.shard_ids())
+        selected = sorted(known if shards is None else set(shards) & known)
+        if not selected:
+            return []
+        # the query is embedded once and shared by every shard
+        vector = self.emb.embed_query(query)
+        per_shard = self._pool.map(lambda s: self._search_shard(s, vector, k), selected)
+        best = heapq.nsmallest(k, itertools.chain.from_iterable(per_shard), key=lambda hit: hit[0])
+        results = []
+        for score, shard_id, doc in best:
+            doc.metadata = {**doc.metadata, "shard": shard_id}
+            results.append((doc, score))
+        log.info(f"Library searched, shards={len(selected)}, k={k}, hits={len(results)}")
+        return results
+
+    def search(self, query: str, k: int = 5, shards: Optional[Iterable[str]] = None) -> List[Document]:
+        return [doc for doc, _ in self.search_with_scores(query, k, shards)]
+
+    def as_retriever(self, k: int = 5, shards: Optional[Iterable[str]] = None) -> "ShardedRetriever":
+        return ShardedRetriever(library=self, k=k, shards=list(shards) if shards is not None else None)
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=True)
+
+
+class ShardedRetriever(BaseRetriever):
+    """LangChain retriever over a ShardedIndex, usable wherever MCQGenRAG takes a retriever."""
+
+    library: Any
+    k: int = 5
+    shards: Optional[List[str]] = None
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        return self.library.search(query, k=self.k, shards=self.shards)
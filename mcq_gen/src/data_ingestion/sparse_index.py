@@ -0,0 +1,240 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_community.vectorstores import FAISS
+
+from mcq_gen.src.data_ingestion.vectorstore_cache import index_signature
+from mcq_gen.logger import logging as log
+from mcq_gen.utils.config_loader import load_config
+
+# postings of the BM25 index, written next to index.faiss; row i is FAISS position i
+SPARSE_FILES = (
+    "bm25.terms.npy",    # vocabulary, sorted fixed-width utf-8, for binary search
+    "bm25.offsets.npy",  # t + 1 offsets into rows/tf, one postings list per term
+    "bm25.rows.npy",     # FAISS position of each posting
+    "bm25.tf.npy",       # term frequency of each posting
+    "bm25.doc_len.npy",  # token count per row
+    "bm25.meta.json",    # rows, avgdl, k1, b and a digest of the docstore ids; written last
+)
+
+# ids_digest of each snapshot on disk, so loading its extras does not rehash every docstore id
+_DIGESTS: "OrderedDict[str, Tuple[Any, str]]" = OrderedDict()
+_DIGESTS_LOCK = threading.Lock()
+DIGEST_ENTRIES = 256
+
+_TOKEN = re.compile(r"\w+(?:[-'.+]\w+)*")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has in is it its of on or that the this to was were with".split()
+)
+
+
+def hybrid_settings() -> Dict[str, Any]:
+    """The `hybrid:` section of config.yaml over its defaults."""
+    cfg = load_config().get("hybrid", {}) or {}
+    return {
+        "enabled": bool(cfg.get("enabled", False)),
+        "rrf_k": int(cfg.get("rrf_k", 60)),
+        "lexical_max_terms": int(cfg.get("lexical_max_terms", 3)),
+        "k1": float(cfg.get("k1", 1.2)),
+        "b": float(cfg.get("b", 0.75)),
+    }
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased word tokens; compounds like "tf-idf" are kept whole and also split into parts."""
+    tokens = []
+    for token in _TOKEN.findall(text.casefold()):
+        if token in _STOPWORDS:
+            continue
+        tokens.append(token)
+        if not token.isalnum():
+            tokens.extend(p for p in re.split(r"[-'.+]", token) if p and p not in _STOPWORDS)
+    return tokens
+
+
+def ids_digest(index_to_docstore_id) -> str:
+    h = hashlib.sha1()
+    for i in range(len(index_to_docstore_id)):
+        h.update(index_to_docstore_id[i].encode("utf-8") + b"\n")
+    return h.hexdigest()
+
+
+def snapshot_ids_digest(folder: Path, vs: FAISS) -> str:
+    """
+    ids_digest() of a store loaded from (or just flushed to) the snapshot in folder, computed
+    once per snapshot: every store of one snapshot has the same docstore ids.
+    """
+    try:
+        sig = (index_signature(str(folder)), vs.index.ntotal)
+    except OSError:
+        # not written to disk yet: nothing to key the digest on
+        return ids_digest(vs.index_to_docstore_id)
+    key = str(Path(folder).resolve())
+    with _DIGESTS_LOCK:
+        hit = _DIGESTS.get(key)
+        if hit is not None and hit[0] == sig:
+            _DIGESTS.move_to_end(key)
+            return hit[1]
+    digest = ids_digest(vs.index_to_docstore_id)
+    with _DIGESTS_LOCK:
+        _DIGESTS[key] = (sig, digest)
+        _DIGESTS.move_to_end(key)
+        while len(_DIGESTS) > DIGEST_ENTRIES:
+            _DIGESTS.popitem(last=False)
+    return digest
+
+
+class BM25Index:
+    """Okapi BM25 over memory-mapped postings arrays; nothing is decoded until a term is looked up."""
+
+    def __init__(self, folder: Path):
+        folder = Path(folder)
+        self.meta = json.loads((folder / "bm25.meta.json").read_text(encoding="utf-8"))
+        self.terms = np.load(folder / "bm25.terms.npy", mmap_mode="r")
+        self.offsets = np.load(folder / "bm25.offsets.npy", mmap_mode="r")
+        self.rows = np.load(folder / "bm25.rows.npy", mmap_mode="r")
+        self.tf = np.load(folder / "bm25.tf.npy", mmap_mode="r")
+        self.doc_len = np.load(folder / "bm25.doc_len.npy", mmap_mode="r")
+        self.n = int(self.meta["rows"])
+        self.k1 = float(self.meta["k1"])
+        self.b = float(self.meta["b"])
+        self.avgdl = float(self.meta["avgdl"]) or 1.0
+
+    def term_id(self, term: str) -> int:
+        key = term.encode("utf-8")
+        if not len(self.terms) or len(key) > self.terms.dtype.itemsize:
+            return -1
+        pos = int(np.searchsorted(self.terms, np.array(key, dtype=self.terms.dtype)))
+        return pos if pos < len(self.terms) and self.terms[pos] == key else -1
+
+    def postings(self, term_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        start, end = int(self.offsets[term_id]), int(self.offsets[term_id + 1])
+        return self.rows[start:end], self.tf[start:end]
+
+    def is_lexical(self, query: str, max_terms: int) -> bool:
+        """
+        Short queries whose every term is in the vocabulary and that some chunk matches in full,
+        e.g. "Viterbi" or "TF-IDF": BM25 alone answers them.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or len(terms) > max_terms:
+            return False
+        common = None
+        for term in terms:
+            term_id = self.term_id(term)
+            if term_id < 0:
+                return False
+            rows = set(self.postings(term_id)[0].tolist())
+            common = rows if common is None else common & rows
+            if not common:
+                return False
+        return True
+
+    def search(self, query: str, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k FAISS positions by BM25 score (best first) and their scores; unmatched rows are left out."""
+        scores = np.zeros(self.n, dtype=np.float32)
+        for term in dict.fromkeys(tokenize(query)):
+            term_id = self.term_id(term)
+            if term_id < 0:
+                continue
+            rows, tf = self.postings(term_id)
+            df = len(rows)
+            idf = np.log(1.0 + (self.n - df + 0.5) / (df + 0.5))
+            tf = tf.astype(np.float32)
+            norm = self.k1 * (1.0 - self.b + self.b * self.doc_len[rows] / self.avgdl)
+            np.add.at(scores, rows, idf * tf * (self.k1 + 1.0) / (tf + norm))
+        hits = np.flatnonzero(scores)
+        if len(hits) > k:
+            hits = hits[np.argpartition(-scores[hits], k - 1)[:k]]
+        order = hits[np.argsort(-scores[hits], kind="stable")]
+        return order, scores[order]
+
+
+def _save_npy(path: Path, arr: np.ndarray) -> None:
+    with open(path, "wb") as f:
+        np.save(f, arr, allow_pickle=False)
+
+
+def build_sparse_index(vs: FAISS, folder: Path, k1: float = 1.2, b: float = 0.75) -> Optional[BM25Index]:
+    """
+    Write BM25 postings for every chunk of the store, in FAISS position order.
+    Skipped when the files already describe the same chunks.
+    """
+    folder = Path(folder)
+    itd = vs.index_to_docstore_id
+    digest = snapshot_ids_digest(folder, vs)
+    meta_path = folder / "bm25.meta.json"
+    if meta_path.exists():
+        current = json.loads(meta_path.read_text(encoding="utf-8"))
+        if current.get("ids_digest") == digest and current.get("k1") == k1 and current.get("b") == b:
+            return BM25Index(folder)
+
+    vocab: Dict[str, int] = {}
+    term_ids: List[int] = []
+    row_ids: List[int] = []
+    tfs: List[int] = []
+    doc_len = np.zeros(len(itd), dtype=np.int32)
+    for row in range(len(itd)):
+        doc = vs.docstore.search(itd[row])
+        tokens = tokenize(getattr(doc, "page_content", ""))
+        doc_len[row] = len(tokens)
+        for term, count in Counter(tokens).items():
+            term_ids.append(vocab.setdefault(term, len(vocab)))
+            row_ids.append(row)
+            tfs.append(count)
+
+    terms = sorted(vocab)
+    width = max((len(t.encode("utf-8")) for t in terms), default=1)
+    # renumber terms by sorted order, then group postings by term (rows stay ascending within a term)
+    rank = np.zeros(len(vocab), dtype=np.int64)
+    rank[[vocab[t] for t in terms]] = np.arange(len(terms))
+    tids = rank[np.asarray(term_ids, dtype=np.int64)]
+    order = np.argsort(tids, kind="stable")
+    offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(np.bincount(tids, minlength=len(terms)))
+
+    arrays = {
+        "bm25.terms.npy": np.array([t.encode("utf-8") for t in terms], dtype=f"S{width}"),
+        "bm25.offsets.npy": offsets,
+        "bm25.rows.npy": np.asarray(row_ids, dtype=np.int32)[order],
+        "bm25.tf.npy": np.minimum(np.asarray(tfs, dtype=np.int64), 65535).astype(np.uint16)[order],
+        "bm25.doc_len.npy": doc_len,
+    }
+    meta = {
+        "rows": len(itd),
+        "avgdl": float(doc_len.mean()) if len(doc_len) else 0.0,
+        "k1": k1,
+        "b": b,
+        "ids_digest": digest,
+    }
+    # the meta file is replaced last: readers never pair new postings with old meta
+    meta_path.unlink(missing_ok=True)
+    for name, arr in arrays.items():
+        tmp = folder / f"{name}.tmp"
+        _save_npy(tmp, arr)
+        os.replace(tmp, folder / name)
+    tmp = folder / "bm25.meta.json.tmp"
+    tmp.write_text(json.dumps(meta), encoding="utf-8")
+    os.replace(tmp, meta_path)
+    log.info(f"BM25 index written, rows={len(itd)}, terms={len(terms)}, postings={len(row_ids)}, index={str(folder)}")
+    return BM25Index(folder)
+
+
+def load_sparse_index(folder: Path, vs: FAISS) -> Optional[BM25Index]:
+    """The BM25 index of a snapshot, or None when it is missing or was built for other chunks."""
+    folder = Path(folder)
+    if not all((folder / name).exists() for name in SPARSE_FILES):
+        return None
+    sparse = BM25Index(folder)
+    # a re-uploaded file can keep the chunk count while every row points at other text
+    if sparse.n != vs.index.ntotal or sparse.meta.get("ids_digest") != snapshot_ids_digest(folder, vs):
+        log.warning(f"BM25 index is stale, rows={sparse.n}, vectors={vs.index.ntotal}, index={str(folder)}")
+        return None
+    return sparse
@@ -0,0 +1,157 @@
+import queue
+import threading
+from pathlib import Path
+from typing import Any, Callable, Iterable, List, Optional, Tuple, Union
+
+from langchain_core.documents import Document
+
+from mcq_gen.src.data_ingestion.faiss_manager import FaissManager
+from mcq_gen.utils.document_ops import iter_documents
+from mcq_gen.utils.file_io import sha256_file
+from mcq_gen.logger import logging as log
+
+_DONE = object()
+
+
+class _Failed:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def _put(q: "queue.Queue", item: Any, stop: threading.Event) -> bool:
+    # blocking put that gives up once the pipeline is being torn down
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get(q: "queue.Queue", stop: Optional[threading.Event] = None) -> Any:
+    # blocking get; with stop, ends like an exhausted stage once the pipeline is being torn down
+    while True:
+        try:
+            item = q.get(timeout=0.1)
+            break
+        except queue.Empty:
+            if stop is not None and stop.is_set():
+                return _DONE
+    if isinstance(item, _Failed):
+        raise item.error
+    return item
+
+
+def _run_stage(target: Callable[[], None], out_q: "queue.Queue", stop: threading.Event, name: str) -> threading.Thread:
+    def run():
+        try:
+            target()
+            _put(out_q, _DONE, stop)
+        except BaseException as e:
+            _put(out_q, _Failed(e), stop)
+
+    t = threading.Thread(target=run, name=name, daemon=True)
+    t.start()
+    return t
+
+
+def stream_ingest(
+        fm: FaissManager,
+        paths: Iterable[Union[Path, Tuple[Path, str]]],
+        split: Callable[[List[Document]], List[Document]],
+        batch_size: int = 64,
+        queue_size: int = 2,
+        attach: Optional[Callable[[Path, str], Optional[Tuple[List[Document], Any]]]] = None,
+        on_file_indexed: Optional[Callable[[str, str], None]] = None,
+) -> Tuple[int, int]:
+    """
+    Ingest files through bounded stages: parse page by page and split -> embed in
+    fixed-size batches -> add to FAISS. Each stage runs on its own thread, so batch N
+    is embedded while batch N+1 is parsed, and at most `queue_size` batches wait between
+    stages: peak memory follows batch_size, not corpus size. Returns (files, chunks added).
+    `attach` may return already-embedded (chunks, vectors) for a file so it skips parsing;
+    `on_file_indexed` is called on the caller's thread once a file is fully in the index.
+    A changed file keeps only the chunks of its new version, as in FaissManager.sync_files().
+    """
+    stop = threading.Event()
+    parsed: "queue.Queue" = queue.Queue(maxsize=queue_size)
+    embedded: "queue.Queue" = queue.Queue(maxsize=queue_size)
+    counts = {"files": 0}
+
+    def parse():
+        batch: List[Document] = []
+        for item in paths:
+            # saved uploads arrive as (path, sha256) with the hash computed during the copy
+            path, file_hash = item if isinstance(item, tuple) else (item, None)
+            file_hash = file_hash or sha256_file(path)
+            if fm.is_indexed(str(path), file_hash):
+                log.info(f"Known file skipped, path={str(path)}")
+                continue
+            counts["files"] += 1
+            pack = attach(path, file_hash) if attach is not None else None
+            if pack is not None:
+                if not _put(parsed, ("attach", (str(path), file_hash, *pack)), stop):
+                    return
+                continue
+            # fingerprints of this version; chunks of an older version missing here are deleted
+            keep = set()
+            for page in iter_documents(path):
+                pieces = split([page])
+                keep.update(fm.fingerprint(d.page_content) for d in pieces)
+                batch.extend(pieces)
+                while len(batch) >= batch_size:
+                    if not _put(parsed, ("chunks", batch[:batch_size]), stop):
+                        return
+                    batch = batch[batch_size:]
+            # chunks of a file are committed before the file is marked as fully indexed
+            if batch and not _put(parsed, ("chunks", batch), stop):
+                return
+            batch = []
+            if not keep:
+                log.warning(f"File has no chunks, index entry kept, path={str(path)}")
+                continue
+            if not _put(parsed, ("file", (str(path), file_hash, keep)), stop):
+                return
+
+    def embed():
+        # ids already sent downstream but maybe not committed yet, so a repeated chunk is embedded once
+        in_flight: set = set()
+        while True:
+            item = _get(parsed, stop)
+            if item is _DONE:
+                return
+            kind, payload = item
+            if kind == "chunks":
+                planned = [(i, d) for i, d in fm.plan_new_documents(payload) if i not in in_flight]
+                in_flight.update(i for i, _ in planned)
+                vectors = fm.embed_texts([d.page_content for _, d in planned]) if planned else []
+                payload = (planned, vectors)
+            if not _put(embedded, (kind, payload), stop):
+                return
+
+    workers = [_run_stage(parse, parsed, stop, "stream-parse"), _run_stage(embed, embedded, stop, "stream-embed")]
+    added = removed = 0
+    try:
+        while True:
+            item = _get(embedded)
+            if item is _DONE:
+                break
+            kind, payload = item
+            if kind == "chunks":
+                planned, vectors = payload
+                added += fm.add_embedded(planned, vectors)
+                continue
+            if kind == "attach":
+                added += fm.attach_file(*payload)
+            else:
+                removed += fm.mark_file(*payload)
+            if on_file_indexed is not None:
+                on_file_indexed(*payload[:2])
+    finally:
+        stop.set()
+        for t in workers:
+            t.join(timeout=5)
+
+    log.info(f"Streaming ingestion completed, files={counts['files']}, added={added}, removed={removed}, embed_calls={fm.embed_calls}")
+    return counts["files"], added
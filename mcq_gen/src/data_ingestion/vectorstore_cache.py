@@ -0,0 +1,163 @@
+import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from langchain_community.vectorstores import FAISS
+
+from mcq_gen.src.data_ingestion.index_factory import apply_search_params, index_settings
+from mcq_gen.src.data_ingestion.mapped_store import MAPPED_FILES, has_mapped_docstore, load_mapped_vectorstore
+from mcq_gen.logger import logging as log
+from mcq_gen.utils.config_loader import load_config
+from mcq_gen.utils.model_loader import shared_model_loader
+
+
+def index_signature(index_path: str, index_name: str = "index") -> Tuple[Tuple[int, int], ...]:
+    """(mtime_ns, size) of the snapshot files; it changes whenever FaissManager writes a new snapshot."""
+    folder = Path(index_path)
+    docstore = MAPPED_FILES if has_mapped_docstore(folder) else (f"{index_name}.pkl",)
+    sig = []
+    for name in (f"{index_name}.faiss", *docstore):
+        st = os.stat(folder / name)
+        sig.append((st.st_mtime_ns, st.st_size))
+    return tuple(sig)
+
+
+class VectorStoreCache:
+    """
+    Process-wide LRU of loaded FAISS stores keyed by index directory.
+    Entries are reloaded when the snapshot on disk changes and evicted,
+    least recently used first, once their on-disk size exceeds max_bytes.
+    A cold load holds only its own index's lock, so hits on other indexes are not blocked by it.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # one lock per index: concurrent misses on the same index load it once
+        self._load_locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _lookup(self, key, sig) -> Optional[FAISS]:
+        entry = self._entries.get(key)
+        if entry is not None and entry["sig"] == sig:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry["vs"]
+        return None
+
+    def get(self, index_path: str, loader: Callable[[], FAISS], index_name: str = "index") -> FAISS:
+        key = (str(Path(index_path).resolve()), index_name)
+        sig = index_signature(index_path, index_name)
+        with self._lock:
+            vs = self._lookup(key, sig)
+            if vs is not None:
+                return vs
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        with load_lock:
+            with self._lock:
+                # loaded by another thread while this one waited
+                vs = self._lookup(key, sig)
+                if vs is not None:
+                    return vs
+                self.misses += 1
+
+            vs = loader()
+
+            with self._lock:
+                if key in self._entries:
+                    # a new snapshot was written since this entry was loaded
+                    self._drop(key)
+                    self.invalidations += 1
+                size = sum(s for _, s in sig)
+                self._entries[key] = {"vs": vs, "sig": sig, "bytes": size}
+                self._bytes += size
+                self._evict(keep=key)
+            return vs
+
+    def _drop(self, key) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry["bytes"]
+
+    def _evict(self, keep) -> None:
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            key = next(iter(self._entries))
+            if key == keep:
+                break
+            self._drop(key)
+            self.evictions += 1
+            log.info(f"Vector store evicted from cache, index={key[0]}")
+
+    def invalidate(self, index_path: str, index_name: str = "index") -> None:
+        with self._lock:
+            key = (str(Path(index_path).resolve()), index_name)
+            if key in self._entries:
+                self._drop(key)
+                self.invalidations += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+@lru_cache(maxsize=1)
+def get_vectorstore_cache() -> VectorStoreCache:
+    serving = load_config().get("serving", {})
+    return VectorStoreCache(max_bytes=int(serving.get("vectorstore_cache_mb", 1024)) * 1024 * 1024)
+
+
+@lru_cache(maxsize=1)
+def shared_embeddings():
+    """Query embeddings shared by every cached store instead of a new ModelLoader per load."""
+    return shared_model_loader().load_embeddings()
+
+
+@lru_cache(maxsize=1)
+def serving_mmap() -> bool:
+    return bool(load_config().get("serving", {}).get("mmap", False))
+
+
+def load_cached_vectorstore(index_path: str, index_name: str = "index", embeddings=None, mmap: Optional[bool] = None) -> FAISS:
+    """
+    Load (or reuse) the FAISS store at index_path. The compact docstore is mapped, never unpickled;
+    in mmap mode the vectors are mapped read-only too, so worker processes share one page-cache
+    copy and cold loads do not grow with index size. Legacy index.pkl snapshots use load_local.
+    """
+    embeddings = embeddings or shared_embeddings()
+    mmap = serving_mmap() if mmap is None else mmap
+
+    def load() -> FAISS:
+        if has_mapped_docstore(Path(index_path)):
+            log.info(f"Opening FAISS index with compact docstore, index={index_path}, mmap={mmap}")
+            vs = load_mapped_vectorstore(index_path, embeddings, index_name=index_name, mmap=mmap)
+        else:
+            log.info(f"Loading FAISS index from disk, index={index_path}")
+            vs = FAISS.load_local(
+                index_path,
+                embeddings,
+                index_name=index_name,
+                allow_dangerous_deserialization=True,
+            )
+        # nprobe / efSearch come from the current config, not from when the index was built
+        apply_search_params(vs.index, index_settings(load_config().get("index")))
+        return vs
+
+    cache = get_vectorstore_cache()
+    vs = cache.get(index_path, load, index_name)
+    log.info(f"Vector store cache, index={index_path}, stats={cache.stats()}")
+    return vs
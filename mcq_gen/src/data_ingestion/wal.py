@@ -0,0 +1,85 @@
+import json
+import os
+import struct
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import numpy as np
+
+from mcq_gen.logger import logging as log
+
+# record layout: header (json length, vector bytes, crc32) | json | float32 vectors
+_HEADER = struct.Struct("<IQI")
+
+
+class WriteAheadLog:
+    """
+    Append-only log of index changes made since the last snapshot.
+    A record torn by a crash fails its length/crc check and is cut off on open.
+    """
+
+    def __init__(self, path: Path, fsync: bool = True):
+        self.path = Path(path)
+        self.fsync = fsync
+        self._truncate_torn_tail()
+
+    def _truncate_torn_tail(self) -> None:
+        if not self.path.exists():
+            return
+        good = 0
+        for _, _, end in self._scan():
+            good = end
+        size = self.path.stat().st_size
+        if good < size:
+            log.warning(f"Torn WAL tail dropped, path={str(self.path)}, bytes={size - good}")
+            with open(self.path, "r+b") as f:
+                f.truncate(good)
+
+    def _scan(self) -> Iterator[Tuple[Dict[str, Any], Optional[np.ndarray], int]]:
+        with open(self.path, "rb") as f:
+            while True:
+                head = f.read(_HEADER.size)
+                if len(head) < _HEADER.size:
+                    return
+                json_len, vec_len, crc = _HEADER.unpack(head)
+                body = f.read(json_len)
+                vec = f.read(vec_len)
+                if len(body) < json_len or len(vec) < vec_len or zlib.crc32(body + vec) != crc:
+                    return
+                record = json.loads(body.decode("utf-8"))
+                vectors = None
+                if vec_len:
+                    vectors = np.frombuffer(vec, dtype=np.float32).reshape(-1, record["dim"])
+                yield record, vectors, f.tell()
+
+    def records(self) -> Iterator[Tuple[Dict[str, Any], Optional[np.ndarray]]]:
+        if not self.path.exists():
+            return
+        for record, vectors, _ in self._scan():
+            yield record, vectors
+
+    def append(self, record: Dict[str, Any], vectors: Optional[np.ndarray] = None) -> int:
+        vec = b""
+        if vectors is not None and len(vectors):
+            vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+            record = {**record, "dim": int(vectors.shape[1])}
+            vec = vectors.tobytes()
+        body = json.dumps(record, ensure_ascii=False, default=str).encode("utf-8")
+        with open(self.path, "ab") as f:
+            f.write(_HEADER.pack(len(body), len(vec), zlib.crc32(body + vec)))
+            f.write(body)
+            f.write(vec)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        return _HEADER.size + len(body) + len(vec)
+
+    def size(self) -> int:
+        return self.path.stat().st_size if self.path.exists() else 0
+
+    def reset(self) -> None:
+        """Empty the log once a snapshot holds everything it recorded."""
+        tmp = self.path.with_suffix(".tmp")
+        open(tmp, "wb").close()
+        os.replace(tmp, self.path)
@@ -0,0 +1,91 @@
+"""
+Per-request overhead of the MCQ chain with a stub LLM and retriever, so only the
+setup work is measured: rebuilding ModelLoader, config, prompt, chat client and chain
+on every request (the old generate()) against the chain reused by MCQGenRAG.
+
+    python -m mcq_gen.src.generator.chain_benchmark --requests 200
+
+Building the Mistral client needs MISTRAL_API_KEY set; no request is sent with it.
+"""
+import argparse
+import json
+import time
+from typing import Any, Dict, List, Optional
+
+from langchain_core.documents import Document
+from langchain_core.language_models import FakeListChatModel
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import RunnableLambda, RunnableParallel, RunnablePassthrough
+
+from mcq_gen.prompts.prompt_library import custom_prompt_v1
+from mcq_gen.src.generator.context_packer import pack_documents
+from mcq_gen.src.generator.generator import MCQGenRAG
+from mcq_gen.src.generator.response_cache import NullResponseCache
+from mcq_gen.utils import config_loader
+from mcq_gen.utils.model_loader import ModelLoader
+
+ANSWER = json.dumps([{"question": "q", "options": {"A": "a", "B": "b", "C": "c", "D": "d"}, "answer": "A"}])
+
+
+def _stub_retriever(chunks: int):
+    docs = [Document(page_content=f"Chunk {i} of the course text. " * 20) for i in range(chunks)]
+    return RunnableLambda(lambda topic: docs)
+
+
+def _rebuilt_request(retriever, stub_llm, topic: str) -> Dict[str, Any]:
+    """One request as generate() ran it before: everything built from scratch."""
+    config_loader._CACHE.clear()
+    ModelLoader().load_llm()  # .env, API keys, config.yaml and a new client with its own pool
+    prompt = ChatPromptTemplate.from_messages(
+        [("system", custom_prompt_v1), ("human", "Generate the MCQs now based on the topic: '{topic}'")]
+    )
+    chain = (
+        RunnableParallel(context=lambda x: pack_documents(retriever.invoke(x["topic"])), topic=RunnablePassthrough())
+        | prompt
+        | stub_llm
+        | RunnableLambda(lambda msg: {"result": msg.content})
+    )
+    return chain.invoke({"topic": topic})
+
+
+def benchmark_chain_reuse(requests: int = 100, chunks: int = 5) -> List[Dict[str, Any]]:
+    retriever = _stub_retriever(chunks)
+    stub_llm = FakeListChatModel(responses=[ANSWER])
+    # no response cache: repeated topics would measure cache hits and write stub answers to the shared cache
+    rag = MCQGenRAG(None, retriever=retriever, result_base="results", llm=stub_llm, response_cache=NullResponseCache())
+    # warm both paths so imports and first-use costs are not counted
+    _rebuilt_request(retriever, stub_llm, "warmup")
+    rag._build_chain().invoke({"topic": "warmup"})
+
+    rows = []
+    for name, run in (
+        ("rebuilt", lambda topic: _rebuilt_request(retriever, stub_llm, topic)),
+        ("reused", lambda topic: rag._build_chain().invoke({"topic": topic})),
+    ):
+        start = time.perf_counter()
+        for i in range(requests):
+            run(f"topic {i % 10}")
+        rows.append({"mode": name, "ms_per_request": (time.perf_counter() - start) * 1000 / requests})
+    return rows
+
+
+def format_report(rows: List[Dict[str, Any]]) -> str:
+    base = rows[0]["ms_per_request"]
+    lines = [f"{'mode':<8} {'ms/request':>11} {'speedup':>8}"]
+    for r in rows:
+        lines.append(f"{r['mode']:<8} {r['ms_per_request']:>11.3f} {base / r['ms_per_request']:>7.1f}x")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--chunks", type=int, default=5)
+    args = parser.parse_args(argv)
+    rows = benchmark_chain_reuse(args.requests, args.chunks)
+    print(f"requests={args.requests}, chunks={args.chunks}, llm=stub")
+    print(format_report(rows))
+
+
+if __name__ == "__main__":
+    main()
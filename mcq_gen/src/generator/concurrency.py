@@ -0,0 +1,24 @@
+import asyncio
+import threading
+import weakref
+
+from mcq_gen.utils.config_loader import load_config
+
+# one semaphore per event loop: asyncio primitives cannot be shared between loops
+_SEMAPHORES: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+_LOCK = threading.Lock()
+
+
+def max_concurrent_llm_calls() -> int:
+    """`generation.max_concurrent_llm_calls` from config.yaml."""
+    return max(1, int(load_config().get("generation", {}).get("max_concurrent_llm_calls", 16)))
+
+
+def llm_slot() -> asyncio.Semaphore:
+    """Semaphore capping in-flight LLM calls on the running event loop; use as `async with llm_slot():`."""
+    loop = asyncio.get_running_loop()
+    with _LOCK:
+        semaphore = _SEMAPHORES.get(loop)
+        if semaphore is None:
+            semaphore = _SEMAPHORES[loop] = asyncio.Semaphore(max_concurrent_llm_calls())
+        return semaphore
@@ -0,0 +1,193 @@
+import os
+import re
+import sys
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.documents import Document
+
+from mcq_gen.exception import ProjectException
+from mcq_gen.logger import logging as log
+from mcq_gen.utils.config_loader import load_config
+
+_PIECES = re.compile(r"\w+|[^\w\s]")
+_WORDS = re.compile(r"\w+")
+
+# shingle width for the near-duplicate check
+SHINGLE = 5
+
+
+class TokenCounter:
+    """
+    Token counts from a local tokenizer.json, or a Hugging Face tokenizer (e.g. Mistral's)
+    downloaded once into the local Hugging Face cache, through the `tokenizers` package.
+    When neither loads, words and punctuation are counted with a margin for subword splits
+    if allow_estimate is set; otherwise loading fails.
+    """
+
+    def __init__(
+            self,
+            tokenizer_path: Optional[str] = None,
+            tokenizer_name: Optional[str] = None,
+            allow_estimate: bool = True,
+    ):
+        self._tokenizer = None
+        if allow_estimate and not tokenizer_path and not tokenizer_name:
+            return
+        try:
+            from tokenizers import Tokenizer
+
+            if tokenizer_path:
+                if not Path(tokenizer_path).exists():
+                    raise FileNotFoundError(f"Tokenizer file not found: {tokenizer_path}")
+                self._tokenizer = Tokenizer.from_file(str(tokenizer_path))
+            elif tokenizer_name:
+                # HF_TOKEN is needed for gated repos; later loads are served from the cache
+                self._tokenizer = Tokenizer.from_pretrained(tokenizer_name, token=os.getenv("HF_TOKEN"))
+            else:
+                raise ValueError("No tokenizer configured, set context.tokenizer_path or context.tokenizer_name")
+            log.info(f"Tokenizer loaded, path={tokenizer_path}, name={tokenizer_name}")
+        except Exception as e:
+            if not allow_estimate:
+                log.error(f"Failed to load tokenizer, path={tokenizer_path}, name={tokenizer_name}, error={str(e)}")
+                raise ProjectException("Error loading tokenizer for context packing", sys)
+            log.warning(f"Tokenizer not loaded, estimating context tokens, path={tokenizer_path}, name={tokenizer_name}, error={str(e)}")
+
+    @property
+    def exact(self) -> bool:
+        return self._tokenizer is not None
+
+    def count(self, text: str) -> int:
+        if self._tokenizer is not None:
+            return len(self._tokenizer.encode(text, add_special_tokens=False).ids)
+        return int(len(_PIECES.findall(text)) * 1.3 + 0.5)
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Longest prefix of text within max_tokens, cut at a whitespace boundary."""
+        if max_tokens <= 0:
+            return ""
+        if self._tokenizer is not None:
+            encoding = self._tokenizer.encode(text, add_special_tokens=False)
+            if len(encoding.ids) <= max_tokens:
+                return text
+            end = encoding.offsets[max_tokens - 1][1]
+        else:
+            pieces = list(_PIECES.finditer(text))
+            keep = int(max_tokens / 1.3)
+            if len(pieces) <= keep:
+                return text
+            end = pieces[keep - 1].end() if keep else 0
+        cut = text[:end]
+        space = cut.rfind(" ")
+        return cut[:space] if space > len(cut) // 2 else cut
+
+
+def _shingles(text: str) -> set:
+    words = _WORDS.findall(text.casefold())
+    if len(words) < SHINGLE:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + SHINGLE]) for i in range(len(words) - SHINGLE + 1)}
+
+
+def _overlap(kept: str, text: str, min_chars: int) -> int:
+    """Length of the longest suffix of kept that text starts with (the splitter's chunk_overlap)."""
+    if len(text) < min_chars:
+        return 0
+    probe = text[:min_chars]
+    start = kept.find(probe, max(0, len(kept) - len(text)))
+    while start >= 0:
+        tail = kept[start:]
+        if text.startswith(tail):
+            return len(tail)
+        start = kept.find(probe, start + 1)
+    return 0
+
+
+class ContextPacker:
+    """
+    Retrieved chunks -> prompt context within a token budget, in retrieval order:
+    - chunks whose word shingles are mostly covered by chunks already packed are dropped
+    - text repeated from the end of a packed chunk (chunk_overlap) is cut from the next one
+    - the last chunk that does not fit is truncated, later ones are left out
+    """
+
+    def __init__(
+            self,
+            max_tokens: int = 3000,
+            dedupe_threshold: float = 0.8,
+            min_overlap_chars: int = 50,
+            separator: str = "\n\n",
+            tokenizer_path: Optional[str] = None,
+            tokenizer_name: Optional[str] = None,
+            allow_estimate: bool = True,
+    ):
+        self.max_tokens = int(max_tokens)
+        self.dedupe_threshold = float(dedupe_threshold)
+        self.min_overlap_chars = int(min_overlap_chars)
+        self.separator = separator
+        self.counter = TokenCounter(tokenizer_path, tokenizer_name, allow_estimate)
+
+    def pack(self, docs: Sequence[Any]) -> Tuple[List[str], Dict[str, int]]:
+        """Packed chunk texts and counts for logging."""
+        texts: List[str] = []
+        seen: set = set()
+        stats = {"chunks_in": len(docs), "duplicates": 0, "trimmed_chars": 0, "tokens": 0}
+        separator_tokens = self.counter.count(self.separator) if self.separator.strip() else 0
+        for doc in docs:
+            text = getattr(doc, "page_content", str(doc)).strip()
+            shingles = _shingles(text)
+            if not shingles or len(shingles & seen) / len(shingles) >= self.dedupe_threshold:
+                stats["duplicates"] += 1
+                continue
+            for kept in texts:
+                cut = _overlap(kept, text, self.min_overlap_chars)
+                if cut:
+                    text = text[cut:].lstrip()
+                    stats["trimmed_chars"] += cut
+                    break
+            if not text:
+                stats["duplicates"] += 1
+                continue
+
+            budget = self.max_tokens - stats["tokens"] - (separator_tokens if texts else 0)
+            tokens = self.counter.count(text)
+            full = tokens <= budget
+            if not full:
+                text = self.counter.truncate(text, budget)
+                tokens = self.counter.count(text) if text else 0
+            if text:
+                texts.append(text)
+                seen |= shingles
+                stats["tokens"] += tokens + (separator_tokens if len(texts) > 1 else 0)
+            if not full:
+                break
+        stats["chunks_out"] = len(texts)
+        return texts, stats
+
+    def pack_text(self, docs: Sequence[Any]) -> str:
+        texts, stats = self.pack(docs)
+        log.info(
+            f"Context packed, chunks_in={stats['chunks_in']}, chunks_out={stats['chunks_out']}, "
+            f"duplicates={stats['duplicates']}, trimmed_chars={stats['trimmed_chars']}, "
+            f"tokens={stats['tokens']}, budget={self.max_tokens}, exact={self.counter.exact}"
+        )
+        return self.separator.join(texts)
+
+
+@lru_cache(maxsize=1)
+def default_packer() -> ContextPacker:
+    """Packer from the `context:` section of config.yaml, shared by every chain in the process."""
+    cfg = load_config().get("context", {}) or {}
+    return ContextPacker(
+        max_tokens=int(cfg.get("max_tokens", 3000)),
+        dedupe_threshold=float(cfg.get("dedupe_threshold", 0.8)),
+        min_overlap_chars=int(cfg.get("min_overlap_chars", 50)),
+        tokenizer_path=cfg.get("tokenizer_path"),
+        tokenizer_name=cfg.get("tokenizer_name"),
+        allow_estimate=bool(cfg.get("allow_estimate", True)),
+    )
+
+
+def pack_documents(docs: Sequence[Document]) -> str:
+    return default_packer().pack_text(docs)
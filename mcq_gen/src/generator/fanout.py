@@ -0,0 +1,68 @@
+import re
+from typing import Any, Dict, List, Sequence
+
+from mcq_gen.utils.config_loader import load_config
+
+_WORDS = re.compile(r"\w+")
+
+
+def fanout_settings() -> Dict[str, Any]:
+    """Fan-out keys of the `generation:` section of config.yaml."""
+    cfg = load_config().get("generation", {}) or {}
+    return {
+        "questions_per_call": max(1, int(cfg.get("questions_per_call", 5))),
+        "chunks_per_call": max(1, int(cfg.get("chunks_per_call", 3))),
+        "retries": max(0, int(cfg.get("fanout_retries", 1))),
+        "duplicate_similarity": float(cfg.get("duplicate_similarity", 0.8)),
+    }
+
+
+def plan_parts(count: int, per_call: int) -> List[int]:
+    """Question count of each sub-request, as even as possible: 23 by 5 -> [5, 5, 5, 4, 4]."""
+    if count < 1:
+        raise ValueError(f"Question count must be at least 1, got {count}")
+    parts = -(-count // per_call)
+    base, extra = divmod(count, parts)
+    return [base + (1 if i < extra else 0) for i in range(parts)]
+
+
+def slice_contexts(docs: Sequence[Any], parts: int, per_slice: int) -> List[List[Any]]:
+    """
+    Context of each sub-request. Chunks are dealt round-robin, so every slice gets a mix
+    of better and worse ranked chunks; with fewer chunks than slots they are reused in turn.
+    """
+    slices: List[List[Any]] = [[] for _ in range(parts)]
+    if not docs:
+        return slices
+    for i in range(parts * per_slice):
+        doc = docs[i % len(docs)]
+        slot = slices[i % parts]
+        if all(doc is not d for d in slot):
+            slot.append(doc)
+    return slices
+
+
+def question_words(mcq: Any) -> frozenset:
+    text = mcq.get("question", "") if isinstance(mcq, dict) else str(mcq)
+    return frozenset(_WORDS.findall(text.casefold()))
+
+
+def merge_questions(batches: Sequence[Sequence[Any]], limit: int, similarity: float = 0.8) -> List[Any]:
+    """
+    Questions of all sub-requests in part order, dropping any whose word set overlaps an
+    earlier question's by at least `similarity` (Jaccard), cut to `limit`.
+    """
+    merged: List[Any] = []
+    kept: List[frozenset] = []
+    for batch in batches:
+        for mcq in batch:
+            if len(merged) >= limit:
+                return merged
+            words = question_words(mcq)
+            if not words:
+                continue
+            if any(len(words & k) / len(words | k) >= similarity for k in kept):
+                continue
+            merged.append(mcq)
+            kept.append(words)
+    return merged
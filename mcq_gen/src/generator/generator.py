@@ -1,10 +1,16 @@
+import asyncio
+import hashlib
 import os
 import sys
+import time
+import uuid
+from functools import lru_cache
 from operator import itemgetter
-from typing import List, Optional, Dict, Any
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
 import json
 from pathlib import Path
 
+from langchain_core.messages import AIMessage
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_community.vectorstores import FAISS
 from langchain_classic.chains import RetrievalQA
@@ -12,10 +18,42 @@ from langchain_core.runnables import RunnablePassthrough, RunnableParallel, Runn
 
 
 from mcq_gen.exception import ProjectException
-from mcq_gen.prompts.prompt_library import prompt, custom_prompt_v1
+from mcq_gen.prompts.prompt_library import prompt, custom_prompt_v1, fanout_prompt_v1
 from mcq_gen.logger import logging as log
-from mcq_gen.utils.model_loader import ModelLoader
-
+from mcq_gen.utils.model_loader import shared_llm
+from mcq_gen.src.data_ingestion.vectorstore_cache import index_signature, load_cached_vectorstore
+from mcq_gen.src.generator.response_cache import default_response_cache, response_key
+from mcq_gen.utils.config_loader import load_config
+from mcq_gen.src.generator.mmr_retriever import VectorRetriever, hybrid_settings, make_retriever, retriever_settings
+from mcq_gen.src.data_ingestion.sparse_index import load_sparse_index
+from mcq_gen.src.data_ingestion.coverage import load_coverage
+from mcq_gen.src.generator.context_packer import pack_documents
+from mcq_gen.src.generator.concurrency import llm_slot, max_concurrent_llm_calls
+from mcq_gen.src.generator.mcq_stream import JsonArrayAppender, MCQArrayParser
+from mcq_gen.src.generator.fanout import fanout_settings, merge_questions, plan_parts, slice_contexts
+
+
+
+@lru_cache(maxsize=1)
+def mcq_prompt() -> ChatPromptTemplate:
+    """The generation prompt, parsed once per process."""
+    return ChatPromptTemplate.from_messages(
+        [
+            ("system", custom_prompt_v1),
+            ("human", "Generate the MCQs now based on the topic: '{topic}'"), 
+        ]
+    )
+
+
+@lru_cache(maxsize=1)
+def fanout_prompt() -> ChatPromptTemplate:
+    """Prompt of one fan-out sub-request: a fixed question count over one context slice."""
+    return ChatPromptTemplate.from_messages(
+        [
+            ("system", fanout_prompt_v1),
+            ("human", "Generate the {count} MCQs of part {part} now, topic: '{topic}'"),
+        ]
+    )
 
 
 class MCQGenRAG:
@@ -23,7 +61,9 @@ class MCQGenRAG:
             self, 
             session_id: Optional[str], 
             retriever=None,
-            result_base = "results"
+            result_base = "results",
+            llm=None,
+            response_cache=None,
             
         ):
         """
@@ -37,7 +77,16 @@ class MCQGenRAG:
             self.results_dir = self._resolve_dir(self.result_base)
 
             self.retriever = retriever
-            
+            # the process-wide client unless one is passed in; chains are built on first use
+            self.llm = llm
+            self._chain = None
+            self._answer = None
+            self._fanout = None
+            # identical prompts against the same index version are answered from this cache;
+            # NullResponseCache() turns it off for this instance
+            self.response_cache = response_cache if response_cache is not None else default_response_cache()
+            self.index_path: Optional[str] = None
+            self.index_name = "index"
 
 
             log.info(f"MCQGenRAG initialized, session_id={self.session_id}")
@@ -52,31 +101,32 @@ class MCQGenRAG:
     def load_retriever_from_faiss(
         self,
         index_path: str,
-        k: int = 5,
+        k: Optional[int] = None,
         index_name: str = "index",
-        search_type: str = "mmr",
-        fetch_k: int = 20,
-        lambda_mult: float = 0.5,
+        search_type: Optional[str] = None,
+        fetch_k: Optional[int] = None,
+        lambda_mult: Optional[float] = None,
         search_kwargs: Optional[Dict[str, Any]] = None,
     ):
         """
         Load FAISS index and build retriever + chain.
+        Search settings left as None come from the `retriever:` section of config.yaml.
         """
         try:
             if not os.path.isdir(index_path):
                 raise ProjectException(f"FAISS index directory not found: {index_path}", sys)
 
 
-            embedding = ModelLoader().load_embeddings()
-            vectorstore = FAISS.load_local(
-                index_path,
-                embedding,
-                index_name=index_name,
-                allow_dangerous_deserialization=True,
-            )
+            # repeated loads of a session are served from the process-wide cache
+            vectorstore = load_cached_vectorstore(index_path, index_name=index_name)
+            self.index_path, self.index_name = index_path, index_name
             
-            search_kwargs = {"k": k}
-            self.retriever = vectorstore.as_retriever(search_type=search_type, search_kwargs=search_kwargs)
+            settings = retriever_settings(k, search_type, fetch_k, lambda_mult)
+            # BM25 postings written at ingestion turn it into a hybrid retriever
+            sparse = load_sparse_index(index_path, vectorstore) if hybrid_settings()["enabled"] else None
+            # k-means representatives cached with the index serve topic-free quizzes
+            coverage = load_coverage(index_path, vectorstore)
+            self.retriever = make_retriever(vectorstore, **settings, sparse=sparse, coverage=coverage)
 
 
             log.info("FAISS retriever loaded successfully")
@@ -103,7 +153,7 @@ class MCQGenRAG:
     # -----------------------------------------------------------
     def _load_llm(self):
         try:
-            llm = ModelLoader().load_llm()
+            llm = self.llm or shared_llm()
             if not llm:
                 raise ProjectException("LLM could not be loaded.", sys)
             log.info(f"LLM loaded successfully, session_id={self.session_id}")
@@ -118,14 +168,7 @@ class MCQGenRAG:
     def _setup_prompt(self):
         
         try:
-            mcq_prompt = ChatPromptTemplate.from_messages(
-                [
-                    ("system", custom_prompt_v1),
-                    ("human", "Generate the MCQs now based on the topic: '{topic}'"), 
-                ]
-            )
-            log.info("Setting up prompt complited.")
-            return mcq_prompt
+            return mcq_prompt()
             
         except Exception as e:
             raise ProjectException(f"something went wrong while set-up prompt error={e}", sys)
@@ -134,26 +177,104 @@ class MCQGenRAG:
     # -----------------------------------------------------------
     # chain
     # -----------------------------------------------------------
+    def _index_version(self) -> str:
+        """Changes with every snapshot FaissManager writes for the session's index."""
+        if not self.index_path:
+            return ""
+        try:
+            return hashlib.sha1(repr(index_signature(self.index_path, self.index_name)).encode()).hexdigest()
+        except OSError:
+            return ""
+
+    def _cache_hooks(self, llm, prompt_version: str):
+        """
+        (lookup, store) for the response cache, or None when it does not apply: no cache, or a
+        non-deterministic call (temperature above response_cache.max_temperature).
+        The key covers the rendered prompt, model, params, prompt version and index version.
+        """
+        cache = self.response_cache
+        temperature = float(getattr(llm, "temperature", 0.0) or 0.0)
+        max_temperature = float(load_config().get("response_cache", {}).get("max_temperature", 0.0))
+        if cache is None or not cache.enabled or temperature > max_temperature:
+            return None
+        model = str(getattr(llm, "model", None) or getattr(llm, "model_name", None) or type(llm).__name__)
+        params = {"temperature": temperature, "max_tokens": getattr(llm, "max_tokens", None), "top_p": getattr(llm, "top_p", None)}
+
+        def lookup(prompt_value):
+            version = self._index_version()
+            scope = str(Path(self.index_path).resolve()) if self.index_path else ""
+            key = response_key(prompt_value.to_messages(), model, {**params, "index_version": version}, prompt_version)
+            return (key, scope, version), cache.get(key, scope, version)
+
+        def store(slot, message):
+            # only answers the pipeline can use are kept
+            try:
+                self._parse_result(message)
+            except (ValueError, ProjectException):
+                return
+            cache.put(slot[0], message.content, slot[1], slot[2])
+
+        return lookup, store
+
+    def _llm_step(self, prompt_version: str):
+        """The LLM call behind the response cache: a hit skips the API."""
+        llm = self._load_llm()
+        hooks = self._cache_hooks(llm, prompt_version)
+        if hooks is None:
+            return llm
+        lookup, store = hooks
+
+        def call(prompt_value):
+            slot, hit = lookup(prompt_value)
+            if hit is not None:
+                log.info(f"LLM response cache hit, session_id={self.session_id}")
+                return AIMessage(content=hit)
+            message = llm.invoke(prompt_value)
+            store(slot, message)
+            return message
+
+        async def acall(prompt_value):
+            # the SQLite backend blocks on disk, so lookups and stores run off the event loop
+            slot, hit = await asyncio.to_thread(lookup, prompt_value)
+            if hit is not None:
+                log.info(f"LLM response cache hit, session_id={self.session_id}")
+                return AIMessage(content=hit)
+            message = await llm.ainvoke(prompt_value)
+            await asyncio.to_thread(store, slot, message)
+            return message
+
+        return RunnableLambda(call, afunc=acall)
+
+    def _answer_chain(self):
+        """prompt | llm | result dict, built once and shared by generate() and generate_many()."""
+        if self._answer is None:
+            self._answer = (
+                self._setup_prompt()
+                | self._llm_step("custom_prompt_v1")
+                | RunnableLambda(lambda msg: {"result": msg.content})
+            )
+        return self._answer
+
     def _build_chain(self):
         try:
             if self.retriever is None:
                 raise ProjectException("No retriever, set before building again", sys)
-            
+            if self._chain is not None:
+                return self._chain
 
-            mcq_chain = (
+            # the retriever is looked up on each call, so a new one does not need a new chain
+            self._chain = (
                 RunnableParallel(
-                    # 'context' key gets populated by feeding the 'topic' to the retriever
-                    context=lambda x: self.retriever.invoke(x['topic']), 
-                    # 'topic' key simply passes the original input topic through
-                    topic=RunnablePassthrough() 
+                    # 'context' key gets populated by feeding the 'topic' to the retriever,
+                    # deduplicated and packed into the token budget
+                    context=lambda x: pack_documents(self.retriever.invoke(x['topic'])),
+                    # 'topic' key passes the input topic string through
+                    topic=itemgetter('topic'),
                 )
-                | self._setup_prompt()
-                | self._load_llm()
-                | RunnableLambda(lambda msg: {"result": msg.content})
-
+                | self._answer_chain()
             )
             log.info(f"LCEL chain built successfully, session_id={self.session_id}")
-            return mcq_chain
+            return self._chain
             
         except Exception as e:
             log.error(f"Failed to build chain, error={str(e)}")
@@ -170,36 +291,321 @@ class MCQGenRAG:
         self._save_as_json(response)
         return response
 
+    async def agenerate(self, topic: str):
+        """
+        generate() without blocking the event loop: async retrieval, the LLM call awaited
+        under the process-wide concurrency cap, and the results file written off-loop.
+        """
+        try:
+            if self.retriever is None:
+                raise ProjectException("No retriever, set before building again", sys)
+            docs = await self.retriever.ainvoke(topic)
+            context = pack_documents(docs)
+            async with llm_slot():
+                response = await self._answer_chain().ainvoke({"context": context, "topic": topic})
+            await asyncio.to_thread(self._save_as_json, response)
+            return response
+        except ProjectException:
+            raise
+        except Exception as e:
+            log.error(f"Failed to generate MCQs asynchronously, error={str(e)}, session_id={self.session_id}")
+            raise ProjectException("Error generating MCQs", sys)
+
+    # -----------------------------------------------------------
+    # Streaming
+    # -----------------------------------------------------------
+    def _render_prompt(self, topic: str, docs: List[Any]):
+        return self._setup_prompt().invoke({"context": pack_documents(docs), "topic": topic})
+
+    def _stream_finish(self, parser: MCQArrayParser, text: str, results: JsonArrayAppender):
+        """MCQs the stream parser could not see, e.g. a single object instead of an array."""
+        if parser.started:
+            return []
+        try:
+            parsed = self._parse_result({"result": text})
+        except (ValueError, ProjectException):
+            log.warning(f"Streamed answer is not JSON, session_id={self.session_id}")
+            return []
+        mcqs = parsed if isinstance(parsed, list) else [parsed]
+        for mcq in mcqs:
+            results.append(mcq)
+        return mcqs
+
+    def generate_stream(self, topic: str) -> Iterator[Any]:
+        """
+        Yield each MCQ as soon as the LLM has streamed its closing brace, appending it to the
+        results file at the same moment; the file is a valid JSON array throughout.
+        """
+        try:
+            if self.retriever is None:
+                raise ProjectException("No retriever, set before building again", sys)
+            prompt_value = self._render_prompt(topic, self.retriever.invoke(topic))
+            llm = self._load_llm()
+            hooks = self._cache_hooks(llm, "custom_prompt_v1")
+            slot, hit = hooks[0](prompt_value) if hooks else (None, None)
+            parser = MCQArrayParser()
+            started = time.perf_counter()
+            parts: List[str] = []
+            with JsonArrayAppender(self._results_file()) as results:
+                chunks = [hit] if hit is not None else (c.content for c in llm.stream(prompt_value))
+                for chunk in chunks:
+                    parts.append(chunk)
+                    for mcq in parser.feed(chunk):
+                        if not results.count:
+                            log.info(f"First MCQ streamed, seconds={time.perf_counter() - started:.3f}, session_id={self.session_id}")
+                        results.append(mcq)
+                        yield mcq
+                text = "".join(parts)
+                yield from self._stream_finish(parser, text, results)
+                count = results.count
+            if hooks and hit is None:
+                hooks[1](slot, AIMessage(content=text))
+            log.info(f"MCQ stream completed, questions={count}, seconds={time.perf_counter() - started:.3f}, cached={hit is not None}, session_id={self.session_id}")
+        except ProjectException:
+            raise
+        except Exception as e:
+            log.error(f"Failed to stream MCQs, error={str(e)}, session_id={self.session_id}")
+            raise ProjectException("Error streaming MCQs", sys)
+
+    async def agenerate_stream(self, topic: str) -> AsyncIterator[Any]:
+        """generate_stream() on the event loop; the stream holds an llm_slot() while it runs."""
+        try:
+            if self.retriever is None:
+                raise ProjectException("No retriever, set before building again", sys)
+            prompt_value = self._render_prompt(topic, await self.retriever.ainvoke(topic))
+            llm = self._load_llm()
+            hooks = self._cache_hooks(llm, "custom_prompt_v1")
+            slot, hit = await asyncio.to_thread(hooks[0], prompt_value) if hooks else (None, None)
+
+            async def chunks():
+                if hit is not None:
+                    yield hit
+                    return
+                async for c in llm.astream(prompt_value):
+                    yield c.content
+
+            parser = MCQArrayParser()
+            started = time.perf_counter()
+            parts: List[str] = []
+            with JsonArrayAppender(self._results_file()) as results:
+                async with llm_slot():
+                    async for chunk in chunks():
+                        parts.append(chunk)
+                        for mcq in parser.feed(chunk):
+                            if not results.count:
+                                log.info(f"First MCQ streamed, seconds={time.perf_counter() - started:.3f}, session_id={self.session_id}")
+                            results.append(mcq)
+                            yield mcq
+                text = "".join(parts)
+                for mcq in self._stream_finish(parser, text, results):
+                    yield mcq
+                count = results.count
+            if hooks and hit is None:
+                await asyncio.to_thread(hooks[1], slot, AIMessage(content=text))
+            log.info(f"MCQ stream completed, questions={count}, seconds={time.perf_counter() - started:.3f}, cached={hit is not None}, session_id={self.session_id}")
+        except ProjectException:
+            raise
+        except Exception as e:
+            log.error(f"Failed to stream MCQs asynchronously, error={str(e)}, session_id={self.session_id}")
+            raise ProjectException("Error streaming MCQs", sys)
+
+    # -----------------------------------------------------------
+    # Many topics at once
+    # -----------------------------------------------------------
+    def retrieve_many(self, topics: List[str]) -> List[List[Any]]:
+        """
+        Context of every topic. The native retriever embeds all topics in one request,
+        runs one index search over the stacked query matrix and MMR per topic;
+        other retrievers fall back to LangChain's batch().
+        """
+        if self.retriever is None:
+            # raised outside an except block, where ProjectException has no traceback to report
+            raise ValueError("No retriever, set before building again")
+        if hasattr(self.retriever, "retrieve_many"):
+            return self.retriever.retrieve_many(topics)
+        return self.retriever.batch(topics)
+
+    def generate_many(self, topics: List[str]) -> List[Dict[str, Any]]:
+        """Generate MCQs for several topics; retrieval is batched, LLM calls run concurrently."""
+        try:
+            contexts = self.retrieve_many(topics)
+            responses = self._answer_chain().batch(
+                [{"context": pack_documents(context), "topic": topic} for topic, context in zip(topics, contexts)],
+                config={"max_concurrency": max_concurrent_llm_calls()},
+            )
+            # one results file for the whole quiz, topics in request order
+            mcqs: List[Any] = []
+            for response in responses:
+                parsed = self._parse_result(response)
+                mcqs.extend(parsed if isinstance(parsed, list) else [parsed])
+            self._write_results(mcqs)
+            log.info(f"MCQs generated for many topics, topics={len(topics)}, session_id={self.session_id}")
+            return responses
+        except ProjectException:
+            raise
+        except Exception as e:
+            log.error(f"Failed to generate MCQs for many topics, error={str(e)}")
+            raise ProjectException("Error generating MCQs for many topics", sys)
+
+    # -----------------------------------------------------------
+    # Many questions for one topic
+    # -----------------------------------------------------------
+    def _fanout_chain(self):
+        if self._fanout is None:
+            self._fanout = (
+                fanout_prompt()
+                | self._llm_step("fanout_prompt_v1")
+                | RunnableLambda(lambda msg: {"result": msg.content})
+            )
+        return self._fanout
+
+    def _pool_retriever(self, size: int):
+        """The retriever, widened when native so every sub-request gets chunks of its own."""
+        if self.retriever is None:
+            raise ValueError("No retriever, set before building again")
+        if isinstance(self.retriever, VectorRetriever) and size > self.retriever.k:
+            return self.retriever.model_copy(update={"k": size, "fetch_k": max(self.retriever.fetch_k, 2 * size)})
+        return self.retriever
+
+    @staticmethod
+    def _fanout_inputs(topic: str, count: int, pool: List[Any], settings: Dict[str, Any]) -> List[Dict[str, Any]]:
+        counts = plan_parts(count, settings["questions_per_call"])
+        slices = slice_contexts(pool, len(counts), settings["chunks_per_call"])
+        return [
+            {"context": pack_documents(part), "topic": topic, "count": n, "part": i + 1, "parts": len(counts)}
+            for i, (n, part) in enumerate(zip(counts, slices))
+        ]
+
+    def _parse_part(self, response) -> Optional[List[Any]]:
+        """MCQs of one sub-request, or None when it failed or is not a JSON list."""
+        if isinstance(response, Exception):
+            log.warning(f"Fan-out sub-request failed, error={str(response)}, session_id={self.session_id}")
+            return None
+        try:
+            parsed = self._parse_result(response)
+        except (ValueError, ProjectException) as e:
+            log.warning(f"Fan-out sub-request returned invalid JSON, error={str(e)}, session_id={self.session_id}")
+            return None
+        return parsed if isinstance(parsed, list) else [parsed]
+
+    def _merge_fanout(self, batches: List[Optional[List[Any]]], count: int, settings: Dict[str, Any]) -> List[Any]:
+        mcqs = merge_questions([b or [] for b in batches], count, settings["duplicate_similarity"])
+        log.info(
+            f"Fan-out generation completed, requested={count}, parts={len(batches)}, "
+            f"failed_parts={sum(b is None for b in batches)}, questions={len(mcqs)}, session_id={self.session_id}"
+        )
+        return mcqs
+
+    def generate_fanout(self, topic: str, count: int) -> List[Any]:
+        """
+        `count` MCQs from parallel sub-requests of questions_per_call each, every one over
+        its own slice of the retrieved context. Invalid parts are retried, then skipped;
+        the merged questions are deduplicated and saved like generate().
+        """
+        if count < 1:
+            raise ValueError(f"Question count must be at least 1, got {count}")
+        try:
+            settings = fanout_settings()
+            size = len(plan_parts(count, settings["questions_per_call"])) * settings["chunks_per_call"]
+            pool = self._pool_retriever(size).invoke(topic)
+            inputs = self._fanout_inputs(topic, count, pool, settings)
+
+            batches: List[Optional[List[Any]]] = [None] * len(inputs)
+            pending = list(range(len(inputs)))
+            for _ in range(settings["retries"] + 1):
+                responses = self._fanout_chain().batch(
+                    [inputs[i] for i in pending],
+                    config={"max_concurrency": max_concurrent_llm_calls()},
+                    return_exceptions=True,
+                )
+                for i, response in zip(pending, responses):
+                    batches[i] = self._parse_part(response)
+                pending = [i for i in pending if batches[i] is None]
+                if not pending:
+                    break
+
+            mcqs = self._merge_fanout(batches, count, settings)
+            self._write_results(mcqs)
+            return mcqs
+        except ProjectException:
+            raise
+        except Exception as e:
+            log.error(f"Failed fan-out generation, error={str(e)}, session_id={self.session_id}")
+            raise ProjectException("Error generating MCQs", sys)
+
+    async def agenerate_fanout(self, topic: str, count: int) -> List[Any]:
+        """generate_fanout() on the event loop; sub-requests share the llm_slot() cap."""
+        if count < 1:
+            raise ValueError(f"Question count must be at least 1, got {count}")
+        try:
+            settings = fanout_settings()
+            size = len(plan_parts(count, settings["questions_per_call"])) * settings["chunks_per_call"]
+            pool = await self._pool_retriever(size).ainvoke(topic)
+            inputs = self._fanout_inputs(topic, count, pool, settings)
+
+            async def run(payload):
+                for _ in range(settings["retries"] + 1):
+                    async with llm_slot():
+                        try:
+                            response = await self._fanout_chain().ainvoke(payload)
+                        except Exception as e:
+                            response = e
+                    parsed = self._parse_part(response)
+                    if parsed is not None:
+                        return parsed
+                return None
+
+            batches = await asyncio.gather(*(run(payload) for payload in inputs))
+            mcqs = self._merge_fanout(list(batches), count, settings)
+            await asyncio.to_thread(self._write_results, mcqs)
+            return mcqs
+        except ProjectException:
+            raise
+        except Exception as e:
+            log.error(f"Failed async fan-out generation, error={str(e)}, session_id={self.session_id}")
+            raise ProjectException("Error generating MCQs", sys)
+
     # -----------------------------------------------------------
     # extract and save as json format
     # -----------------------------------------------------------
+    @staticmethod
+    def _parse_result(raw_data):
+        # Handle both AIMessage and dict
+        if hasattr(raw_data, "content"):  # AIMessage case
+            raw_result = raw_data.content.strip()
+        elif isinstance(raw_data, dict) and "result" in raw_data:
+            raw_result = raw_data["result"].strip()
+        else:
+            raise ProjectException("Unexpected response type", sys)
+
+        # Remove ```json fences if present
+        if raw_result.startswith("```json"):
+            raw_result = raw_result[len("```json"):].strip()
+        if raw_result.endswith("```"):
+            raw_result = raw_result[:-3].strip()
+
+        # Parse JSON
+        return json.loads(raw_result)
+
+    def _results_file(self) -> Path:
+        return self.results_dir / f"{self.session_id or 'default'}.json"
+
+    def _write_results(self, mcq_list):
+        # Save to correct path
+        output_file = self._results_file()
+
+        # written aside and renamed, so concurrent requests of a session never interleave
+        tmp = output_file.with_name(f"{output_file.name}.{uuid.uuid4().hex[:8]}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(mcq_list, f, ensure_ascii=False, indent=4)
+        os.replace(tmp, output_file)
+
+        log.info(f"MCQs saved successfully to {output_file}")
+
     def _save_as_json(self, raw_data):
         try:
             if raw_data:
-                # Handle both AIMessage and dict
-                if hasattr(raw_data, "content"):  # AIMessage case
-                    raw_result = raw_data.content.strip()
-                elif isinstance(raw_data, dict) and "result" in raw_data:
-                    raw_result = raw_data["result"].strip()
-                else:
-                    raise ProjectException("Unexpected response type", sys)
-
-                # Remove ```json fences if present
-                if raw_result.startswith("```json"):
-                    raw_result = raw_result[len("```json"):].strip()
-                if raw_result.endswith("```"):
-                    raw_result = raw_result[:-3].strip()
-
-                # Parse JSON
-                mcq_list = json.loads(raw_result)
-
-                # Save to correct path
-                output_file = self.results_dir / f"{self.session_id or 'default'}.json"
-
-                with open(output_file, "w", encoding="utf-8") as f:
-                    json.dump(mcq_list, f, ensure_ascii=False, indent=4)
-
-                log.info(f"MCQs saved successfully to {output_file}")
+                self._write_results(self._parse_result(raw_data))
 
         except Exception as e:
             log.error("Failed to save result to a json file.")
@@ -0,0 +1,105 @@
+import json
+import os
+import uuid
+from pathlib import Path
+from typing import Any, List
+
+from mcq_gen.logger import logging as log
+
+
+class MCQArrayParser:
+    """
+    Incremental parser for the JSON array the MCQ prompt asks for. feed() takes raw token
+    text and returns every top-level object completed by it, as soon as its closing brace
+    arrives. Text before the array (```json fences, a preamble) and after it is ignored;
+    a bare object is taken as a one-item array.
+    """
+
+    def __init__(self):
+        self.started = False
+        self.done = False
+        self.skipped = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._current: List[str] = []
+
+    def feed(self, text: str) -> List[Any]:
+        found = []
+        for ch in text:
+            if self.done:
+                break
+            if not self.started:
+                if ch == "[":
+                    self.started = True
+                    continue
+                if ch != "{":
+                    continue
+                # a bare object instead of an array: parse it as a one-item array
+                self.started = True
+            if self._depth == 0:
+                # between objects only separators, the next object or the end of the array
+                if ch == "{":
+                    self._depth = 1
+                    self._current = [ch]
+                elif ch == "]":
+                    self.done = True
+                continue
+
+            self._current.append(ch)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    raw = "".join(self._current)
+                    self._current = []
+                    try:
+                        found.append(json.loads(raw))
+                    except json.JSONDecodeError as e:
+                        self.skipped += 1
+                        log.warning(f"Skipping malformed MCQ in stream, error={str(e)}")
+        return found
+
+
+class JsonArrayAppender:
+    """
+    Results file published one object at a time. Each append writes the objects so far to this
+    request's own temp file and renames it over the results file, so the file always holds one
+    request's complete array: earlier results stay until the first object arrives, and
+    concurrent streams of a session replace each other's file instead of interleaving in it.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.items: List[Any] = []
+        self._tmp = self.path.with_name(f"{self.path.name}.{uuid.uuid4().hex[:8]}.tmp")
+
+    @property
+    def count(self) -> int:
+        return len(self.items)
+
+    def append(self, obj: Any) -> None:
+        self.items.append(obj)
+        with open(self._tmp, "w", encoding="utf-8") as f:
+            json.dump(self.items, f, ensure_ascii=False, indent=4)
+        os.replace(self._tmp, self.path)
+
+    def close(self) -> None:
+        # left behind only when a write failed before its rename
+        self._tmp.unlink(missing_ok=True)
+
+    def __enter__(self) -> "JsonArrayAppender":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,276 @@
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple
+
+import faiss
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from mcq_gen.logger import logging as log
+from mcq_gen.src.data_ingestion.sparse_index import hybrid_settings
+from mcq_gen.utils.config_loader import load_config
+
+# search types served natively; anything else goes through FAISS.as_retriever()
+NATIVE_SEARCH_TYPES = ("similarity", "mmr")
+
+
+def retriever_settings(
+        k: Optional[int] = None,
+        search_type: Optional[str] = None,
+        fetch_k: Optional[int] = None,
+        lambda_mult: Optional[float] = None,
+) -> Dict[str, Any]:
+    """Explicit arguments over the `retriever:` section of config.yaml."""
+    cfg = load_config().get("retriever", {})
+    settings = {
+        "k": int(k if k is not None else cfg.get("top_k", 5)),
+        "search_type": search_type or cfg.get("search_type", "mmr"),
+        "fetch_k": int(fetch_k if fetch_k is not None else cfg.get("fetch_k", 20)),
+        "lambda_mult": float(lambda_mult if lambda_mult is not None else cfg.get("lambda_mult", 0.5)),
+    }
+    settings["fetch_k"] = max(settings["fetch_k"], settings["k"])
+    return settings
+
+
+def _normalize(x: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(x, axis=-1, keepdims=True)
+    return x / np.maximum(norms, 1e-12)
+
+
+def mmr_select_batch(
+        queries: np.ndarray,
+        candidates: np.ndarray,
+        k: int,
+        lambda_mult: float = 0.5,
+        valid: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Maximal marginal relevance for B queries at once.
+    queries (B, d), candidates (B, F, d), valid (B, F) marks real candidates.
+    Returns (B, k) candidate positions in pick order, -1 where fewer than k were available.
+    Same picks as LangChain's maximal_marginal_relevance (cosine similarity, most similar first),
+    but each step is one vectorized update over all queries and candidates.
+    """
+    q = _normalize(np.asarray(queries, dtype=np.float32))
+    c = _normalize(np.asarray(candidates, dtype=np.float32))
+    batch, fetched = c.shape[:2]
+    k = min(k, fetched)
+    sim_q = np.einsum("bfd,bd->bf", c, q)
+    sim_c = np.matmul(c, c.transpose(0, 2, 1))
+
+    available = np.ones((batch, fetched), dtype=bool) if valid is None else np.array(valid, dtype=bool)
+    max_sim = np.full((batch, fetched), -np.inf, dtype=np.float32)
+    picks = np.full((batch, k), -1, dtype=np.int64)
+    rows = np.arange(batch)
+    for step in range(k):
+        score = sim_q.copy() if step == 0 else lambda_mult * sim_q - (1.0 - lambda_mult) * max_sim
+        score[~available] = -np.inf
+        pick = score.argmax(axis=1)
+        ok = available[rows, pick]
+        if not ok.any():
+            break
+        picks[rows[ok], step] = pick[ok]
+        available[rows[ok], pick[ok]] = False
+        # redundancy of every candidate with its closest already-selected one
+        max_sim = np.maximum(max_sim, sim_c[rows, pick])
+    return picks
+
+
+def mmr_select(query: np.ndarray, candidates: np.ndarray, k: int, lambda_mult: float = 0.5) -> List[int]:
+    picks = mmr_select_batch(query[None, :], candidates[None, :, :], k, lambda_mult)[0]
+    return [int(i) for i in picks if i >= 0]
+
+
+def search_with_vectors(index: faiss.Index, queries: np.ndarray, n: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Top-n labels of each query with the stored vectors of those hits, in one index call where possible."""
+    queries = np.ascontiguousarray(queries, dtype=np.float32)
+    try:
+        _, labels, vectors = index.search_and_reconstruct(queries, n)
+        return labels, vectors
+    except RuntimeError:
+        _, labels = index.search(queries, n)
+        flat = labels.reshape(-1)
+        vectors = np.zeros((flat.size, index.d), dtype=np.float32)
+        found = flat >= 0
+        if found.any():
+            vectors[found] = index.reconstruct_batch(flat[found])
+        return labels, vectors.reshape(labels.shape[0], n, index.d)
+
+
+class VectorRetriever(BaseRetriever):
+    """
+    Retriever over a FAISS store that honours k / fetch_k / lambda_mult.
+    MMR works on the candidates' stored vectors (nothing is re-embedded) and
+    retrieve_by_vectors() serves many queries with one index search and one batched MMR.
+    An empty topic returns the precomputed coverage chunks when there are any.
+    """
+
+    vectorstore: Any
+    k: int = 5
+    search_type: str = "mmr"
+    fetch_k: int = 20
+    lambda_mult: float = 0.5
+    # representative positions from k-means, served for an empty topic
+    coverage: Optional[Any] = None
+
+    def _documents(self, labels: List[int]) -> List[Document]:
+        docs = []
+        for i in labels:
+            doc_id = self.vectorstore.index_to_docstore_id.get(int(i)) if i >= 0 else None
+            doc = self.vectorstore.docstore.search(doc_id) if doc_id is not None else None
+            if isinstance(doc, Document):
+                docs.append(doc)
+        return docs
+
+    def _is_coverage(self, query: str) -> bool:
+        return self.coverage is not None and not query.strip()
+
+    def coverage_documents(self) -> List[Document]:
+        """Representative chunk of every cluster, in document order; nothing is embedded."""
+        return self._documents([int(i) for i in self.coverage])
+
+    def rank_by_vectors(self, vectors: np.ndarray) -> List[List[int]]:
+        """FAISS positions picked for each query vector, in rank order."""
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        index = self.vectorstore.index
+        if index.ntotal == 0:
+            return [[] for _ in vectors]
+        if self.search_type == "mmr":
+            labels, stored = search_with_vectors(index, vectors, min(self.fetch_k, index.ntotal))
+            picks = mmr_select_batch(vectors, stored, self.k, self.lambda_mult, valid=labels >= 0)
+            return [[int(row[p]) for p in pick if p >= 0] for row, pick in zip(labels, picks)]
+        _, labels = index.search(np.ascontiguousarray(vectors), min(self.k, index.ntotal))
+        return [[int(i) for i in row if i >= 0] for row in labels]
+
+    def retrieve_by_vectors(self, vectors: np.ndarray) -> List[List[Document]]:
+        return [self._documents(r) for r in self.rank_by_vectors(vectors)]
+
+    def embed_queries(self, queries: List[str]) -> np.ndarray:
+        """All queries in one embedding request (Mistral embeds queries and documents alike)."""
+        embeddings = self.vectorstore.embeddings
+        if hasattr(embeddings, "embed_queries"):
+            # cache wrappers: the query cache sends only unseen topics, neither writes them to the chunk store
+            return np.asarray(embeddings.embed_queries(list(queries)), dtype=np.float32)
+        return np.asarray(embeddings.embed_documents(list(queries)), dtype=np.float32)
+
+    def retrieve_many(self, queries: List[str]) -> List[List[Document]]:
+        """One embedding call, one index search and one batched MMR for all queries."""
+        if not queries:
+            return []
+        topical = [q for q in queries if not self._is_coverage(q)]
+        found = iter(self.retrieve_by_vectors(self.embed_queries(topical)) if topical else [])
+        results = [self.coverage_documents() if self._is_coverage(q) else next(found) for q in queries]
+        log.info(f"Batched retrieval completed, queries={len(queries)}, search_type={self.search_type}, k={self.k}")
+        return results
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        if self._is_coverage(query):
+            return self.coverage_documents()
+        vector = self.vectorstore.embeddings.embed_query(query)
+        return self.retrieve_by_vectors(np.asarray([vector], dtype=np.float32))[0]
+
+    async def _aget_relevant_documents(
+            self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        if self._is_coverage(query):
+            return self.coverage_documents()
+        vector = await self.vectorstore.embeddings.aembed_query(query)
+        # the index search runs in a worker thread; FAISS releases the GIL
+        return (await asyncio.to_thread(self.retrieve_by_vectors, np.asarray([vector], dtype=np.float32)))[0]
+
+
+def rrf_fuse(rankings: List[List[int]], k: int, rrf_k: int = 60) -> List[int]:
+    """Reciprocal rank fusion: each list adds 1 / (rrf_k + rank) to its items; top-k by total."""
+    scores: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (rrf_k + rank + 1)
+    return sorted(scores, key=lambda item: -scores[item])[:k]
+
+
+class HybridRetriever(VectorRetriever):
+    """
+    BM25 over the prebuilt postings fused with the dense ranking by reciprocal rank fusion.
+    Short topics made only of indexed terms ("Viterbi", "TF-IDF") are answered by BM25 alone,
+    without embedding the query.
+    """
+
+    sparse: Any
+    rrf_k: int = 60
+    lexical_max_terms: int = 3
+
+    def _lexical(self, query: str) -> bool:
+        return self.sparse.is_lexical(query, self.lexical_max_terms)
+
+    def _sparse_ranking(self, query: str, n: int) -> List[int]:
+        rows, _ = self.sparse.search(query, n)
+        return [int(r) for r in rows]
+
+    def retrieve_many(self, queries: List[str]) -> List[List[Document]]:
+        if not queries:
+            return []
+        lexical = [self._lexical(q) for q in queries]
+        dense_queries = [q for q, lex in zip(queries, lexical) if not lex and not self._is_coverage(q)]
+        dense = iter(self.rank_by_vectors(self.embed_queries(dense_queries)) if dense_queries else [])
+        results = []
+        for query, lex in zip(queries, lexical):
+            if self._is_coverage(query):
+                results.append(self.coverage_documents())
+                continue
+            if lex:
+                ranked = self._sparse_ranking(query, self.k)
+            else:
+                ranked = rrf_fuse([next(dense), self._sparse_ranking(query, self.fetch_k)], self.k, self.rrf_k)
+            results.append(self._documents(ranked))
+        log.info(f"Hybrid retrieval completed, queries={len(queries)}, lexical={sum(lexical)}, k={self.k}")
+        return results
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        if self._is_coverage(query):
+            return self.coverage_documents()
+        if self._lexical(query):
+            return self._documents(self._sparse_ranking(query, self.k))
+        vector = self.vectorstore.embeddings.embed_query(query)
+        dense = self.rank_by_vectors(np.asarray([vector], dtype=np.float32))[0]
+        return self._documents(rrf_fuse([dense, self._sparse_ranking(query, self.fetch_k)], self.k, self.rrf_k))
+
+    async def _aget_relevant_documents(
+            self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        if self._is_coverage(query):
+            return self.coverage_documents()
+        if self._lexical(query):
+            return self._documents(self._sparse_ranking(query, self.k))
+        vector = await self.vectorstore.embeddings.aembed_query(query)
+        dense = (await asyncio.to_thread(self.rank_by_vectors, np.asarray([vector], dtype=np.float32)))[0]
+        return self._documents(rrf_fuse([dense, self._sparse_ranking(query, self.fetch_k)], self.k, self.rrf_k))
+
+
+def make_retriever(
+        vectorstore: FAISS,
+        k: int,
+        search_type: str,
+        fetch_k: int,
+        lambda_mult: float,
+        sparse: Optional[Any] = None,
+        coverage: Optional[Any] = None,
+):
+    if sparse is not None and search_type in NATIVE_SEARCH_TYPES:
+        hybrid = hybrid_settings()
+        retriever = HybridRetriever(
+            vectorstore=vectorstore, k=k, search_type=search_type, fetch_k=fetch_k, lambda_mult=lambda_mult,
+            coverage=coverage, sparse=sparse, rrf_k=hybrid["rrf_k"], lexical_max_terms=hybrid["lexical_max_terms"],
+        )
+    elif search_type in NATIVE_SEARCH_TYPES:
+        retriever = VectorRetriever(
+            vectorstore=vectorstore, k=k, search_type=search_type, fetch_k=fetch_k, lambda_mult=lambda_mult,
+            coverage=coverage,
+        )
+    else:
+        retriever = vectorstore.as_retriever(
+            search_type=search_type, search_kwargs={"k": k, "fetch_k": fetch_k, "lambda_mult": lambda_mult}
+        )
+    log.info(f"Retriever configured, search_type={search_type}, k={k}, fetch_k={fetch_k}, lambda_mult={lambda_mult}, hybrid={sparse is not None}")
+    return retriever
@@ -0,0 +1,216 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from mcq_gen.logger import logging as log
+from mcq_gen.utils.config_loader import load_config
+
+
+def response_key(messages: Any, model: str, params: Dict[str, Any], prompt_version: str = "") -> str:
+    """sha256 of the fully rendered prompt messages plus model, sampling params and prompt version."""
+    rendered = [(getattr(m, "type", ""), getattr(m, "content", str(m))) for m in messages]
+    payload = json.dumps(
+        {"messages": rendered, "model": model, "params": params, "prompt_version": prompt_version},
+        ensure_ascii=False,
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache(ABC):
+    """
+    LLM responses by response_key(). Each entry records the scope (the session's index
+    directory) and that index's version: a lookup with a newer version for the same scope
+    drops the scope's older entries. Entries older than ttl_seconds are misses.
+    """
+
+    # False skips the cache entirely, prompt hashing included
+    enabled = True
+
+    def __init__(self, ttl_seconds: Optional[float] = None):
+        self.ttl_seconds = float(ttl_seconds) if ttl_seconds else None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._versions: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def _fresh(self, created: float) -> bool:
+        return self.ttl_seconds is None or time.time() - created < self.ttl_seconds
+
+    def _check_version(self, scope: str, version: str) -> None:
+        if not scope:
+            return
+        if self._versions.get(scope) != version:
+            if scope in self._versions:
+                self.invalidations += self._drop_scope(scope, version)
+                log.info(f"LLM response cache invalidated, scope={scope}, version={version}")
+            self._versions[scope] = version
+
+    def get(self, key: str, scope: str = "", version: str = "") -> Optional[str]:
+        with self._lock:
+            self._check_version(scope, version)
+            value = self._get(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return value
+
+    def put(self, key: str, value: str, scope: str = "", version: str = "") -> None:
+        with self._lock:
+            self._check_version(scope, version)
+            self._put(key, value, scope, version)
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "invalidations": self.invalidations}
+
+    @abstractmethod
+    def _get(self, key: str) -> Optional[str]:
+        """The stored value of key, or None when it is missing or expired."""
+
+    @abstractmethod
+    def _put(self, key: str, value: str, scope: str, version: str) -> None:
+        """Store value under key, tagged with its scope and index version."""
+
+    @abstractmethod
+    def _drop_scope(self, scope: str, keep_version: str) -> int:
+        """Delete the scope's entries of any other version, returning how many were dropped."""
+
+
+class NullResponseCache(ResponseCache):
+    """Caching turned off for one MCQGenRAG, whatever config.yaml says: every call reaches the LLM."""
+
+    enabled = False
+
+    def _get(self, key: str) -> Optional[str]:
+        return None
+
+    def _put(self, key: str, value: str, scope: str, version: str) -> None:
+        return None
+
+    def _drop_scope(self, scope: str, keep_version: str) -> int:
+        return 0
+
+
+class MemoryResponseCache(ResponseCache):
+    """In-process LRU of max_entries responses."""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: Optional[float] = None):
+        super().__init__(ttl_seconds)
+        self.max_entries = max(1, int(max_entries))
+        self._entries: "OrderedDict[str, Tuple[str, str, str, float]]" = OrderedDict()
+
+    def _get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if not self._fresh(entry[3]):
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def _put(self, key: str, value: str, scope: str, version: str) -> None:
+        self._entries[key] = (value, scope, version, time.time())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _drop_scope(self, scope: str, keep_version: str) -> int:
+        stale = [k for k, e in self._entries.items() if e[1] == scope and e[2] != keep_version]
+        for k in stale:
+            del self._entries[k]
+        return len(stale)
+
+
+class SQLiteResponseCache(ResponseCache):
+    """Responses in a SQLite file shared by every worker process, least recently used dropped past max_entries."""
+
+    def __init__(self, path: Path, max_entries: int = 100000, ttl_seconds: Optional[float] = None):
+        super().__init__(ttl_seconds)
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = int(max_entries)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                scope TEXT NOT NULL,
+                version TEXT NOT NULL,
+                created REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_scope ON responses(scope, version)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_access ON responses(last_access)")
+        self._conn.commit()
+
+    def _get(self, key: str) -> Optional[str]:
+        row = self._conn.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        if not self._fresh(row[1]):
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._conn.commit()
+            return None
+        self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+        self._conn.commit()
+        return row[0]
+
+    def _put(self, key: str, value: str, scope: str, version: str) -> None:
+        now = time.time()
+        self._conn.execute(
+            "INSERT OR REPLACE INTO responses (key, value, scope, version, created, last_access) VALUES (?, ?, ?, ?, ?, ?)",
+            (key, value, scope, version, now, now),
+        )
+        count = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        if count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY last_access ASC LIMIT ?)",
+                (count - self.max_entries,),
+            )
+        self._conn.commit()
+
+    def _drop_scope(self, scope: str, keep_version: str) -> int:
+        cur = self._conn.execute("DELETE FROM responses WHERE scope = ? AND version != ?", (scope, keep_version))
+        self._conn.commit()
+        return cur.rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+@lru_cache(maxsize=1)
+def default_response_cache() -> Optional[ResponseCache]:
+    """Backend from the `response_cache:` section of config.yaml, or None when disabled."""
+    cfg = load_config().get("response_cache", {}) or {}
+    if not cfg.get("enabled", False):
+        return None
+    ttl = cfg.get("ttl_seconds")
+    backend = str(cfg.get("backend", "memory")).lower()
+    if backend == "sqlite":
+        cache = SQLiteResponseCache(
+            Path(cfg.get("path", "cache/llm_responses.sqlite")),
+            max_entries=int(cfg.get("max_entries", 100000)),
+            ttl_seconds=ttl,
+        )
+    elif backend == "memory":
+        cache = MemoryResponseCache(max_entries=int(cfg.get("max_entries", 1024)), ttl_seconds=ttl)
+    else:
+        raise ValueError(f"Unknown response cache backend {backend!r}, expected memory or sqlite")
+    log.info(f"LLM response cache enabled, backend={backend}, ttl_seconds={ttl}")
+    return cache
@@ -13,7 +13,13 @@ from mcq_gen.exception import ProjectException
 from mcq_gen.prompts.prompt_library import PROMPT_REGISTRY
 from mcq_gen.logger import logging as log
 
-from mcq_gen.utils.model_loader import ModelLoader
+from mcq_gen.utils.model_loader import shared_llm
+from mcq_gen.src.data_ingestion.vectorstore_cache import load_cached_vectorstore
+from mcq_gen.src.generator.mmr_retriever import hybrid_settings, make_retriever, retriever_settings
+from mcq_gen.src.data_ingestion.sparse_index import load_sparse_index
+from mcq_gen.src.data_ingestion.coverage import load_coverage
+from mcq_gen.src.generator.context_packer import pack_documents
+from mcq_gen.src.generator.concurrency import llm_slot
 
 
 
@@ -55,37 +61,31 @@ class MCQGenRAG:
     def load_retriever_from_faiss(
         self,
         index_path: str,
-        k: int = 5,
+        k: Optional[int] = None,
         index_name: str = "index",
-        search_type: str = "mmr",
-        fetch_k: int = 20,
-        lambda_mult: float = 0.5,
+        search_type: Optional[str] = None,
+        fetch_k: Optional[int] = None,
+        lambda_mult: Optional[float] = None,
         search_kwargs: Optional[Dict[str, Any]] = None,
     ):
         """
         Load FAISS index and build retriever + LCEL chain.
+        Search settings left as None come from the `retriever:` section of config.yaml.
         """
         try:
             if not os.path.isdir(index_path):
                 raise ProjectException(f"FAISS index directory not found: {index_path}")
 
-            embedding = ModelLoader().load_embeddings()
-            vectorstore = FAISS.load_local(
-                index_path,
-                embedding,
-                index_name=index_name,
-                allow_dangerous_deserialization=True,
-            )
+            # repeated loads of a session are served from the process-wide cache
+            vectorstore = load_cached_vectorstore(index_path, index_name=index_name)
 
-            # Build retriever search configuration
-            """ if search_kwargs is None:
-                search_kwargs = {"k": k}
-                if search_type == "mmr":
-                    search_kwargs["fetch_k"] = fetch_k
-                    search_kwargs["lambda_mult"] = lambda_mult """
-            
-            search_kwargs = {"k": k}
-            self.retriever = vectorstore.as_retriever(search_type=search_type, search_kwargs=search_kwargs)
+            # Build retriever search configuration: fetch_k / lambda_mult drive the native MMR
+            settings = retriever_settings(k, search_type, fetch_k, lambda_mult)
+            # BM25 postings written at ingestion turn it into a hybrid retriever
+            sparse = load_sparse_index(index_path, vectorstore) if hybrid_settings()["enabled"] else None
+            # k-means representatives cached with the index serve topic-free quizzes
+            coverage = load_coverage(index_path, vectorstore)
+            self.retriever = make_retriever(vectorstore, **settings, sparse=sparse, coverage=coverage)
 
             # self._build_lcel_chain()
 
@@ -111,7 +111,8 @@ class MCQGenRAG:
     # -----------------------------------------------------------
     def _load_llm(self):
         try:
-            llm = ModelLoader().load_llm()
+            # one client per process: its keep-alive connections are reused across requests
+            llm = shared_llm()
             if not llm:
                 raise ProjectException("LLM could not be loaded.", sys)
             log.info(f"LLM loaded successfully, session_id={self.session_id}")
@@ -125,7 +126,8 @@ class MCQGenRAG:
     # -----------------------------------------------------------
     @staticmethod
     def _format_docs(docs) -> str:
-        return "\n\n".join(getattr(d, "page_content", str(d)) for d in docs)
+        # overlapping chunks deduplicated, trimmed to the `context:` token budget
+        return pack_documents(docs)
 
     # -----------------------------------------------------------
     # Main invoke function
@@ -152,6 +154,21 @@ class MCQGenRAG:
             log.error(f"Chain invocation failed, error={str(e)}, session_id={self.session_id}")
             raise ProjectException("Failed to generate MCQs", e)
 
+    async def ainvoke(self, user_input: str) -> str:
+        """invoke() on the event loop; in-flight LLM calls are capped by llm_slot()."""
+        if self.chain is None:
+            raise ProjectException(
+                "Chain not initialized. Call _build_lcel_chain first.", sys
+            )
+
+        try:
+            async with llm_slot():
+                return await self.chain.ainvoke({"topic": user_input})
+
+        except Exception as e:
+            log.error(f"Async chain invocation failed, error={str(e)}, session_id={self.session_id}")
+            raise ProjectException("Failed to generate MCQs", sys)
+
     # -----------------------------------------------------------
     # Build LCEL chain
     # -----------------------------------------------------------
@@ -172,11 +189,13 @@ class MCQGenRAG:
                 self.ai_prompt
             ])
 
-            format_docs = RunnablePassthrough(self._format_docs)
+            format_docs = RunnableLambda(self._format_docs)
             
             self.chain = (
                 {
-                    "context": self.retriever | format_docs
+                    # the retriever gets the topic string, the prompt gets both fields
+                    "context": itemgetter("topic") | self.retriever | format_docs,
+                    "topic": itemgetter("topic"),
                 }
                 | prompt
                 | self.llm
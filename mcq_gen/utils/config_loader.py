@@ -1,7 +1,13 @@
 from pathlib import Path
+import copy
 import os
+import threading
 import yaml
 
+# parsed config per path, reused until the file's mtime changes
+_CACHE: dict = {}
+_CACHE_LOCK = threading.Lock()
+
 
 def _project_root() -> Path:
     # E:\Project\MCQ-Generator\mcq_gen\utils\config_loader.py
@@ -22,6 +28,12 @@ def load_config(config_path: str | None = None) -> dict:
 
     if not path.exists():
         raise FileNotFoundError(f"config file not found: {path}")
-    with open(path, "r", encoding="utf-8") as f:
-        return yaml.safe_load(f) or {}
+    stamp = path.stat().st_mtime_ns
+    with _CACHE_LOCK:
+        cached = _CACHE.get(str(path))
+        if cached is None or cached[0] != stamp:
+            with open(path, "r", encoding="utf-8") as f:
+                cached = _CACHE[str(path)] = (stamp, yaml.safe_load(f) or {})
+    # callers may modify what they get back
+    return copy.deepcopy(cached[1])
 
@@ -1,49 +1,156 @@
 
 import sys
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from itertools import islice
 from pathlib import Path
-from typing import Iterable, List
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 from langchain_core.documents import Document
 from langchain_community.document_loaders import PyPDFLoader, TextLoader, Docx2txtLoader
 from fastapi import UploadFile
+from pypdf import PdfReader
 from mcq_gen.exception import ProjectException
 from mcq_gen.logger import logging as log
 
 SUPPORTED_EXTENSIONS = {".pdf", ".docx", ".txt"}
 
-def load_documents(paths: Iterable[Path]) -> List[Document]:
-    log.info("load documents started...")
-
-    docs: List[Document] = []
+def _loader_for(path: Path):
+    ext = path.suffix.lower()
+
+    if ext == ".pdf":
+        loader = PyPDFLoader(str(path))
+    elif ext == ".docx":
+        loader = Docx2txtLoader(str(path))
+    elif ext == ".txt":
+        loader = TextLoader(str(path), encoding="utf-8")
+    else:
+        log.info(f"Unsupported extension skipped, path={str(path)}")
+        return None
+    return loader
+
+
+def _load_file(path: Path) -> List[Document]:
+    loader = _loader_for(path)
+    return loader.load() if loader is not None else []
+
+
+def iter_documents(path: Path) -> Iterator[Document]:
+    """Yield a file's documents lazily (one per PDF page), so only the current page is held in memory."""
+    loader = _loader_for(path)
+    if loader is not None:
+        yield from loader.lazy_load()
+
+
+def _load_pdf_pages(path: Path, start: int, stop: int, template: dict) -> List[Document]:
+    """
+    Parse pages [start, stop) of a PDF. `template` is the file-level metadata PyPDFLoader gave
+    the file's first pages, so these pages get the same Documents it would yield for them.
+    """
+    reader = PdfReader(str(path))
+    # page_labels rebuilds the whole label list on every access: read it once
+    labels = reader.page_labels
+    docs = []
+    for page_number in range(start, stop):
+        # PyPDFLoader's default extraction for pypdf >= 4
+        text = reader.pages[page_number].extract_text(extraction_mode="plain").strip()
+        docs.append(Document(
+            page_content=text,
+            metadata=template | {"page": page_number, "page_label": labels[page_number]},
+        ))
+    return docs
+
+
+def _parse_head(path: Path, pages_per_task: int) -> Tuple[List[Document], int, Optional[str]]:
+    """
+    First task of every file, run in a worker: a whole non-PDF file, or the first pages_per_task
+    pages of a PDF through PyPDFLoader plus its page count, so the rest can be split into ranges.
+    """
     try:
-        for path in paths:
-            ext = path.suffix.lower()
-
-            if ext == ".pdf":
-                loader = PyPDFLoader(str(path))
-            elif ext == ".docx":
-                loader = Docx2txtLoader(str(path))
-            elif ext == ".txt":
-                loader = TextLoader(str(path), encoding="utf-8")
-            else:
-                log.info(f"Unsupported extension skipped, path={str(path)}")
-                continue
-            docs.extend(loader.load())
-
-        log.info(f"load document complited, {len(docs)} documents loaded...")
-        return docs
-       
-            
+        if path.suffix.lower() != ".pdf" or pages_per_task <= 0:
+            return _load_file(path), 0, None
+        docs = list(islice(PyPDFLoader(str(path)).lazy_load(), pages_per_task))
+        total = int(docs[0].metadata.get("total_pages", len(docs))) if docs else 0
+        return docs, total, None
     except Exception as e:
-        ProjectException(f"Failed loading documents, error={str(e)}", sys)
+        return [], 0, f"{type(e).__name__}: {e}"
 
 
+def _parse_pages(path: Path, start: int, stop: int, template: dict) -> Tuple[List[Document], Optional[str]]:
+    # runs in a worker process: errors are returned, not raised, so one bad file cannot abort the batch
+    try:
+        return _load_pdf_pages(path, start, stop, template), None
+    except Exception as e:
+        return [], f"{type(e).__name__}: {e}"
 
 
+def _in_order(paths: List[Path], parts: List[List[List[Document]]], failures: Dict[str, str]) -> List[Document]:
+    docs: List[Document] = []
+    for path, file_parts in zip(paths, parts):
+        if str(path) not in failures:
+            for part in file_parts:
+                docs.extend(part)
+    return docs
+
+
+def load_documents_parallel(
+        paths: Iterable[Path],
+        max_workers: int = 1,
+        pages_per_task: int = 16,
+) -> Tuple[List[Document], Dict[str, str]]:
+    """
+    Parse files on a process pool. Each worker opens its own file; a PDF longer than pages_per_task
+    comes back with its page count and the remaining pages are queued as ranges right away, so
+    nothing is opened serially in this process. Returns the documents in input order and a
+    {path: error} map of files that failed.
+    """
+    paths = list(paths)
+    failures: Dict[str, str] = {}
+    parts: List[List[Any]] = [[] for _ in paths]
+    if max_workers <= 1:
+        for i, path in enumerate(paths):
+            docs, _, error = _parse_head(path, 0)
+            if error is not None:
+                failures.setdefault(str(path), error)
+            parts[i].append(docs)
+        return _in_order(paths, parts, failures), failures
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        heads = {pool.submit(_parse_head, path, pages_per_task): i for i, path in enumerate(paths)}
+        for future in as_completed(heads):
+            i = heads[future]
+            docs, total, error = future.result()
+            if error is not None:
+                failures.setdefault(str(paths[i]), error)
+                continue
+            parts[i].append(docs)
+            if total > len(docs) and docs:
+                template = {k: v for k, v in docs[0].metadata.items() if k not in ("page", "page_label")}
+                for start in range(len(docs), total, pages_per_task):
+                    stop = min(start + pages_per_task, total)
+                    parts[i].append(pool.submit(_parse_pages, paths[i], start, stop, template))
 
+        # a file with any failed page range is dropped whole rather than half-indexed
+        for i, file_parts in enumerate(parts):
+            for n, part in enumerate(file_parts):
+                if isinstance(part, Future):
+                    file_parts[n], error = part.result()
+                    if error is not None:
+                        failures.setdefault(str(paths[i]), error)
 
+    return _in_order(paths, parts, failures), failures
 
 
+def load_documents(paths: Iterable[Path], max_workers: int = 1, pages_per_task: int = 16) -> List[Document]:
+    log.info("load documents started...")
 
+    try:
+        docs, failures = load_documents_parallel(paths, max_workers=max_workers, pages_per_task=pages_per_task)
+        for path, error in failures.items():
+            log.error(f"Failed loading document, path={path}, error={error}")
 
+        log.info(f"load document complited, {len(docs)} documents loaded, failed={len(failures)}, workers={max_workers}...")
+        return docs
 
+    except Exception as e:
+        log.error(f"Failed loading documents, error={str(e)}")
+        raise ProjectException(f"Failed loading documents, error={str(e)}", sys)
 
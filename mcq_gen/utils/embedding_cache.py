@@ -0,0 +1,392 @@
+import hashlib
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from mcq_gen.logger import logging as log
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    """
+    SQLite blob store of float32 vectors keyed by (model, sha256 of text),
+    evicted least-recently-used first once it grows past max_bytes.
+    """
+
+    def __init__(self, path: Path, max_bytes: int = 512 * 1024 * 1024):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON embeddings(last_access)")
+        self._conn.commit()
+        self._size = self._conn.execute("SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings").fetchone()[0]
+        self.evictions = 0
+
+    @property
+    def size_bytes(self) -> int:
+        return self._size
+
+    def get_many(self, model: str, hashes: List[str]) -> Dict[str, np.ndarray]:
+        found: Dict[str, np.ndarray] = {}
+        if not hashes:
+            return found
+        now = time.time()
+        with self._lock:
+            unique = list(dict.fromkeys(hashes))
+            # stay below SQLite's bound-parameter limit
+            for start in range(0, len(unique), 500):
+                part = unique[start:start + 500]
+                marks = ",".join("?" * len(part))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({marks})",
+                    [model, *part],
+                ).fetchall()
+                for h, blob in rows:
+                    found[h] = np.frombuffer(blob, dtype=np.float32)
+            if found:
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_access = ? WHERE model = ? AND text_hash = ?",
+                    [(now, model, h) for h in found],
+                )
+                self._conn.commit()
+        return found
+
+    def put_many(self, model: str, items: Dict[str, List[float]]) -> None:
+        if not items:
+            return
+        now = time.time()
+        rows = [(model, h, np.asarray(v, dtype=np.float32).tobytes(), now) for h, v in items.items()]
+        with self._lock:
+            for _, h, blob, _ in rows:
+                old = self._conn.execute(
+                    "SELECT LENGTH(vector) FROM embeddings WHERE model = ? AND text_hash = ?", (model, h)
+                ).fetchone()
+                self._size += len(blob) - (old[0] if old else 0)
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, vector, last_access) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+            self._evict()
+
+    def _evict(self) -> None:
+        # trim to 90% of the budget so a full cache does not evict on every insert
+        if self._size <= self.max_bytes:
+            return
+        target = int(self.max_bytes * 0.9)
+        cur = self._conn.execute("SELECT model, text_hash, LENGTH(vector) FROM embeddings ORDER BY last_access ASC")
+        victims = []
+        size = self._size
+        for model, h, n in cur:
+            if size <= target:
+                break
+            victims.append((model, h))
+            size -= n
+        self._conn.executemany("DELETE FROM embeddings WHERE model = ? AND text_hash = ?", victims)
+        self._conn.commit()
+        self._size = size
+        self.evictions += len(victims)
+        log.info(f"Embedding cache evicted, entries={len(victims)}, size_bytes={self._size}")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps an Embeddings model so document chunks that were embedded before
+    (by any session) are served from the EmbeddingStore instead of the API.
+    """
+
+    def __init__(self, embeddings: Embeddings, model_name: str, store: EmbeddingStore):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.store = store
+        self.hits = 0
+        self.misses = 0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        hashes = [text_hash(t) for t in texts]
+        cached = self.store.get_many(self.model_name, hashes)
+
+        missing: Dict[str, str] = {}
+        for h, t in zip(hashes, texts):
+            if h not in cached and h not in missing:
+                missing[h] = t
+        hit_count = sum(1 for h in hashes if h in cached)
+        self.hits += hit_count
+        self.misses += len(texts) - hit_count
+
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            fresh = dict(zip(missing.keys(), vectors))
+            self.store.put_many(self.model_name, fresh)
+            cached.update({h: np.asarray(v, dtype=np.float32) for h, v in fresh.items()})
+
+        log.info(f"Embedding cache lookup, texts={len(texts)}, api_texts={len(missing)}, hits={self.hits}, misses={self.misses}")
+        return [cached[h].tolist() for h in hashes]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Topics in one request, past the store: they are not chunks and must not evict them."""
+        return self.embeddings.embed_documents(list(texts))
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await self.embeddings.aembed_query(text)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.store.evictions,
+            "size_bytes": self.store.size_bytes,
+        }
+
+
+def normalize_topic(text: str) -> str:
+    """Case, unicode form and whitespace do not change what a topic retrieves."""
+    return " ".join(unicodedata.normalize("NFKC", text).casefold().split())
+
+
+class QueryEmbeddingCache:
+    """
+    Query vectors keyed by (model, normalized topic): an in-process LRU of max_entries,
+    backed by an optional SQLite file shared across processes and restarts.
+    Entries older than ttl_seconds are treated as misses in both tiers.
+    """
+
+    def __init__(
+            self,
+            max_entries: int = 4096,
+            ttl_seconds: Optional[float] = 7 * 24 * 3600,
+            path: Optional[Path] = None,
+            disk_max_entries: int = 100000,
+    ):
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_seconds = float(ttl_seconds) if ttl_seconds else None
+        self.disk_max_entries = int(disk_max_entries)
+        self._memory: "OrderedDict[Tuple[str, str], Tuple[np.ndarray, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.path = Path(path) if path else None
+        self._conn = None
+        if self.path is not None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS query_embeddings (
+                    model TEXT NOT NULL,
+                    topic TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    created REAL NOT NULL,
+                    PRIMARY KEY (model, topic)
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_query_created ON query_embeddings(created)")
+            self._conn.commit()
+
+    def _fresh(self, created: float, now: float) -> bool:
+        return self.ttl_seconds is None or now - created < self.ttl_seconds
+
+    def _remember(self, key: Tuple[str, str], vector: np.ndarray, created: float) -> None:
+        self._memory[key] = (vector, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get_many(self, model: str, topics: List[str]) -> Dict[str, np.ndarray]:
+        """Cached vectors by normalized topic; expired or unknown topics are left out."""
+        now = time.time()
+        found: Dict[str, np.ndarray] = {}
+        wanted: List[str] = []
+        with self._lock:
+            for topic in dict.fromkeys(normalize_topic(t) for t in topics):
+                entry = self._memory.get((model, topic))
+                if entry is not None and self._fresh(entry[1], now):
+                    self._memory.move_to_end((model, topic))
+                    found[topic] = entry[0]
+                else:
+                    self._memory.pop((model, topic), None)
+                    wanted.append(topic)
+            if wanted and self._conn is not None:
+                for start in range(0, len(wanted), 500):
+                    part = wanted[start:start + 500]
+                    marks = ",".join("?" * len(part))
+                    rows = self._conn.execute(
+                        f"SELECT topic, vector, created FROM query_embeddings WHERE model = ? AND topic IN ({marks})",
+                        [model, *part],
+                    ).fetchall()
+                    for topic, blob, created in rows:
+                        if self._fresh(created, now):
+                            vector = np.frombuffer(blob, dtype=np.float32)
+                            found[topic] = vector
+                            self._remember((model, topic), vector, created)
+                            self.disk_hits += 1
+        self.hits += sum(1 for t in topics if normalize_topic(t) in found)
+        self.misses += sum(1 for t in topics if normalize_topic(t) not in found)
+        return found
+
+    def put_many(self, model: str, items: Dict[str, List[float]]) -> None:
+        if not items:
+            return
+        now = time.time()
+        vectors = {normalize_topic(t): np.asarray(v, dtype=np.float32) for t, v in items.items()}
+        with self._lock:
+            for topic, vector in vectors.items():
+                self._remember((model, topic), vector, now)
+            if self._conn is None:
+                return
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO query_embeddings (model, topic, vector, created) VALUES (?, ?, ?, ?)",
+                [(model, topic, vector.tobytes(), now) for topic, vector in vectors.items()],
+            )
+            self._trim(now)
+            self._conn.commit()
+
+    def _trim(self, now: float) -> None:
+        if self.ttl_seconds is not None:
+            self._conn.execute("DELETE FROM query_embeddings WHERE created < ?", (now - self.ttl_seconds,))
+        count = self._conn.execute("SELECT COUNT(*) FROM query_embeddings").fetchone()[0]
+        if count > self.disk_max_entries:
+            # oldest entries first, they are also the closest to expiring
+            self._conn.execute(
+                "DELETE FROM query_embeddings WHERE rowid IN "
+                "(SELECT rowid FROM query_embeddings ORDER BY created ASC LIMIT ?)",
+                (count - self.disk_max_entries,),
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM query_embeddings")
+                self._conn.commit()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "entries": len(self._memory),
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class QueryCachedEmbeddings(Embeddings):
+    """
+    Wraps an Embeddings model so a topic that was retrieved before is answered from the
+    QueryEmbeddingCache; only unseen topics reach the API. Documents pass straight through.
+    Topics are embedded by the model below any CachedEmbeddings, so they never enter the
+    chunk store, where they would outlive ttl_seconds and crowd out chunks.
+    """
+
+    def __init__(self, embeddings: Embeddings, model_name: str, cache: QueryEmbeddingCache):
+        self.embeddings = embeddings
+        self.model = embeddings.embeddings if isinstance(embeddings, CachedEmbeddings) else embeddings
+        self.model_name = model_name
+        self.cache = cache
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Many topics at once; the misses are embedded in a single request."""
+        cached = self.cache.get_many(self.model_name, texts)
+        unseen: Dict[str, str] = {}
+        for t in texts:
+            key = normalize_topic(t)
+            if key not in cached and key not in unseen:
+                unseen[key] = t
+        missing = list(unseen.values())
+        if len(missing) == 1:
+            fresh = {missing[0]: self.model.embed_query(missing[0])}
+        elif missing:
+            # Mistral embeds queries and documents alike, so a batch is one documents call
+            fresh = dict(zip(missing, self.model.embed_documents(missing)))
+        else:
+            fresh = {}
+        self.cache.put_many(self.model_name, fresh)
+        cached.update({normalize_topic(t): np.asarray(v, dtype=np.float32) for t, v in fresh.items()})
+        log.info(f"Query embedding cache lookup, queries={len(texts)}, api_queries={len(missing)}, hits={self.cache.hits}, misses={self.cache.misses}")
+        return [cached[normalize_topic(t)].tolist() for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_queries([text])[0]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        cached = self.cache.get_many(self.model_name, [text])
+        if cached:
+            return next(iter(cached.values())).tolist()
+        vector = await self.model.aembed_query(text)
+        self.cache.put_many(self.model_name, {text: vector})
+        return list(vector)
+
+    def stats(self) -> Dict[str, int]:
+        return self.cache.stats()
+
+
+def wrap_embeddings(
+        embeddings: Embeddings,
+        model_name: str,
+        cache_cfg: Optional[dict],
+        query_cache_cfg: Optional[dict] = None,
+) -> Embeddings:
+    """
+    Return embeddings wrapped with the disk cache when `embedding_cache` is enabled in config,
+    and with the query cache when `query_cache` is.
+    """
+    if cache_cfg and cache_cfg.get("enabled", False):
+        store = EmbeddingStore(
+            Path(cache_cfg.get("path", "cache/embeddings.sqlite")),
+            max_bytes=int(cache_cfg.get("max_size_mb", 512)) * 1024 * 1024,
+        )
+        log.info(f"Embedding cache enabled, path={store.path}, size_bytes={store.size_bytes}")
+        embeddings = CachedEmbeddings(embeddings, model_name, store)
+    if query_cache_cfg and query_cache_cfg.get("enabled", False):
+        path = query_cache_cfg.get("path") if query_cache_cfg.get("disk", True) else None
+        cache = QueryEmbeddingCache(
+            max_entries=int(query_cache_cfg.get("max_entries", 4096)),
+            ttl_seconds=query_cache_cfg.get("ttl_seconds", 7 * 24 * 3600),
+            path=Path(path) if path else None,
+            disk_max_entries=int(query_cache_cfg.get("disk_max_entries", 100000)),
+        )
+        log.info(f"Query embedding cache enabled, path={cache.path}, max_entries={cache.max_entries}, ttl_seconds={cache.ttl_seconds}")
+        embeddings = QueryCachedEmbeddings(embeddings, model_name, cache)
+    return embeddings
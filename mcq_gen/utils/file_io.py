@@ -1,54 +1,154 @@
+import hashlib
+import mmap
+import os
+import stat
 import sys
 import uuid
 import re
 from pathlib import Path
-from typing import Iterable, List
+from typing import BinaryIO, Iterable, Iterator, List, NamedTuple
 from mcq_gen.exception import ProjectException
 from mcq_gen.logger import logging as log
 
 SUPPORTED_EXTENSIONS = {".pdf", ".docx", ".txt", ".pptx", ".md", ".csv", ".xlsx", ".xls", ".db", ".sqlite", ".sqlite3"}
 
+# size of each slice written (and hashed) while copying an upload
+COPY_BUFFER_SIZE = 1024 * 1024
 
-def save_uploaded_files(uploaded_files: Iterable, target_dir: Path) -> List[Path]:
-    """Save uploaded files (Streamlit-like) and return local paths."""
+
+class SavedUpload(NamedTuple):
+    path: Path
+    sha256: str
+
+
+def sha256_file(path: Path, chunk_size: int = 1024 * 1024) -> str:
+    """Stream a file through sha256 without loading it whole."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _write_view(view: memoryview, out: BinaryIO, h, buffer_size: int) -> None:
+    # slices of a memoryview are views too: nothing is copied before the write syscall
+    for start in range(0, len(view), buffer_size):
+        part = view[start:start + buffer_size]
+        h.update(part)
+        out.write(part)
+
+
+def _regular_fileno(src) -> int:
+    # fileno() on an in-memory SpooledTemporaryFile (Starlette's UploadFile.file) rolls it over to disk
+    if getattr(src, "_rolled", True) is False:
+        return -1
+    try:
+        fd = src.fileno()
+    except (AttributeError, OSError, ValueError):
+        return -1
+    return fd if stat.S_ISREG(os.fstat(fd).st_mode) else -1
+
+
+def _copy_stream(src, out: BinaryIO, buffer_size: int) -> str:
+    """Copy src into out from its current position, hashing in the same pass."""
+    h = hashlib.sha256()
+    fd = _regular_fileno(src)
+    if fd >= 0:
+        # a real file is mapped and written straight from the page cache
+        pos = src.tell()
+        size = os.fstat(fd).st_size
+        if size > pos:
+            with mmap.mmap(fd, 0, access=mmap.ACCESS_READ) as mm:
+                with memoryview(mm) as view:
+                    _write_view(view[pos:], out, h, buffer_size)
+            src.seek(size)
+        return h.hexdigest()
+
+    if hasattr(src, "readinto"):
+        buf = bytearray(buffer_size)
+        view = memoryview(buf)
+        while True:
+            n = src.readinto(buf)
+            if not n:
+                break
+            h.update(view[:n])
+            out.write(view[:n])
+        return h.hexdigest()
+
+    while True:
+        block = src.read(buffer_size)
+        if not block:
+            break
+        if isinstance(block, memoryview):
+            _write_view(block, out, h, buffer_size)
+        else:
+            h.update(block)
+            out.write(block)
+    return h.hexdigest()
+
+
+def _copy_upload(uf, out: BinaryIO, buffer_size: int) -> str:
+    # Prefer underlying file buffer when available (e.g., Starlette UploadFile.file)
+    if hasattr(uf, "file") and hasattr(uf.file, "read"):
+        return _copy_stream(uf.file, out, buffer_size)
+    # in-memory buffers (BytesIO, Streamlit uploads) expose getbuffer(): write the view, no copy
+    buf = getattr(uf, "getbuffer", None)
+    if callable(buf):
+        h = hashlib.sha256()
+        pos = uf.tell() if hasattr(uf, "tell") else 0
+        data = buf()
+        view = data if isinstance(data, memoryview) else memoryview(data)
+        with view:
+            flat = view.cast("B")
+            _write_view(flat[pos:], out, h, buffer_size)
+            end = len(flat)
+        if hasattr(uf, "seek"):
+            uf.seek(max(pos, end))
+        return h.hexdigest()
+    if hasattr(uf, "read"):
+        return _copy_stream(uf, out, buffer_size)
+    raise ValueError("Unsupported uploaded file object; no readable interface")
+
+
+def iter_saved_uploads(uploaded_files: Iterable, target_dir: Path, buffer_size: int = COPY_BUFFER_SIZE) -> Iterator[SavedUpload]:
+    """
+    Save uploaded files one at a time in buffer_size slices, yielding each local path
+    with the sha256 computed during the copy, as soon as the file is on disk.
+    """
+    target_dir.mkdir(parents=True, exist_ok=True)
+    for uf in uploaded_files:
+        # Handle Starlette UploadFile (has .filename and .file) and generic objects (have .name)
+        name = getattr(uf, "filename", getattr(uf, "name", "file"))
+        ext = Path(name).suffix.lower()
+        if ext not in SUPPORTED_EXTENSIONS:
+            log.warning(f"Unsupported file skipped, filename={name}")
+            continue
+        # Clean file name (only alphanum, dash, underscore)
+        safe_name = re.sub(r'[^a-zA-Z0-9_\-]', '_', Path(name).stem).lower()
+        fname = f"{safe_name}_{uuid.uuid4().hex[:6]}{ext}"
+        fname = f"{uuid.uuid4().hex[:8]}{ext}"
+        out = target_dir / fname
+        with open(out, "wb") as f:
+            digest = _copy_upload(uf, f, buffer_size)
+        log.info(f"File saved for ingestion, uploaded={name}, saved_as={str(out)}, sha256={digest[:12]}")
+        yield SavedUpload(out, digest)
+
+
+def iter_saved_files(uploaded_files: Iterable, target_dir: Path) -> Iterator[Path]:
+    """Save uploaded files one at a time, yielding each local path as soon as it is on disk."""
+    for saved in iter_saved_uploads(uploaded_files, target_dir):
+        yield saved.path
+
+
+def save_uploads(uploaded_files: Iterable, target_dir: Path, buffer_size: int = COPY_BUFFER_SIZE) -> List[SavedUpload]:
+    """Save uploaded files and return (local path, sha256) pairs."""
     try:
-        target_dir.mkdir(parents=True, exist_ok=True)
-        saved: List[Path] = []
-        for uf in uploaded_files:
-            # Handle Starlette UploadFile (has .filename and .file) and generic objects (have .name)
-            name = getattr(uf, "filename", getattr(uf, "name", "file"))
-            ext = Path(name).suffix.lower()
-            if ext not in SUPPORTED_EXTENSIONS:
-                log.warning(f"Unsupported file skipped, filename={name}")
-                continue
-            # Clean file name (only alphanum, dash, underscore)
-            safe_name = re.sub(r'[^a-zA-Z0-9_\-]', '_', Path(name).stem).lower()
-            fname = f"{safe_name}_{uuid.uuid4().hex[:6]}{ext}"
-            fname = f"{uuid.uuid4().hex[:8]}{ext}"
-            out = target_dir / fname
-            with open(out, "wb") as f:
-                # Prefer underlying file buffer when available (e.g., Starlette UploadFile.file)
-                if hasattr(uf, "file") and hasattr(uf.file, "read"):
-                    f.write(uf.file.read())
-                elif hasattr(uf, "read"):
-                    data = uf.read()
-                    # If a memoryview is returned, convert to bytes; otherwise assume bytes
-                    if isinstance(data, memoryview):
-                        data = data.tobytes()
-                    f.write(data)
-                else:
-                    # Fallback for objects exposing a getbuffer()
-                    buf = getattr(uf, "getbuffer", None)
-                    if callable(buf):
-                        data = buf()
-                        if isinstance(data, memoryview):
-                            data = data.tobytes()
-                        f.write(data)
-                    else:
-                        raise ValueError("Unsupported uploaded file object; no readable interface")
-            saved.append(out)
-            log.info(f"File saved for ingestion, uploaded={name}, saved_as={str(out)}")
-        return saved
+        return list(iter_saved_uploads(uploaded_files, target_dir, buffer_size))
     except Exception as e:
         log.error(f"Failed to save uploaded files, error={str(e)}, dir={str(target_dir)}")
         raise ProjectException(f"Failed to save uploaded files error{str(e)}", sys)
+
+
+def save_uploaded_files(uploaded_files: Iterable, target_dir: Path) -> List[Path]:
+    """Save uploaded files (Streamlit-like) and return local paths."""
+    return [saved.path for saved in save_uploads(uploaded_files, target_dir)]
@@ -1,8 +1,10 @@
 import os
 import sys
 import json
+from functools import lru_cache
 from dotenv import load_dotenv
 from mcq_gen.utils.config_loader import load_config
+from mcq_gen.utils.embedding_cache import wrap_embeddings
 
 from langchain_mistralai import ChatMistralAI, MistralAIEmbeddings
 
@@ -96,16 +98,33 @@ class ModelLoader:
 
     def load_embeddings(self):
         """
-        load and return embedding model from Mistral AI
+        load and return embedding model from Mistral AI, once per loader
         """
+        if getattr(self, "_embeddings", None) is not None:
+            return self._embeddings
         try:
             model_name = self.config["embedding_model"]["model_name"]
             log.info(f"Loading embedding model, model={model_name}")
-            return MistralAIEmbeddings(
+            embeddings = MistralAIEmbeddings(
                 model=model_name
             )
+            # re-uploaded documents and repeated topics are served from the caches instead of the API
+            self._embeddings = wrap_embeddings(
+                embeddings, model_name, self.config.get("embedding_cache"), self.config.get("query_cache")
+            )
+            return self._embeddings
         except Exception as e:
             log.error(f"Error loading embedding model, error={str(e)}")
             raise ProjectException("Failed to load embedding model", sys)
 
 
+@lru_cache(maxsize=1)
+def shared_model_loader() -> ModelLoader:
+    """One ModelLoader per process: .env, API keys and config.yaml are read once."""
+    return ModelLoader()
+
+
+@lru_cache(maxsize=1)
+def shared_llm():
+    """Chat client reused by every request, so its keep-alive HTTP connection pool is shared."""
+    return shared_model_loader().load_llm()
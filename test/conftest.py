@@ -0,0 +1,54 @@
+import hashlib
+from typing import List
+
+import pytest
+from langchain_core.embeddings import Embeddings
+
+
+class FakeEmbeddings(Embeddings):
+    """Deterministic offline embedder that records every call."""
+
+    def __init__(self, dim: int = 16):
+        self.dim = dim
+        self.document_calls: List[List[str]] = []
+        self.query_calls: List[str] = []
+
+    def _vector(self, text: str) -> List[float]:
+        digest = hashlib.sha256(text.encode("utf-8")).digest()
+        return [(digest[i % len(digest)] - 128) / 128.0 for i in range(self.dim)]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.document_calls.append(list(texts))
+        return [self._vector(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        self.query_calls.append(text)
+        return self._vector(text)
+
+
+class FakeModelLoader:
+    def __init__(self, embeddings: Embeddings):
+        self.embeddings = embeddings
+
+    def load_embeddings(self):
+        return self.embeddings
+
+
+@pytest.fixture
+def fake_embeddings():
+    return FakeEmbeddings()
+
+
+@pytest.fixture
+def fake_loader(fake_embeddings):
+    return FakeModelLoader(fake_embeddings)
+
+
+@pytest.fixture(autouse=True)
+def isolated_response_cache(monkeypatch):
+    """Each test starts with an empty in-memory LLM response cache instead of the configured one."""
+    from mcq_gen.src.generator import generator
+    from mcq_gen.src.generator.response_cache import MemoryResponseCache
+
+    monkeypatch.setattr(generator, "default_response_cache", lambda: MemoryResponseCache())
+
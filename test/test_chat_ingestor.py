@@ -0,0 +1,59 @@
+import io
+import os
+
+import pytest
+
+import mcq_gen.src.data_ingestion.chat_ingestor as chat_ingestor
+from mcq_gen.src.data_ingestion.chat_ingestor import ChatIngestor
+
+
+@pytest.fixture
+def ingestor_factory(tmp_path, fake_loader, monkeypatch):
+    monkeypatch.setattr(chat_ingestor, "shared_model_loader", lambda: fake_loader)
+
+    def make(session_id):
+        return ChatIngestor(
+            temp_base=str(tmp_path / "data"),
+            faiss_base=str(tmp_path / "faiss_index"),
+            session_id=session_id,
+        )
+    return make
+
+
+def _upload(text, name="notes.txt"):
+    buf = io.BytesIO(text.encode("utf-8"))
+    buf.name = name
+    return buf
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_known_upload_reuses_chunks_from_another_session(ingestor_factory, fake_embeddings, streaming):
+    text = "\n\n".join(f"paragraph {i} about tokenization" for i in range(30))
+
+    first = ingestor_factory("s1")
+    first.build_retriever([_upload(text)], chunk_size=100, chunk_overlap=0, streaming=streaming)
+    calls = len(fake_embeddings.document_calls)
+
+    second = ingestor_factory("s2")
+    retriever = second.build_retriever([_upload(text)], chunk_size=100, chunk_overlap=0, streaming=streaming)
+
+    assert len(fake_embeddings.document_calls) == calls
+    assert retriever.vectorstore.index.ntotal > 0
+    docs = retriever.vectorstore.similarity_search("paragraph 3", k=1)
+    assert docs[0].metadata["source"].startswith(str(second.temp_dir))
+
+    saved = next(second.temp_dir.iterdir())
+    assert os.stat(saved).st_nlink >= 3  # blob + both session copies share one inode
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_reupload_in_the_same_session_adds_nothing(ingestor_factory, fake_embeddings, streaming):
+    text = "\n\n".join(f"paragraph {i} about tokenization" for i in range(30))
+    ingestor = ingestor_factory("s1")
+    first = ingestor.build_retriever([_upload(text)], chunk_size=100, chunk_overlap=0, streaming=streaming)
+    total = first.vectorstore.index.ntotal
+    calls = len(fake_embeddings.document_calls)
+
+    again = ingestor.build_retriever([_upload(text)], chunk_size=100, chunk_overlap=0, streaming=streaming)
+    assert again.vectorstore.index.ntotal == total
+    assert len(fake_embeddings.document_calls) == calls
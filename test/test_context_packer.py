@@ -0,0 +1,44 @@
+import pytest
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from mcq_gen.exception import ProjectException
+from mcq_gen.src.generator.context_packer import ContextPacker, TokenCounter
+
+TEXT = " ".join(f"Sentence {i} explains concept number {i} of the course in plain words." for i in range(60))
+
+
+def test_overlap_is_cut_and_duplicates_dropped():
+    chunks = RecursiveCharacterTextSplitter(chunk_size=400, chunk_overlap=120).split_text(TEXT)
+    docs = [Document(page_content=c) for c in chunks]
+    packer = ContextPacker(max_tokens=100000)
+
+    texts, stats = packer.pack(docs + [Document(page_content=chunks[2])])
+    assert stats["duplicates"] == 1 and stats["trimmed_chars"] > 0
+    # the packed chunks read as the original text with every overlap removed once
+    assert " ".join(texts).split() == TEXT.split()
+
+
+def test_budget_truncates_and_stops():
+    docs = [Document(page_content=f"Chunk {i} " + "word " * 200) for i in range(5)]
+    packer = ContextPacker(max_tokens=300, dedupe_threshold=1.01)
+    texts, stats = packer.pack(docs)
+    assert stats["tokens"] <= 300
+    assert len(texts) == 2 and texts[1].startswith("Chunk 1")
+    assert packer.counter.count(packer.pack_text(docs)) <= 300
+
+
+def test_local_tokenizer_is_exact_and_missing_one_fails(tmp_path):
+    from tokenizers import Tokenizer, models, pre_tokenizers
+
+    tokenizer = Tokenizer(models.WordLevel({"[UNK]": 0, "plain": 1, "words": 2}, unk_token="[UNK]"))
+    tokenizer.pre_tokenizer = pre_tokenizers.Whitespace()
+    tokenizer.save(str(tmp_path / "tokenizer.json"))
+    counter = TokenCounter(str(tmp_path / "tokenizer.json"), allow_estimate=False)
+    assert counter.exact and counter.count("plain words, plain") == 4
+
+    with pytest.raises(ProjectException):
+        TokenCounter(str(tmp_path / "missing.json"), allow_estimate=False)
+    with pytest.raises(ProjectException):
+        TokenCounter(allow_estimate=False)
+    assert not TokenCounter(str(tmp_path / "missing.json")).exact
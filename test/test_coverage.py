@@ -0,0 +1,70 @@
+import numpy as np
+from langchain_core.documents import Document
+
+from mcq_gen.src.data_ingestion.coverage import build_coverage, kmeans, load_coverage, representatives
+from mcq_gen.src.data_ingestion.faiss_manager import FaissManager
+from mcq_gen.src.generator.mmr_retriever import make_retriever
+
+SETTINGS = {"clusters": 4, "per_cluster": 1, "iterations": 25, "max_train_vectors": 20000, "seed": 0}
+
+
+def test_kmeans_finds_separated_clusters_and_orders_by_document():
+    rng = np.random.default_rng(0)
+    centers = np.array([[10, 0], [0, 10], [-10, 0], [0, -10]], dtype=np.float32)
+    # chunks of one section are contiguous, like the pages of a document
+    x = np.concatenate([c + 0.1 * rng.normal(size=(25, 2)) for c in centers]).astype(np.float32)
+
+    found = kmeans(x, 4, seed=0)
+    assert np.array_equal(found, kmeans(x, 4, seed=0))
+    picks = representatives(x, found, per_cluster=2)
+    assert [int(p) // 25 for p in picks] == [0, 0, 1, 1, 2, 2, 3, 3]
+
+
+def test_empty_topic_uses_cached_coverage_without_embedding(tmp_path, fake_loader, fake_embeddings):
+    fm = FaissManager(tmp_path, fake_loader)
+    fm.load_or_create()
+    fm.add_documents([Document(page_content=f"chunk {i}", metadata={"source": "a.txt"}) for i in range(40)])
+    fm.flush()
+
+    positions = build_coverage(fm.vs, tmp_path, SETTINGS)
+    assert len(positions) == 4 and len(set(positions.tolist())) == 4
+    assert np.array_equal(load_coverage(tmp_path, fm.vs, SETTINGS), positions)
+    assert load_coverage(tmp_path, fm.vs, {**SETTINGS, "clusters": 5}) is None
+
+    retriever = make_retriever(fm.vs, k=3, search_type="mmr", fetch_k=10, lambda_mult=0.5, coverage=positions)
+    docs = retriever.invoke("")
+    assert [d.page_content for d in docs] == [f"chunk {int(p)}" for p in positions]
+    assert fake_embeddings.query_calls == []
+
+    many = retriever.retrieve_many(["  ", "chunk 3"])
+    assert len(many[0]) == 4 and len(many[1]) == 3
+    assert fake_embeddings.document_calls[-1] == ["chunk 3"]
+
+
+def test_coverage_of_replaced_content_with_the_same_chunk_count_is_stale(tmp_path, fake_loader):
+    fm = FaissManager(tmp_path, fake_loader)
+    fm.load_or_create()
+    fm.sync_file("a.txt", "v1", [Document(page_content=f"old {i}", metadata={"source": "a.txt"}) for i in range(8)])
+    fm.flush()
+    build_coverage(fm.vs, tmp_path, SETTINGS)
+    old = {name: (tmp_path / name).read_bytes() for name in ("coverage.npy", "coverage.json")}
+
+    fm.sync_file("a.txt", "v2", [Document(page_content=f"new {i}", metadata={"source": "a.txt"}) for i in range(8)])
+    fm.flush()
+    for name, data in old.items():
+        (tmp_path / name).write_bytes(data)
+    assert load_coverage(tmp_path, fm.vs, SETTINGS) is None
+
+
+def test_sampled_training_assigns_every_vector(tmp_path, fake_loader):
+    fm = FaissManager(tmp_path, fake_loader)
+    fm.load_or_create()
+    fm.add_documents([Document(page_content=f"chunk {i}", metadata={"source": "a.txt"}) for i in range(60)])
+    fm.flush()
+    settings = {**SETTINGS, "max_train_vectors": 30}
+
+    positions = build_coverage(fm.vs, tmp_path, settings)
+    vectors = fm.vs.index.reconstruct_n(0, fm.vs.index.ntotal)
+    sample = np.sort(np.random.default_rng(0).choice(60, size=30, replace=False))
+    centers = kmeans(vectors[sample], 4, 25, 0)
+    assert np.array_equal(positions, representatives(vectors, centers, 1))
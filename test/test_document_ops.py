@@ -0,0 +1,56 @@
+from pathlib import Path
+
+from langchain_community.document_loaders import PyPDFLoader
+
+from mcq_gen.utils.document_ops import load_documents, load_documents_parallel
+
+
+def _write_pdf(path: Path, pages):
+    """Write a minimal text PDF, one string per page."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in pages:
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>"
+        )
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for i, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{i} 0 obj\n{obj}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{o:010d} 00000 n \n" for o in offsets).encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    path.write_bytes(out)
+    return path
+
+
+def test_parallel_parsing_keeps_input_order_and_page_output(tmp_path):
+    big = _write_pdf(tmp_path / "big.pdf", [f"page {i}" for i in range(7)])
+    note = tmp_path / "note.txt"
+    note.write_text("plain text file", encoding="utf-8")
+    small = _write_pdf(tmp_path / "small.pdf", ["only page"])
+
+    sequential = load_documents([big, note, small])
+    parallel = load_documents([big, note, small], max_workers=3, pages_per_task=2)
+
+    assert [d.page_content for d in parallel] == [d.page_content for d in sequential]
+    assert [d.metadata for d in parallel[:7]] == [d.metadata for d in PyPDFLoader(str(big)).load()]
+
+
+def test_one_bad_file_does_not_abort_the_batch(tmp_path):
+    good = _write_pdf(tmp_path / "good.pdf", ["fine"])
+    bad = tmp_path / "bad.pdf"
+    bad.write_bytes(b"not a pdf at all")
+
+    docs, failures = load_documents_parallel([bad, good], max_workers=2)
+
+    assert [d.page_content for d in docs] == ["fine"]
+    assert list(failures) == [str(bad)]
@@ -0,0 +1,87 @@
+from mcq_gen.utils.embedding_cache import (
+    CachedEmbeddings,
+    EmbeddingStore,
+    QueryCachedEmbeddings,
+    QueryEmbeddingCache,
+    text_hash,
+)
+
+
+def test_known_texts_cost_no_api_calls(tmp_path, fake_embeddings):
+    store = EmbeddingStore(tmp_path / "emb.sqlite")
+    cached = CachedEmbeddings(fake_embeddings, "fake-embed", store)
+    texts = ["alpha", "beta", "gamma"]
+
+    first = cached.embed_documents(texts)
+    assert len(fake_embeddings.document_calls) == 1
+
+    # a new wrapper over the same file behaves like a later session
+    again = CachedEmbeddings(fake_embeddings, "fake-embed", EmbeddingStore(tmp_path / "emb.sqlite"))
+    second = again.embed_documents(texts)
+
+    assert len(fake_embeddings.document_calls) == 1
+    assert again.stats()["hits"] == 3 and again.stats()["misses"] == 0
+    assert [round(x, 5) for x in second[0]] == [round(x, 5) for x in first[0]]
+
+
+def test_cache_is_keyed_by_model_and_evicts_lru(tmp_path, fake_embeddings):
+    vector_bytes = fake_embeddings.dim * 4
+    store = EmbeddingStore(tmp_path / "emb.sqlite", max_bytes=vector_bytes * 3)
+    cached = CachedEmbeddings(fake_embeddings, "fake-embed", store)
+
+    cached.embed_documents(["a", "b", "c"])
+    cached.embed_documents(["a"])  # refresh "a" so "b" is least recently used
+    cached.embed_documents(["d"])
+
+    assert store.evictions >= 1
+    assert store.size_bytes <= vector_bytes * 3
+    assert text_hash("a") in store.get_many("fake-embed", [text_hash("a")])
+    assert text_hash("b") not in store.get_many("fake-embed", [text_hash("b")])
+
+    other_model = CachedEmbeddings(fake_embeddings, "other-embed", store)
+    other_model.embed_documents(["a"])
+    assert other_model.misses == 1
+
+
+def test_repeated_topics_skip_the_api(tmp_path, fake_embeddings):
+    cache = QueryEmbeddingCache(max_entries=2, path=tmp_path / "queries.sqlite")
+    cached = QueryCachedEmbeddings(fake_embeddings, "fake-embed", cache)
+
+    first = cached.embed_query("Tokenization")
+    assert cached.embed_query("  tokenization ") == first
+    assert fake_embeddings.query_calls == ["Tokenization"]
+
+    # a batch only sends the topics not seen yet, once each
+    cached.embed_queries(["tokenization", "chapter 3", "Chapter  3", "stemming"])
+    assert fake_embeddings.document_calls == [["chapter 3", "stemming"]]
+
+    # "tokenization" fell out of the 2-entry LRU but the disk tier still has it
+    later = QueryCachedEmbeddings(fake_embeddings, "fake-embed", QueryEmbeddingCache(path=tmp_path / "queries.sqlite"))
+    assert [round(x, 5) for x in later.embed_query("TOKENIZATION")] == [round(x, 5) for x in first]
+    assert len(fake_embeddings.query_calls) == 1
+    assert later.stats()["disk_hits"] == 1
+
+
+def test_expired_topics_are_embedded_again(fake_embeddings):
+    cache = QueryEmbeddingCache(ttl_seconds=60)
+    cached = QueryCachedEmbeddings(fake_embeddings, "fake-embed", cache)
+    cached.embed_query("chapter 3")
+
+    vector, created = cache._memory[("fake-embed", "chapter 3")]
+    cache._memory[("fake-embed", "chapter 3")] = (vector, created - 120)
+    cached.embed_query("chapter 3")
+    assert fake_embeddings.query_calls == ["chapter 3", "chapter 3"]
+    assert cache.get_many("other-embed", ["chapter 3"]) == {}
+
+
+def test_topics_stay_out_of_the_chunk_store(tmp_path, fake_embeddings):
+    store = EmbeddingStore(tmp_path / "emb.sqlite")
+    cached = QueryCachedEmbeddings(
+        CachedEmbeddings(fake_embeddings, "fake-embed", store), "fake-embed", QueryEmbeddingCache()
+    )
+    cached.embed_queries(["chapter 3", "stemming"])
+    cached.embed_documents(["a chunk"])
+
+    assert fake_embeddings.document_calls == [["chapter 3", "stemming"], ["a chunk"]]
+    assert store.get_many("fake-embed", [text_hash("chapter 3"), text_hash("stemming")]) == {}
+    assert text_hash("a chunk") in store.get_many("fake-embed", [text_hash("a chunk")])
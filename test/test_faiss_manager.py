@@ -0,0 +1,143 @@
+from langchain_core.documents import Document
+
+from mcq_gen.src.data_ingestion.faiss_manager import FaissManager
+
+
+def _chunks(n):
+    return [Document(page_content=f"chunk number {i}", metadata={"row_id": i}) for i in range(n)]
+
+
+def test_first_ingestion_embeds_each_chunk_once(tmp_path, fake_loader, fake_embeddings):
+    fm = FaissManager(tmp_path / "idx", fake_loader)
+    fm.load_or_create()
+    added = fm.add_documents(_chunks(5))
+
+    assert added == 5
+    assert fm.embed_calls == 1
+    assert fm.embedded_texts == 5
+    assert sum(len(c) for c in fake_embeddings.document_calls) == 5
+    assert fm.vs.index.ntotal == 5
+
+
+def test_reingestion_skips_seen_chunks(tmp_path, fake_loader):
+    fm = FaissManager(tmp_path / "idx", fake_loader)
+    fm.load_or_create()
+    fm.add_documents(_chunks(3))
+
+    reopened = FaissManager(tmp_path / "idx", fake_loader)
+    reopened.load_or_create()
+    assert reopened.add_documents(_chunks(4)) == 1
+    assert reopened.embedded_texts == 1
+    assert reopened.vs.index.ntotal == 4
+
+
+def _file_chunks(source, texts):
+    return [Document(page_content=t, metadata={"source": source, "page": i}) for i, t in enumerate(texts)]
+
+
+def test_chunks_of_one_file_are_not_collapsed(tmp_path, fake_loader):
+    fm = FaissManager(tmp_path / "idx", fake_loader)
+    fm.load_or_create()
+    added, removed = fm.sync_file("notes.pdf", "h1", _file_chunks("notes.pdf", ["intro", "body", "outro"]))
+
+    assert (added, removed) == (3, 0)
+    assert fm.vs.index.ntotal == 3
+
+
+def test_modified_file_is_reindexed_incrementally(tmp_path, fake_loader):
+    fm = FaissManager(tmp_path / "idx", fake_loader)
+    fm.load_or_create()
+    fm.sync_file("notes.pdf", "h1", _file_chunks("notes.pdf", ["intro", "body", "outro"]))
+
+    reopened = FaissManager(tmp_path / "idx", fake_loader)
+    reopened.load_or_create()
+    assert reopened.is_indexed("notes.pdf", "h1")
+    assert reopened.sync_file("notes.pdf", "h1", []) == (0, 0)
+
+    added, removed = reopened.sync_file("notes.pdf", "h2", _file_chunks("notes.pdf", ["intro", "body", "appendix"]))
+    assert (added, removed) == (1, 1)
+    assert reopened.embedded_texts == 1
+    assert reopened.vs.index.ntotal == 3
+    texts = {reopened.vs.docstore.search(i).page_content for i in reopened.vs.index_to_docstore_id.values()}
+    assert texts == {"intro", "body", "appendix"}
+
+
+def test_file_without_chunks_keeps_its_entry(tmp_path, fake_loader):
+    fm = FaissManager(tmp_path / "idx", fake_loader)
+    fm.load_or_create()
+    fm.sync_file("notes.pdf", "h1", _file_chunks("notes.pdf", ["intro", "body"]))
+
+    # a new version that could not be parsed does not delete the indexed chunks
+    assert fm.sync_file("notes.pdf", "h2", []) == (0, 0)
+    assert fm.vs.index.ntotal == 2
+    assert fm.is_indexed("notes.pdf", "h1") and not fm.is_indexed("notes.pdf", "h2")
+    # the same content under another source (a re-upload) is already indexed
+    assert fm.is_indexed("copy.pdf", "h1") and fm.file_hash("copy.pdf") is None
+
+
+def test_adds_go_to_the_wal_until_flush(tmp_path, fake_loader):
+    fm = FaissManager(tmp_path / "idx", fake_loader, snapshot_every=100)
+    fm.load_or_create()
+    fm.sync_file("a.txt", "h1", _file_chunks("a.txt", ["one", "two"]))
+    fm.sync_file("b.txt", "h2", _file_chunks("b.txt", ["three"]))
+
+    assert not (tmp_path / "idx" / "index.faiss").exists()
+    assert fm.wal.size() > 0
+
+    # a new process replays the log without embedding anything again
+    reopened = FaissManager(tmp_path / "idx", fake_loader)
+    reopened.load_or_create()
+    assert reopened.vs.index.ntotal == 3
+    assert reopened.embed_calls == 0
+    assert reopened.is_indexed("b.txt", "h2")
+
+    reopened.flush()
+    assert (tmp_path / "idx" / "index.faiss").exists()
+    assert reopened.wal.size() == 0
+
+
+def test_torn_wal_record_is_dropped(tmp_path, fake_loader):
+    fm = FaissManager(tmp_path / "idx", fake_loader, snapshot_every=100)
+    fm.load_or_create()
+    fm.sync_file("a.txt", "h1", _file_chunks("a.txt", ["one", "two"]))
+    good = fm.wal.size()
+    fm.sync_file("b.txt", "h2", _file_chunks("b.txt", ["three"]))
+
+    # simulate a crash halfway through the second record
+    wal = tmp_path / "idx" / "wal.log"
+    wal.write_bytes(wal.read_bytes()[: good + 10])
+
+    reopened = FaissManager(tmp_path / "idx", fake_loader)
+    reopened.load_or_create()
+    assert reopened.vs.index.ntotal == 2
+    assert not reopened.is_indexed("b.txt", "h2")
+    assert wal.stat().st_size == good
+
+
+def test_interrupted_snapshot_is_rolled_forward(tmp_path, fake_loader, monkeypatch):
+    fm = FaissManager(tmp_path / "idx", fake_loader, snapshot_every=100)
+    fm.load_or_create()
+    fm.sync_file("a.txt", "h1", _file_chunks("a.txt", ["one", "two"]))
+
+    import mcq_gen.src.data_ingestion.faiss_manager as module
+    real_replace = module.os.replace
+    calls = []
+
+    def crash_on_second_rename(src, dst):
+        calls.append(dst)
+        if len(calls) == 2:
+            raise OSError("power loss")
+        real_replace(src, dst)
+
+    monkeypatch.setattr(module.os, "replace", crash_on_second_rename)
+    try:
+        fm.flush()
+    except OSError:
+        pass
+    monkeypatch.setattr(module.os, "replace", real_replace)
+
+    reopened = FaissManager(tmp_path / "idx", fake_loader)
+    reopened.load_or_create()
+    assert reopened.vs.index.ntotal == 2
+    assert len(reopened.vs.index_to_docstore_id) == 2
+    assert reopened.wal.size() == 0
@@ -0,0 +1,89 @@
+import asyncio
+import json
+import re
+
+import pytest
+from langchain_core.documents import Document
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import RunnableLambda
+
+from mcq_gen.src.data_ingestion.faiss_manager import FaissManager
+from mcq_gen.src.generator.fanout import merge_questions, plan_parts, slice_contexts
+from mcq_gen.src.generator.generator import MCQGenRAG
+from mcq_gen.src.generator.mmr_retriever import make_retriever
+from mcq_gen.src.generator.response_cache import MemoryResponseCache
+
+
+IDEAS = ["tokens", "stemming", "parsing", "smoothing", "entropy"]
+
+
+class _PartChat(BaseChatModel):
+    """Answers each fan-out part with its own questions; part 2 fails once, part 3 repeats part 1."""
+
+    calls: list = []
+
+    @property
+    def _llm_type(self) -> str:
+        return "part-stub"
+
+    def _answer(self, messages) -> str:
+        text = messages[-1].content
+        part, count = int(re.search(r"part (\d+)", text).group(1)), int(re.search(r"the (\d+) MCQs", text).group(1))
+        self.calls.append(part)
+        if part == 2 and self.calls.count(2) == 1:
+            return "Sorry, here are your questions:"
+        source = 1 if part == 3 else part
+        return json.dumps([{"question": f"Passage {source}: which claim about {IDEAS[i]} holds?"} for i in range(count)])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._answer(messages)))])
+
+
+def test_plan_and_slices():
+    assert plan_parts(23, 5) == [5, 5, 5, 4, 4]
+    assert plan_parts(3, 5) == [3]
+    assert slice_contexts(list("abcdef"), 3, 2) == [["a", "d"], ["b", "e"], ["c", "f"]]
+    assert slice_contexts(["a"], 2, 2) == [["a"], ["a"]]
+
+
+def test_merge_drops_near_duplicates():
+    batches = [[{"question": "What is TF-IDF?"}], [{"question": "what is tf idf"}, {"question": "Define BM25."}]]
+    assert [q["question"] for q in merge_questions(batches, 10)] == ["What is TF-IDF?", "Define BM25."]
+    assert merge_questions(batches, 1) == [{"question": "What is TF-IDF?"}]
+    assert merge_questions(batches, 0) == []
+
+
+def test_fanout_rejects_a_count_below_one(tmp_path):
+    with pytest.raises(ValueError):
+        plan_parts(0, 5)
+    searched = []
+    retriever = RunnableLambda(lambda topic: searched.append(topic) or [])
+    rag = MCQGenRAG("s6", retriever=retriever, result_base=str(tmp_path / "r"), llm=_PartChat(calls=[]))
+    with pytest.raises(ValueError, match="at least 1, got 0"):
+        rag.generate_fanout("passages", 0)
+    with pytest.raises(ValueError, match="at least 1, got -1"):
+        asyncio.run(rag.agenerate_fanout("passages", -1))
+    assert searched == [] and rag.llm.calls == []
+
+
+def test_fanout_retries_invalid_parts_and_dedupes(tmp_path, fake_loader):
+    fm = FaissManager(tmp_path / "idx", fake_loader)
+    fm.load_or_create()
+    fm.add_documents([Document(page_content=f"passage {i} text", metadata={"source": "a.txt"}) for i in range(30)])
+    retriever = make_retriever(fm.vs, 3, "mmr", 6, 0.5)
+    rag = MCQGenRAG("s4", retriever=retriever, result_base=str(tmp_path / "r"), llm=_PartChat(calls=[]))
+
+    mcqs = rag.generate_fanout("passages", 12)
+    # parts of 4 questions; part 3 only repeated part 1
+    assert len(mcqs) == 8
+    assert sorted(rag.llm.calls) == [1, 2, 2, 3]
+    saved = json.loads((tmp_path / "r" / "s4" / "s4.json").read_text(encoding="utf-8"))
+    assert saved == mcqs
+
+    # a fresh response cache, so the async path calls the LLM again
+    rag = MCQGenRAG("s5", retriever=retriever, result_base=str(tmp_path / "r"), llm=_PartChat(calls=[]),
+                    response_cache=MemoryResponseCache())
+    assert len(asyncio.run(rag.agenerate_fanout("passages", 12))) == 8
+    assert sorted(rag.llm.calls) == [1, 2, 2, 3]
@@ -0,0 +1,54 @@
+import hashlib
+import io
+import tempfile
+
+from mcq_gen.utils.file_io import save_uploads
+
+
+class _Upload:
+    """Starlette-style upload: a filename plus a file object."""
+
+    def __init__(self, filename, file):
+        self.filename = filename
+        self.file = file
+
+
+def test_uploads_are_copied_in_slices_with_their_hash(tmp_path):
+    payload = bytes(range(256)) * 5000
+    real = tmp_path / "src.pdf"
+    real.write_bytes(payload)
+
+    buffered = io.BytesIO(payload)
+    buffered.name = "notes.txt"
+
+    with open(real, "rb") as f:
+        f.read(10)  # the copy starts at the current position
+        uploads = [
+            _Upload("scan.pdf", f),
+            buffered,
+            _Upload("stream.txt", io.BufferedReader(io.BytesIO(payload))),
+        ]
+        saved = save_uploads(uploads, tmp_path / "out", buffer_size=4096)
+
+    assert saved[0].path.read_bytes() == payload[10:]
+    assert saved[0].sha256 == hashlib.sha256(payload[10:]).hexdigest()
+    for item in saved[1:]:
+        assert item.path.read_bytes() == payload
+        assert item.sha256 == hashlib.sha256(payload).hexdigest()
+
+
+def test_in_memory_uploads_are_not_rolled_to_disk(tmp_path):
+    payload = b"lecture notes " * 1000
+    spooled = tempfile.SpooledTemporaryFile(max_size=len(payload) * 2)
+    spooled.write(payload)
+    spooled.seek(0)
+    buffered = io.BytesIO(payload)
+    buffered.name = "notes.txt"
+    buffered.seek(8)  # getbuffer() sees the whole buffer; the copy starts at tell()
+
+    saved = save_uploads([_Upload("spooled.txt", spooled), buffered], tmp_path / "out", buffer_size=4096)
+
+    assert spooled._rolled is False
+    assert saved[0].path.read_bytes() == payload
+    assert saved[1].path.read_bytes() == payload[8:]
+    assert saved[1].sha256 == hashlib.sha256(payload[8:]).hexdigest()
@@ -0,0 +1,141 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+from langchain_core.documents import Document
+from langchain_core.language_models import BaseChatModel, FakeListChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from mcq_gen.src.data_ingestion.faiss_manager import FaissManager
+from mcq_gen.src.generator import concurrency, generator
+from mcq_gen.src.generator.generator import MCQGenRAG
+from mcq_gen.src.generator.mmr_retriever import make_retriever
+
+
+def _rag(tmp_path, fake_loader, monkeypatch, responses):
+    fm = FaissManager(tmp_path / "idx", fake_loader)
+    fm.load_or_create()
+    fm.add_documents([Document(page_content=f"fact {i}", metadata={"source": "a.txt"}) for i in range(20)])
+    retriever = make_retriever(fm.vs, k=3, search_type="mmr", fetch_k=8, lambda_mult=0.5)
+    rag = MCQGenRAG("s1", retriever=retriever, result_base=str(tmp_path / "results"))
+    monkeypatch.setattr(rag, "_load_llm", lambda: FakeListChatModel(responses=responses))
+    return rag
+
+
+def test_generate_many_batches_retrieval(tmp_path, fake_loader, fake_embeddings, monkeypatch):
+    answers = [json.dumps([{"question": f"q{i}"}]) for i in range(3)]
+    rag = _rag(tmp_path, fake_loader, monkeypatch, answers)
+    calls = len(fake_embeddings.document_calls)
+
+    topics = ["fact 1", "fact 5", "fact 9"]
+    contexts = rag.retrieve_many(topics)
+    assert [c[0].page_content for c in contexts] == topics
+    # all topics in one embedding request, none through embed_query
+    assert fake_embeddings.document_calls[calls:] == [topics]
+    assert fake_embeddings.query_calls == []
+
+    responses = rag.generate_many(topics)
+    assert len(responses) == 3
+    saved = json.loads((tmp_path / "results" / "s1" / "s1.json").read_text(encoding="utf-8"))
+    assert sorted(q["question"] for q in saved) == ["q0", "q1", "q2"]
+
+
+def test_many_topics_without_a_retriever_names_the_problem(tmp_path):
+    rag = MCQGenRAG("s0", result_base=str(tmp_path / "results"), llm=FakeListChatModel(responses=["[]"]))
+    with pytest.raises(ValueError, match="No retriever"):
+        rag.retrieve_many(["fact 1"])
+    with pytest.raises(ValueError, match="No retriever"):
+        rag._pool_retriever(4)
+
+
+def test_chain_and_llm_are_built_once(tmp_path, fake_loader, monkeypatch):
+    fm = FaissManager(tmp_path / "idx", fake_loader)
+    fm.load_or_create()
+    fm.add_documents([Document(page_content=f"fact {i}", metadata={"source": "a.txt"}) for i in range(10)])
+    llm = FakeListChatModel(responses=[json.dumps([{"question": "q"}])])
+    rag = MCQGenRAG("s2", retriever=make_retriever(fm.vs, 3, "mmr", 6, 0.5), result_base=str(tmp_path / "r"), llm=llm)
+    monkeypatch.setattr("mcq_gen.src.generator.generator.shared_llm", lambda: pytest.fail("client rebuilt"))
+
+    rag.generate("fact 1")
+    chain = rag._build_chain()
+    rag.generate("fact 2")
+    assert rag._build_chain() is chain
+
+
+class _SlowChat(BaseChatModel):
+    """Async stub LLM that records how many calls are in flight at once."""
+
+    delay: float = 0.02
+    active: int = 0
+    peak: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "slow-stub"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        raise AssertionError("the async path must not call the sync LLM")
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(self.delay)
+        self.active -= 1
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content='[{"question": "q"}]'))])
+
+
+def test_agenerate_caps_in_flight_llm_calls(tmp_path, fake_loader, monkeypatch):
+    fm = FaissManager(tmp_path / "idx", fake_loader)
+    fm.load_or_create()
+    fm.add_documents([Document(page_content=f"fact {i}", metadata={"source": "a.txt"}) for i in range(10)])
+    llm = _SlowChat()
+    rag = MCQGenRAG("s3", retriever=make_retriever(fm.vs, 3, "mmr", 6, 0.5), result_base=str(tmp_path / "r"), llm=llm)
+    monkeypatch.setattr(concurrency, "max_concurrent_llm_calls", lambda: 2)
+
+    async def run():
+        return await asyncio.gather(*(rag.agenerate(f"fact {i}") for i in range(8)))
+
+    responses = asyncio.run(run())
+    assert len(responses) == 8 and llm.peak == 2
+    saved = json.loads((tmp_path / "r" / "s3" / "s3.json").read_text(encoding="utf-8"))
+    assert saved == [{"question": "q"}]
+    assert not list((tmp_path / "r" / "s3").glob("*.tmp"))
+
+
+_PEAK_LOCK = threading.Lock()
+
+
+class _SlowSyncChat(BaseChatModel):
+    """Sync stub LLM that records how many calls run at once across batch() threads."""
+
+    delay: float = 0.02
+    active: int = 0
+    peak: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "slow-sync-stub"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        with _PEAK_LOCK:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.delay)
+        with _PEAK_LOCK:
+            self.active -= 1
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content='[{"question": "q"}]'))])
+
+
+def test_generate_many_caps_in_flight_llm_calls(tmp_path, fake_loader, monkeypatch):
+    fm = FaissManager(tmp_path / "idx", fake_loader)
+    fm.load_or_create()
+    fm.add_documents([Document(page_content=f"fact {i}", metadata={"source": "a.txt"}) for i in range(10)])
+    llm = _SlowSyncChat()
+    rag = MCQGenRAG("s4", retriever=make_retriever(fm.vs, 3, "mmr", 6, 0.5), result_base=str(tmp_path / "r"), llm=llm)
+    monkeypatch.setattr(generator, "max_concurrent_llm_calls", lambda: 2)
+
+    assert len(rag.generate_many([f"fact {i}" for i in range(8)])) == 8
+    assert llm.peak == 2
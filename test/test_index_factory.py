@@ -0,0 +1,118 @@
+import pytest
+from langchain_core.documents import Document
+
+from mcq_gen.src.data_ingestion.faiss_manager import FaissManager
+from mcq_gen.src.data_ingestion.index_benchmark import benchmark_index_types, quantization_report, synthetic_vectors
+from mcq_gen.src.data_ingestion.index_factory import index_layout, index_settings, index_type_of
+
+
+def _manager(path, loader, **settings):
+    fm = FaissManager(path, loader)
+    fm.index_settings = index_settings(settings)
+    fm.load_or_create()
+    return fm
+
+
+def _docs(source, n, start=0):
+    return [Document(page_content=f"{source} chunk {i}", metadata={"source": source}) for i in range(start, start + n)]
+
+
+def _top_text(fm, text):
+    return fm.vs.similarity_search(text, k=1)[0].page_content
+
+
+def test_ivf_switches_after_enough_vectors_and_retrains_on_growth(tmp_path, fake_loader):
+    fm = _manager(tmp_path, fake_loader, type="ivf_flat", nlist=4, nprobe=4, min_vectors=40, retrain_growth=2.0)
+    fm.add_documents(_docs("a.txt", 30))
+    fm.flush()
+    assert index_type_of(fm.vs.index) == "flat"
+
+    # adding never trains: the switch waits for the next snapshot
+    fm.add_documents(_docs("a.txt", 20, start=30))
+    assert index_type_of(fm.vs.index) == "flat"
+    fm.flush()
+    assert index_type_of(fm.vs.index) == "ivf_flat"
+    assert fm._manifest["index"]["trained_on"] == 50
+    assert _top_text(fm, "a.txt chunk 7") == "a.txt chunk 7"
+
+    fm.add_documents(_docs("a.txt", 60, start=50))
+    assert fm._manifest["index"]["trained_on"] == 50
+    fm.flush()
+    assert fm._manifest["index"]["trained_on"] == 110
+    assert _top_text(fm, "a.txt chunk 99") == "a.txt chunk 99"
+
+    reopened = _manager(tmp_path, fake_loader, type="ivf_flat", nlist=4, nprobe=4, min_vectors=40)
+    assert index_type_of(reopened.vs.index) == "ivf_flat"
+    assert _top_text(reopened, "a.txt chunk 42") == "a.txt chunk 42"
+
+
+def test_opening_a_session_replays_the_wal_without_training(tmp_path, fake_loader):
+    settings = {"type": "ivf_flat", "nlist": 4, "nprobe": 4, "min_vectors": 40}
+    fm = _manager(tmp_path, fake_loader, **settings)
+    fm.add_documents(_docs("a.txt", 50))
+
+    reopened = _manager(tmp_path, fake_loader, **settings)
+    assert reopened.vs.index.ntotal == 50
+    assert index_type_of(reopened.vs.index) == "flat"
+
+
+@pytest.mark.parametrize("kind, rerank", [("ivf_flat", False), ("hnsw", False), ("ivf_flat", True)])
+def test_deletes_keep_positions_aligned(tmp_path, fake_loader, kind, rerank):
+    fm = _manager(tmp_path, fake_loader, type=kind, nlist=2, nprobe=2, min_vectors=2, rerank=rerank)
+    fm.sync_file("a.txt", "h1", _docs("a.txt", 10))
+    fm.flush()
+    assert index_layout(fm.vs.index) == kind + ("+rerank" if rerank else "")
+
+    # chunks 0-4 disappear from the file, 10-11 are new
+    fm.sync_file("a.txt", "h2", _docs("a.txt", 7, start=5))
+    assert fm.vs.index.ntotal == len(fm.vs.index_to_docstore_id) == 7
+    for i in range(5, 12):
+        assert _top_text(fm, f"a.txt chunk {i}") == f"a.txt chunk {i}"
+
+
+def test_benchmark_reports_recall_against_flat():
+    vectors = synthetic_vectors(2000, 16, clusters=16)
+    rows = benchmark_index_types(vectors, vectors[:20], k=5, variants=[{"type": "ivf_flat", "nlist": 16}, {"type": "hnsw"}])
+    assert rows[0]["type"] == "flat" and rows[0]["recall"] == 1.0
+    # scanning every list is exact
+    assert [r["recall"] for r in rows if r["param"] == "nprobe=16"] == [1.0]
+    assert all(0.0 <= r["recall"] <= 1.0 and r["latency_ms"] > 0 for r in rows)
+
+
+def test_int8_storage_trains_then_quantizes(tmp_path, fake_loader):
+    fm = _manager(tmp_path, fake_loader, quantization="int8", min_vectors=20)
+    fm.add_documents(_docs("a.txt", 10))
+    fm.flush()
+    assert index_layout(fm.vs.index) == "flat"
+
+    fm.add_documents(_docs("a.txt", 20, start=10))
+    fm.flush()
+    assert index_layout(fm.vs.index) == "flat+int8"
+    assert _top_text(fm, "a.txt chunk 25") == "a.txt chunk 25"
+
+
+@pytest.mark.parametrize("quantization", ["fp16", "int8"])
+def test_reranked_storage_survives_deletes_and_reload(tmp_path, fake_loader, quantization):
+    settings = {"quantization": quantization, "rerank": True, "min_vectors": 5}
+    fm = _manager(tmp_path, fake_loader, **settings)
+    fm.sync_file("a.txt", "h1", _docs("a.txt", 12))
+    fm.flush()
+    assert index_layout(fm.vs.index) == f"flat+{quantization}+rerank"
+
+    fm.sync_file("a.txt", "h2", _docs("a.txt", 8, start=4))
+    fm.flush()
+    reopened = _manager(tmp_path, fake_loader, **settings)
+    assert reopened.vs.index.ntotal == 8
+    assert _top_text(reopened, "a.txt chunk 9") == "a.txt chunk 9"
+
+
+def test_quantization_report_shows_savings():
+    vectors = synthetic_vectors(1500, 32, clusters=8)
+    rows = quantization_report(vectors, vectors[:10], {"top_k": 4, "search_type": "mmr", "fetch_k": 8})
+    by_name = {r["variant"]: r for r in rows}
+    assert by_name["none"]["overlap"] == 1.0
+    assert by_name["fp16"]["saved"] == pytest.approx(0.5, abs=0.01)
+    assert by_name["int8"]["saved"] == pytest.approx(0.75, abs=0.01)
+    # the refine copy is float32 and stored with the index: int8 + 4 bytes per dim
+    assert by_name["int8+rerank"]["saved"] == pytest.approx(-0.25, abs=0.01)
+    assert by_name["int8+rerank"]["disk_mb"] > by_name["none"]["disk_mb"]
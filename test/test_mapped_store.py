@@ -0,0 +1,93 @@
+import json
+import weakref
+
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+from mcq_gen.src.data_ingestion import faiss_manager
+from mcq_gen.src.data_ingestion.faiss_manager import FaissManager
+from mcq_gen.src.data_ingestion.mapped_store import CompactDocstore, load_mapped_vectorstore
+from mcq_gen.src.data_ingestion import vectorstore_cache
+from mcq_gen.src.data_ingestion.vectorstore_cache import VectorStoreCache, load_cached_vectorstore
+
+
+def _build(index_dir, loader, texts):
+    fm = FaissManager(index_dir, loader)
+    fm.load_or_create()
+    fm.add_documents([Document(page_content=t, metadata={"source": "a.txt", "page": i % 2}) for i, t in enumerate(texts)])
+    fm.flush()
+    return fm
+
+
+def test_mapped_store_matches_manager_store(tmp_path, fake_loader, fake_embeddings):
+    fm = _build(tmp_path, fake_loader, ["alpha", "beta", "gamma ünïcode"])
+    vs = load_mapped_vectorstore(str(tmp_path), fake_embeddings)
+
+    assert vs.index.ntotal == 3
+    for i, doc_id in fm.vs.index_to_docstore_id.items():
+        assert vs.index_to_docstore_id[i] == doc_id
+        expected = fm.vs.docstore.search(doc_id)
+        got = vs.docstore.search(doc_id)
+        assert got.page_content == expected.page_content and got.metadata == expected.metadata
+        assert vs.docstore.document(i).page_content == expected.page_content
+    assert isinstance(vs.docstore.search("missing"), str)
+    # three chunks over two distinct metadata dicts
+    meta = (tmp_path / "docstore.meta.bin").read_bytes()
+    offsets = np.load(tmp_path / "docstore.meta_offsets.npy")
+    records = [json.loads(meta[offsets[i]:offsets[i + 1]]) for i in range(len(offsets) - 1)]
+    assert sorted(records, key=lambda m: m["page"]) == [{"source": "a.txt", "page": 0}, {"source": "a.txt", "page": 1}]
+    assert not (tmp_path / "index.pkl").exists()
+
+    hits = vs.similarity_search("beta", k=1)
+    assert hits[0].page_content == "beta"
+
+
+def test_compact_docstore_add_delete_across_snapshots(tmp_path, fake_loader):
+    fm = _build(tmp_path, fake_loader, ["one", "two"])
+    fm.sync_file("a.txt", "h2", [Document(page_content="two", metadata={"source": "a.txt"}),
+                                 Document(page_content="three", metadata={"source": "a.txt"})])
+    fm.flush()
+
+    reopened = FaissManager(tmp_path, fake_loader)
+    vs = reopened.load_or_create()
+    assert isinstance(vs.docstore, CompactDocstore)
+    texts = sorted(vs.docstore.search(i).page_content for i in vs.index_to_docstore_id.values())
+    assert texts == ["three", "two"]
+
+
+def test_flush_unmaps_the_previous_snapshot_before_renaming(tmp_path, fake_loader, monkeypatch):
+    fm = _build(tmp_path, fake_loader, ["one", "two"])
+    mapped = weakref.ref(fm.vs.docstore._base)
+    renamed = []
+
+    def replace(src, dst):
+        # Windows cannot rename over a file that is still mapped
+        assert mapped() is None
+        renamed.append(dst)
+        return os_replace(src, dst)
+
+    os_replace = faiss_manager.os.replace
+    monkeypatch.setattr(faiss_manager.os, "replace", replace)
+    fm.add_documents([Document(page_content="three", metadata={"source": "a.txt"})])
+    fm.flush()
+    assert renamed and fm.vs.docstore.search(fm.vs.index_to_docstore_id[0]).page_content == "one"
+
+
+def test_legacy_pickle_snapshot_is_migrated(tmp_path, fake_loader, fake_embeddings):
+    FAISS.from_texts(["old chunk"], fake_embeddings, metadatas=[{"source": "a.txt"}]).save_local(str(tmp_path))
+    fm = FaissManager(tmp_path, fake_loader)
+    fm.load_or_create()
+    fm.flush()
+
+    assert not (tmp_path / "index.pkl").exists()
+    vs = load_mapped_vectorstore(str(tmp_path), fake_embeddings)
+    assert vs.similarity_search("old chunk", k=1)[0].page_content == "old chunk"
+
+
+def test_cached_load_uses_mapped_store(tmp_path, fake_loader, fake_embeddings, monkeypatch):
+    _build(tmp_path, fake_loader, ["one", "two"])
+    monkeypatch.setattr(vectorstore_cache, "get_vectorstore_cache", lambda: VectorStoreCache(10 * 1024 * 1024))
+    vs = load_cached_vectorstore(str(tmp_path), embeddings=fake_embeddings, mmap=True)
+    assert isinstance(vs.docstore, CompactDocstore)
+    assert len(vs.similarity_search("one", k=2)) == 2
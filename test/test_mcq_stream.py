@@ -0,0 +1,75 @@
+import asyncio
+import json
+
+from langchain_core.documents import Document
+from langchain_core.language_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+
+from mcq_gen.src.data_ingestion.faiss_manager import FaissManager
+from mcq_gen.src.generator.generator import MCQGenRAG
+from mcq_gen.src.generator.mcq_stream import JsonArrayAppender, MCQArrayParser
+from mcq_gen.src.generator.mmr_retriever import make_retriever
+
+MCQS = [
+    {"question": f"Q{i} uses \"quotes\", {{braces}} and [brackets]?", "options": {"A": "x", "B": "y"}, "correct_answer": "A"}
+    for i in range(3)
+]
+ANSWER = "```json\n" + json.dumps(MCQS, indent=2) + "\n```"
+
+
+def test_parser_yields_each_object_when_it_closes():
+    parser = MCQArrayParser()
+    seen = []
+    for i, ch in enumerate(ANSWER):
+        for mcq in parser.feed(ch):
+            seen.append((mcq, i))
+    assert [m for m, _ in seen] == MCQS
+    # the first question is complete long before the answer is
+    assert seen[0][1] < len(ANSWER) // 2
+    assert parser.done and parser.skipped == 0
+
+
+def test_appender_keeps_a_valid_array(tmp_path):
+    path = tmp_path / "out.json"
+    path.write_text(json.dumps(["previous"]), encoding="utf-8")
+    with JsonArrayAppender(path) as out, JsonArrayAppender(path) as other:
+        # earlier results survive until this request has a question of its own
+        assert json.loads(path.read_text(encoding="utf-8")) == ["previous"]
+        for n, mcq in enumerate(MCQS, 1):
+            out.append(mcq)
+            assert json.loads(path.read_text(encoding="utf-8")) == MCQS[:n]
+            # a concurrent stream of the session swaps in its own complete array
+            other.append({"other": n})
+            assert json.loads(path.read_text(encoding="utf-8")) == [{"other": i} for i in range(1, n + 1)]
+    assert [p.name for p in tmp_path.iterdir()] == ["out.json"]
+
+
+def _rag(tmp_path, fake_loader, answer, session):
+    fm = FaissManager(tmp_path / "idx", fake_loader)
+    fm.load_or_create()
+    fm.add_documents([Document(page_content=f"fact {i}", metadata={"source": "a.txt"}) for i in range(10)])
+    # streams the answer a few characters per chunk
+    llm = GenericFakeChatModel(messages=iter([AIMessage(content=answer)] * 2))
+    return MCQGenRAG(session, retriever=make_retriever(fm.vs, 3, "mmr", 6, 0.5), result_base=str(tmp_path / "r"), llm=llm)
+
+
+def test_generate_stream_appends_as_it_yields(tmp_path, fake_loader):
+    rag = _rag(tmp_path, fake_loader, ANSWER, "s1")
+    results = tmp_path / "r" / "s1" / "s1.json"
+    for n, mcq in enumerate(rag.generate_stream("fact 1"), 1):
+        assert json.loads(results.read_text(encoding="utf-8")) == MCQS[:n]
+    assert json.loads(results.read_text(encoding="utf-8")) == MCQS
+
+    # the cached answer is replayed without a second LLM stream
+    assert list(rag.generate_stream("fact 1")) == MCQS
+    assert rag.response_cache.hits == 1
+
+
+def test_agenerate_stream_handles_a_single_object(tmp_path, fake_loader):
+    rag = _rag(tmp_path, fake_loader, json.dumps(MCQS[0]), "s2")
+
+    async def collect():
+        return [mcq async for mcq in rag.agenerate_stream("fact 2")]
+
+    assert asyncio.run(collect()) == [MCQS[0]]
+    assert json.loads((tmp_path / "r" / "s2" / "s2.json").read_text(encoding="utf-8")) == [MCQS[0]]
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+from langchain_community.vectorstores.utils import maximal_marginal_relevance
+from langchain_core.documents import Document
+
+from mcq_gen.src.data_ingestion.faiss_manager import FaissManager
+from mcq_gen.src.generator.mmr_retriever import (
+    VectorRetriever,
+    make_retriever,
+    mmr_select,
+    mmr_select_batch,
+    retriever_settings,
+)
+from mcq_gen.utils.embedding_cache import CachedEmbeddings, EmbeddingStore, text_hash
+
+
+@pytest.mark.parametrize("lambda_mult", [0.0, 0.3, 0.5, 1.0])
+def test_mmr_matches_langchain_picks(lambda_mult):
+    rng = np.random.default_rng(0)
+    for _ in range(5):
+        query = rng.normal(size=8).astype(np.float32)
+        candidates = rng.normal(size=(20, 8)).astype(np.float32)
+        expected = maximal_marginal_relevance(query, candidates, k=6, lambda_mult=lambda_mult)
+        assert mmr_select(query, candidates, 6, lambda_mult) == expected
+
+
+def test_batched_mmr_equals_single_queries_and_skips_padding():
+    rng = np.random.default_rng(1)
+    queries = rng.normal(size=(4, 8)).astype(np.float32)
+    candidates = rng.normal(size=(4, 10, 8)).astype(np.float32)
+    valid = np.ones((4, 10), dtype=bool)
+    valid[2, 3:] = False
+
+    picks = mmr_select_batch(queries, candidates, 5, 0.5, valid=valid)
+    for b in (0, 1, 3):
+        assert list(picks[b]) == mmr_select(queries[b], candidates[b], 5, 0.5)
+    assert list(picks[2][:3]) == mmr_select(queries[2], candidates[2, :3], 5, 0.5)
+    assert list(picks[2][3:]) == [-1, -1]
+
+
+def test_retriever_uses_stored_vectors_and_fetch_k(tmp_path, fake_loader, fake_embeddings):
+    fm = FaissManager(tmp_path, fake_loader)
+    fm.load_or_create()
+    fm.add_documents([Document(page_content=f"chunk {i}", metadata={"source": "a.txt"}) for i in range(30)])
+    embedded = len(fake_embeddings.document_calls)
+
+    retriever = make_retriever(fm.vs, k=4, search_type="mmr", fetch_k=12, lambda_mult=0.5)
+    assert isinstance(retriever, VectorRetriever)
+    docs = retriever.invoke("questions about chunk 7")
+    assert len(docs) == 4
+    # candidates come with their stored vectors: only the query is embedded
+    assert len(fake_embeddings.document_calls) == embedded
+    assert fake_embeddings.query_calls == ["questions about chunk 7"]
+
+    expected = fm.vs.max_marginal_relevance_search("questions about chunk 7", k=4, fetch_k=12, lambda_mult=0.5)
+    assert [d.page_content for d in docs] == [d.page_content for d in expected]
+
+    topics = ("questions about chunk 7", "chunk 9")
+    batched = retriever.retrieve_by_vectors(np.array([fake_embeddings.embed_query(q) for q in topics]))
+    assert [d.page_content for d in batched[0]] == [d.page_content for d in docs]
+    assert batched[1][0].page_content == "chunk 9"
+
+
+def test_settings_default_to_config_values():
+    settings = retriever_settings(k=3)
+    assert settings["k"] == 3
+    assert settings["search_type"] == "mmr" and settings["fetch_k"] == 20 and settings["lambda_mult"] == 0.5
+    assert retriever_settings(k=50)["fetch_k"] == 50
+
+
+def test_batched_topics_are_not_written_to_the_chunk_store(tmp_path, fake_loader, fake_embeddings):
+    store = EmbeddingStore(tmp_path / "emb.sqlite")
+    fm = FaissManager(tmp_path / "index", type(fake_loader)(CachedEmbeddings(fake_embeddings, "fake-embed", store)))
+    fm.load_or_create()
+    fm.add_documents([Document(page_content=f"chunk {i}", metadata={"source": "a.txt"}) for i in range(10)])
+
+    retriever = make_retriever(fm.vs, k=2, search_type="mmr", fetch_k=5, lambda_mult=0.5)
+    retriever.retrieve_many(["chunk 3", "chunk 4 and 5"])
+    assert fake_embeddings.document_calls[-1] == ["chunk 3", "chunk 4 and 5"]
+    assert store.get_many("fake-embed", [text_hash("chunk 4 and 5")]) == {}
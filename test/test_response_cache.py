@@ -0,0 +1,108 @@
+import asyncio
+import json
+import threading
+
+from langchain_core.documents import Document
+from langchain_core.language_models import FakeListChatModel
+import pytest
+
+from mcq_gen.src.data_ingestion.faiss_manager import FaissManager
+from mcq_gen.src.data_ingestion import vectorstore_cache
+from mcq_gen.src.generator.generator import MCQGenRAG
+from mcq_gen.src.generator.mmr_retriever import make_retriever
+from mcq_gen.src.generator.response_cache import MemoryResponseCache, NullResponseCache, ResponseCache, SQLiteResponseCache
+
+ANSWER = json.dumps([{"question": "q"}])
+
+
+class _CountingChat(FakeListChatModel):
+    calls: int = 0
+
+    def _call(self, *args, **kwargs):
+        self.calls += 1
+        return super()._call(*args, **kwargs)
+
+
+def _index(tmp_path, fake_loader, texts):
+    fm = FaissManager(tmp_path / "idx", fake_loader)
+    fm.load_or_create()
+    fm.add_documents([Document(page_content=t, metadata={"source": "a.txt"}) for t in texts])
+    fm.flush()
+    return fm
+
+
+def test_repeated_quiz_skips_the_llm_until_the_index_changes(tmp_path, fake_loader, monkeypatch):
+    monkeypatch.setattr(vectorstore_cache, "shared_embeddings", lambda: fake_loader.load_embeddings())
+    fm = _index(tmp_path, fake_loader, [f"fact {i}" for i in range(10)])
+    cache = SQLiteResponseCache(tmp_path / "responses.sqlite")
+
+    def student():
+        llm = _CountingChat(responses=[ANSWER])
+        rag = MCQGenRAG("s1", result_base=str(tmp_path / "r"), llm=llm, response_cache=cache)
+        rag.load_retriever_from_faiss(str(tmp_path / "idx"), k=3)
+        rag.generate("fact 2")
+        return llm.calls
+
+    assert student() == 1
+    assert student() == 0 and cache.hits == 1
+
+    # a new snapshot of the session index invalidates its cached answers
+    fm.add_documents([Document(page_content="fact 99", metadata={"source": "b.txt"})])
+    fm.flush()
+    assert student() == 1
+    assert cache.invalidations == 1
+
+
+def test_invalid_answers_are_not_cached_and_ttl_expires(tmp_path, fake_loader):
+    fm = _index(tmp_path, fake_loader, ["alpha", "beta"])
+    cache = MemoryResponseCache(ttl_seconds=60)
+    llm = _CountingChat(responses=["not json", ANSWER])
+    rag = MCQGenRAG("s2", retriever=make_retriever(fm.vs, 2, "similarity", 2, 0.5),
+                    result_base=str(tmp_path / "r"), llm=llm, response_cache=cache)
+    chain = rag._answer_chain()
+    chain.invoke({"context": "alpha", "topic": "a"})
+    chain.invoke({"context": "alpha", "topic": "a"})
+    chain.invoke({"context": "alpha", "topic": "a"})
+    assert llm.calls == 2
+
+    key = next(iter(cache._entries))
+    value, scope, version, created = cache._entries[key]
+    cache._entries[key] = (value, scope, version, created - 120)
+    chain.invoke({"context": "alpha", "topic": "a"})
+    assert llm.calls == 3
+
+
+def test_async_lookups_run_off_the_event_loop(tmp_path, fake_loader):
+    with pytest.raises(TypeError):
+        ResponseCache()
+
+    fm = _index(tmp_path, fake_loader, ["alpha", "beta"])
+    cache = SQLiteResponseCache(tmp_path / "responses.sqlite")
+    threads = []
+    get, put = cache._get, cache._put
+    cache._get = lambda *a: threads.append(threading.get_ident()) or get(*a)
+    cache._put = lambda *a: threads.append(threading.get_ident()) or put(*a)
+    llm = _CountingChat(responses=[ANSWER])
+    rag = MCQGenRAG("s3", retriever=make_retriever(fm.vs, 2, "similarity", 2, 0.5),
+                    result_base=str(tmp_path / "r"), llm=llm, response_cache=cache)
+
+    async def run():
+        loop_thread = threading.get_ident()
+        await rag._answer_chain().ainvoke({"context": "alpha", "topic": "a"})
+        await rag._answer_chain().ainvoke({"context": "alpha", "topic": "a"})
+        return loop_thread
+
+    loop_thread = asyncio.run(run())
+    assert llm.calls == 1 and cache.hits == 1
+    assert len(threads) == 3 and loop_thread not in threads
+
+
+def test_null_cache_turns_caching_off_per_instance(tmp_path, fake_loader):
+    fm = _index(tmp_path, fake_loader, ["alpha", "beta"])
+    llm = _CountingChat(responses=[ANSWER])
+    rag = MCQGenRAG("s4", retriever=make_retriever(fm.vs, 2, "similarity", 2, 0.5),
+                    result_base=str(tmp_path / "r"), llm=llm, response_cache=NullResponseCache())
+    rag._answer_chain().invoke({"context": "alpha", "topic": "a"})
+    rag._answer_chain().invoke({"context": "alpha", "topic": "a"})
+    assert llm.calls == 2
+    assert rag.response_cache.stats() == {"hits": 0, "misses": 0, "invalidations": 0}
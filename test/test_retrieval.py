@@ -0,0 +1,22 @@
+import asyncio
+
+from langchain_core.documents import Document
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+
+from mcq_gen.src.generator import retrieval
+from mcq_gen.src.generator.retrieval import MCQGenRAG
+
+
+def test_chain_passes_the_topic_to_retriever_and_prompt(monkeypatch):
+    prompts = []
+    llm = RunnableLambda(lambda prompt_value: prompts.append(prompt_value.to_string()) or AIMessage(content="[]"))
+    monkeypatch.setattr(retrieval, "shared_llm", lambda: llm)
+    searched = []
+    retriever = RunnableLambda(lambda topic: searched.append(topic) or [Document(page_content="Viterbi decoding")])
+    rag = MCQGenRAG("s1", retriever=retriever)
+
+    assert rag.invoke("hidden markov models") == "[]"
+    assert asyncio.run(rag.ainvoke("hidden markov models")) == "[]"
+    assert searched == ["hidden markov models"] * 2
+    assert all("hidden markov models" in p and "Viterbi decoding" in p for p in prompts) and len(prompts) == 2
@@ -0,0 +1,91 @@
+import pytest
+from langchain_core.documents import Document
+
+from mcq_gen.src.data_ingestion.faiss_manager import FaissManager
+from mcq_gen.src.data_ingestion.sharded_index import ShardedIndex
+from mcq_gen.src.data_ingestion import sharded_index, vectorstore_cache
+from mcq_gen.src.data_ingestion.vectorstore_cache import VectorStoreCache
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    cache = VectorStoreCache(10 * 1024 * 1024)
+    monkeypatch.setattr(vectorstore_cache, "get_vectorstore_cache", lambda: cache)
+    monkeypatch.setattr("mcq_gen.src.data_ingestion.sharded_index.get_vectorstore_cache", lambda: cache)
+
+
+def _docs(source, n):
+    return [Document(page_content=f"{source} chunk {i}", metadata={"source": source}) for i in range(n)]
+
+
+def test_shards_are_added_searched_and_dropped_independently(tmp_path, fake_loader):
+    lib = ShardedIndex(tmp_path, fake_loader, shard_by="source", search_workers=2)
+    a = lib.add_file("a.pdf", "a" * 64, _docs("a.pdf", 5))
+    b = lib.add_file("b.pdf", "b" * 64, _docs("b.pdf", 5))
+    assert lib.add_file("copy_of_a.pdf", "a" * 64, []) == a
+    assert lib.shard_ids() == sorted([a, b])
+
+    hits = lib.search("b.pdf chunk 3", k=3)
+    assert hits[0].page_content == "b.pdf chunk 3" and hits[0].metadata["shard"] == b
+    # a query can target a subset of shards
+    assert all(d.metadata["shard"] == a for d in lib.search("b.pdf chunk 3", k=3, shards=[a]))
+
+    index_b = (tmp_path / b / "index.faiss").stat().st_mtime_ns
+    lib.drop_shard(a)
+    assert lib.shard_ids() == [b] and not (tmp_path / a).exists()
+    assert (tmp_path / b / "index.faiss").stat().st_mtime_ns == index_b
+    assert ShardedIndex(tmp_path, fake_loader).shard_ids() == [b]
+
+
+def test_merge_keeps_global_top_k_across_buckets(tmp_path, fake_loader, fake_embeddings):
+    lib = ShardedIndex(tmp_path, fake_loader, shard_by="bucket", bucket_size=4, search_workers=2)
+    shards = {lib.add_file(f"f{i}.txt", f"{i:064d}", _docs(f"f{i}.txt", 3)) for i in range(4)}
+    assert len(shards) == 2
+
+    query = "f2.txt chunk 1"
+    got = lib.search_with_scores(query, k=4)
+    scores = [s for _, s in got]
+    assert scores == sorted(scores) and got[0][0].page_content == query
+    retriever = lib.as_retriever(k=2)
+    assert [d.page_content for d in retriever.invoke(query)] == [d.page_content for d, _ in got[:2]]
+    lib.close()
+
+
+def test_bucket_files_are_written_once_per_shard(tmp_path, fake_loader, monkeypatch):
+    flushes = []
+    flush = FaissManager.flush
+    monkeypatch.setattr(FaissManager, "flush", lambda self: flushes.append(self.index_dir.name) or flush(self))
+
+    lib = ShardedIndex(tmp_path, fake_loader, shard_by="bucket", bucket_size=4, search_workers=2)
+    shards = lib.add_files([(f"f{i}.txt", f"{i:064d}", _docs(f"f{i}.txt", 3)) for i in range(4)])
+
+    assert shards[0] == shards[1] and shards[2] == shards[3] and shards[1] != shards[2]
+    assert sorted(flushes) == sorted(set(shards))
+    assert lib.search("f3.txt chunk 2", k=1)[0].page_content == "f3.txt chunk 2"
+    lib.close()
+
+
+def test_reindexed_source_replaces_its_previous_version(tmp_path, fake_loader, monkeypatch):
+    monkeypatch.setattr(sharded_index, "shared_model_loader", lambda: fake_loader)
+    lib = ShardedIndex(tmp_path, shard_by="source", search_workers=2)
+    assert lib.model_loader is fake_loader
+
+    old = lib.add_file("a.pdf", "a" * 64, _docs("a.pdf", 3))
+    kept = lib.add_file("b.pdf", "b" * 64, _docs("b.pdf", 3))
+    lib.add_file("b_copy.pdf", "b" * 64, [])
+    new = lib.add_file("a.pdf", "c" * 64, [Document(page_content="a.pdf revised", metadata={"source": "a.pdf"})])
+    assert lib.shard_ids() == sorted([new, kept]) and not (tmp_path / old).exists()
+    assert lib.search("a.pdf chunk 1", k=1, shards=[new])[0].page_content == "a.pdf revised"
+
+    # a shard still listed under another source survives its re-index
+    lib.add_file("b.pdf", "d" * 64, _docs("b.pdf", 2))
+    assert kept in lib.shard_ids() and lib.shard_of("b_copy.pdf") == kept
+    lib.close()
+
+
+def test_reindexed_source_is_synced_inside_its_bucket(tmp_path, fake_loader):
+    lib = ShardedIndex(tmp_path, fake_loader, shard_by="bucket", bucket_size=100, search_workers=2)
+    first = lib.add_file("a.txt", "1" * 64, _docs("a.txt", 4))
+    assert lib.add_file("a.txt", "2" * 64, _docs("a.txt", 2)) == first
+    assert lib._registry["shards"][first]["vectors"] == 2
+    lib.close()
@@ -0,0 +1,96 @@
+from collections import OrderedDict
+
+from langchain_core.documents import Document
+
+from mcq_gen.src.data_ingestion.faiss_manager import FaissManager
+from mcq_gen.src.data_ingestion import sparse_index
+from mcq_gen.src.data_ingestion.sparse_index import build_sparse_index, load_sparse_index, tokenize
+from mcq_gen.src.generator.mmr_retriever import HybridRetriever, make_retriever, rrf_fuse
+
+TEXTS = [
+    "The Viterbi algorithm decodes the most likely tag sequence of an HMM.",
+    "TF-IDF weights a term by its frequency and inverse document frequency.",
+    "Tokenization splits raw text into word and subword units.",
+    "Smoothing gives unseen n-grams a small probability.",
+] + [f"filler chunk number {i} about language models" for i in range(12)]
+
+
+def _store(tmp_path, fake_loader):
+    fm = FaissManager(tmp_path, fake_loader)
+    fm.load_or_create()
+    fm.add_documents([Document(page_content=t, metadata={"source": "nlp.txt"}) for t in TEXTS])
+    fm.flush()
+    return fm.vs
+
+
+def test_tokenize_keeps_compounds_and_parts():
+    assert tokenize("The TF-IDF of a term") == ["tf-idf", "tf", "idf", "term"]
+
+
+def test_bm25_postings_roundtrip_and_rebuild_skip(tmp_path, fake_loader):
+    vs = _store(tmp_path, fake_loader)
+    sparse = build_sparse_index(vs, tmp_path)
+    rows, scores = sparse.search("viterbi", 5)
+    assert [vs.docstore.search(vs.index_to_docstore_id[int(r)]).page_content for r in rows] == [TEXTS[0]]
+    assert scores[0] > 0
+
+    written = (tmp_path / "bm25.rows.npy").stat().st_mtime_ns
+    build_sparse_index(vs, tmp_path)
+    assert (tmp_path / "bm25.rows.npy").stat().st_mtime_ns == written
+    assert load_sparse_index(tmp_path, vs).n == len(TEXTS)
+
+
+def test_lexical_topics_skip_the_query_embedding(tmp_path, fake_loader, fake_embeddings):
+    vs = _store(tmp_path, fake_loader)
+    retriever = make_retriever(vs, k=3, search_type="mmr", fetch_k=8, lambda_mult=0.5,
+                               sparse=build_sparse_index(vs, tmp_path))
+    assert isinstance(retriever, HybridRetriever)
+
+    docs = retriever.invoke("TF-IDF")
+    assert [d.page_content for d in docs] == [TEXTS[1]]
+    assert fake_embeddings.query_calls == []
+
+    # an unknown term needs the dense ranking; BM25 hits are fused in
+    docs = retriever.invoke("hidden markov viterbi decoding")
+    assert fake_embeddings.query_calls == ["hidden markov viterbi decoding"]
+    assert TEXTS[0] in [d.page_content for d in docs] and len(docs) == 3
+
+    batched = retriever.retrieve_many(["Viterbi", "hidden markov viterbi decoding"])
+    assert [d.page_content for d in batched[0]] == [TEXTS[0]]
+    assert len(fake_embeddings.document_calls[-1]) == 1
+
+
+def test_rrf_rewards_items_ranked_by_both_lists():
+    assert rrf_fuse([[1, 2, 3], [3, 4, 1]], k=2) == [1, 3]
+
+
+def test_flush_rebuilds_postings_when_a_file_keeps_its_chunk_count(tmp_path, fake_loader):
+    fm = FaissManager(tmp_path, fake_loader)
+    fm.load_or_create()
+    fm.sync_file("a.txt", "v1", [Document(page_content=t, metadata={"source": "a.txt"}) for t in TEXTS[:2]])
+    fm.flush()
+    old = {name: (tmp_path / name).read_bytes() for name in ("bm25.rows.npy", "bm25.meta.json")}
+
+    fm.sync_file("a.txt", "v2", [Document(page_content=t, metadata={"source": "a.txt"}) for t in TEXTS[2:4]])
+    fm.flush()
+    sparse = load_sparse_index(tmp_path, fm.vs)
+    rows, _ = sparse.search("tokenization", 5)
+    assert [fm.vs.docstore.search(fm.vs.index_to_docstore_id[int(r)]).page_content for r in rows] == [TEXTS[2]]
+
+    # postings of the old content have the same row count but other docstore ids
+    for name, data in old.items():
+        (tmp_path / name).write_bytes(data)
+    assert load_sparse_index(tmp_path, fm.vs) is None
+
+
+def test_docstore_ids_are_hashed_once_per_snapshot(tmp_path, fake_loader, monkeypatch):
+    vs = _store(tmp_path, fake_loader)
+    calls = []
+    digest = sparse_index.ids_digest
+    monkeypatch.setattr(sparse_index, "ids_digest", lambda itd: calls.append(1) or digest(itd))
+    monkeypatch.setattr(sparse_index, "_DIGESTS", OrderedDict())
+
+    build_sparse_index(vs, tmp_path)
+    for _ in range(3):
+        assert load_sparse_index(tmp_path, vs).n == len(TEXTS)
+    assert len(calls) == 1
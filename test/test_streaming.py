@@ -0,0 +1,81 @@
+import threading
+import time
+
+import pytest
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from mcq_gen.src.data_ingestion.faiss_manager import FaissManager
+from mcq_gen.src.data_ingestion.streaming import stream_ingest
+from mcq_gen.utils.file_io import sha256_file
+
+
+def _write(tmp_path, name, lines):
+    path = tmp_path / name
+    path.write_text("\n\n".join(lines), encoding="utf-8")
+    return path
+
+
+def test_stream_ingest_embeds_fixed_size_batches(tmp_path, fake_loader, fake_embeddings):
+    paths = [
+        _write(tmp_path, "a.txt", [f"paragraph {i} of a" for i in range(25)]),
+        _write(tmp_path, "b.txt", [f"paragraph {i} of b" for i in range(12)]),
+    ]
+    splitter = RecursiveCharacterTextSplitter(chunk_size=20, chunk_overlap=0)
+    fm = FaissManager(tmp_path / "idx", fake_loader)
+    fm.load_or_create()
+
+    files, added = stream_ingest(fm, iter(paths), splitter.split_documents, batch_size=10, queue_size=1)
+
+    assert (files, added) == (2, 37)
+    assert fm.vs.index.ntotal == 37
+    assert max(len(c) for c in fake_embeddings.document_calls) <= 10
+    assert fm.is_indexed(str(paths[0]), sha256_file(paths[0]))
+
+    # streaming the same files again is skipped from their hashes
+    assert stream_ingest(fm, iter(paths), splitter.split_documents, batch_size=10) == (0, 0)
+
+
+def test_stream_ingest_surfaces_stage_errors(tmp_path, fake_loader):
+    fm = FaissManager(tmp_path / "idx", fake_loader)
+    fm.load_or_create()
+
+    def broken_split(docs):
+        raise ValueError("splitter exploded")
+
+    path = _write(tmp_path, "a.txt", ["x"])
+    with pytest.raises(ValueError, match="exploded"):
+        stream_ingest(fm, iter([path]), broken_split)
+
+
+def test_stream_ingest_drops_chunks_removed_from_a_changed_file(tmp_path, fake_loader):
+    splitter = RecursiveCharacterTextSplitter(chunk_size=20, chunk_overlap=0)
+    fm = FaissManager(tmp_path / "idx", fake_loader)
+    fm.load_or_create()
+    path = _write(tmp_path, "a.txt", [f"paragraph {i}" for i in range(6)])
+    stream_ingest(fm, iter([path]), splitter.split_documents, batch_size=4)
+
+    _write(tmp_path, "a.txt", [f"paragraph {i}" for i in range(3, 8)])
+    assert stream_ingest(fm, iter([path]), splitter.split_documents, batch_size=4) == (1, 2)
+    texts = {fm.vs.docstore.search(i).page_content for i in fm.vs.index_to_docstore_id.values()}
+    assert texts == {f"paragraph {i}" for i in range(3, 8)}
+    assert fm.vs.index.ntotal == 5
+
+
+def test_consumer_errors_stop_every_stage(tmp_path, fake_loader):
+    fm = FaissManager(tmp_path / "idx", fake_loader)
+    fm.load_or_create()
+    paths = [_write(tmp_path, f"{n}.txt", [f"{n} paragraph {i}" for i in range(3)]) for n in range(4)]
+
+    def broken_callback(source, file_hash):
+        raise RuntimeError("callback exploded")
+
+    def slow_split(docs):
+        # the embed stage waits on an empty queue while the parser is busy
+        time.sleep(0.2)
+        return docs
+
+    started = time.perf_counter()
+    with pytest.raises(RuntimeError, match="exploded"):
+        stream_ingest(fm, iter(paths), slow_split, batch_size=1, on_file_indexed=broken_callback)
+    assert time.perf_counter() - started < 2
+    assert not [t for t in threading.enumerate() if t.name.startswith("stream-")]
@@ -0,0 +1,78 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.documents import Document
+
+from mcq_gen.src.data_ingestion.faiss_manager import FaissManager
+from mcq_gen.src.data_ingestion.mapped_store import load_mapped_vectorstore
+from mcq_gen.src.data_ingestion.vectorstore_cache import VectorStoreCache
+
+
+def _build(index_dir, loader, texts):
+    fm = FaissManager(index_dir, loader)
+    fm.load_or_create()
+    fm.add_documents([Document(page_content=t, metadata={"source": "a.txt"}) for t in texts])
+    fm.flush()
+    return fm
+
+
+def _loader(path, embeddings, loads):
+    def load():
+        loads.append(path)
+        return load_mapped_vectorstore(path, embeddings)
+    return load
+
+
+def test_cache_hits_and_reloads_after_new_snapshot(tmp_path, fake_loader, fake_embeddings):
+    fm = _build(tmp_path / "s1", fake_loader, ["one", "two"])
+    cache = VectorStoreCache(max_bytes=10 * 1024 * 1024)
+    loads = []
+    load = _loader(str(tmp_path / "s1"), fake_embeddings, loads)
+
+    first = cache.get(str(tmp_path / "s1"), load)
+    assert cache.get(str(tmp_path / "s1"), load) is first
+    assert cache.stats()["hits"] == 1 and len(loads) == 1
+
+    fm.add_documents([Document(page_content="three", metadata={"source": "a.txt"})])
+    fm.flush()
+    reloaded = cache.get(str(tmp_path / "s1"), load)
+    assert reloaded.index.ntotal == 3
+    assert cache.stats()["invalidations"] == 1 and len(loads) == 2
+
+
+def test_cache_evicts_least_recently_used(tmp_path, fake_loader, fake_embeddings):
+    for name in ("s1", "s2", "s3"):
+        _build(tmp_path / name, fake_loader, [f"{name} text"])
+    cache = VectorStoreCache(max_bytes=1)
+    loads = []
+    for name in ("s1", "s2", "s3"):
+        cache.get(str(tmp_path / name), _loader(str(tmp_path / name), fake_embeddings, loads))
+
+    stats = cache.stats()
+    assert stats["entries"] == 1 and stats["evictions"] == 2
+
+
+def test_cold_load_does_not_block_other_indexes(tmp_path, fake_loader, fake_embeddings):
+    for name in ("s1", "s2"):
+        _build(tmp_path / name, fake_loader, [f"{name} text"])
+    cache = VectorStoreCache(max_bytes=10 * 1024 * 1024)
+    loads = []
+    warm = cache.get(str(tmp_path / "s1"), _loader(str(tmp_path / "s1"), fake_embeddings, loads))
+
+    started, release = threading.Event(), threading.Event()
+    slow = _loader(str(tmp_path / "s2"), fake_embeddings, loads)
+
+    def slow_load():
+        started.set()
+        release.wait(5)
+        return slow()
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        cold = [pool.submit(cache.get, str(tmp_path / "s2"), slow_load) for _ in range(2)]
+        assert started.wait(5)
+        # served while s2 is still loading
+        assert cache.get(str(tmp_path / "s1"), _loader(str(tmp_path / "s1"), fake_embeddings, loads)) is warm
+        release.set()
+        assert cold[0].result() is cold[1].result()
+    # the two concurrent misses on s2 loaded it once
+    assert loads.count(str(tmp_path / "s2")) == 1